@@ -1,47 +1,78 @@
 import os
+import functools
 from pathlib import Path
+from types import SimpleNamespace
 from dotenv import load_dotenv
 
 # 获取项目根目录
 BASE_DIR = Path(__file__).resolve().parent.parent
 
-# 加载 .env 文件
-env_path = BASE_DIR / '.env'
-load_dotenv(env_path)
-
-# ================================================= #
-# ************** mysql数据库 配置  ************** #
-# ================================================= #
-# 数据库类型 MYSQL/POSTGRESQL
-DATABASE_TYPE = os.getenv('DATABASE_TYPE', 'MYSQL')
-# 数据库地址
-DATABASE_HOST = os.getenv('DATABASE_HOST', '127.0.0.1')
-# 数据库端口
-DATABASE_PORT = int(os.getenv('DATABASE_PORT', 3306))
-# 数据库用户名
-DATABASE_USER = os.getenv('DATABASE_USER', 'meetvoice')
-# 数据库密码
-DATABASE_PASSWORD = os.getenv('DATABASE_PASSWORD', 'meetvoice')
-# 数据库名
-DATABASE_NAME = os.getenv('DATABASE_NAME', 'meetvoice')
-
-# ================================================= #
-# ************** redis配置，无redis 可不进行配置  ************** #
-# ================================================= #
-REDIS_PASSWORD = os.getenv('REDIS_PASSWORD', '')
-REDIS_HOST = os.getenv('REDIS_HOST', '127.0.0.1')
-REDIS_URL = f'redis://:{REDIS_PASSWORD or ""}@{REDIS_HOST}:6379'
-
-# ================================================= #
-# ************** AI API Keys 配置  ************** #
-# ================================================= #
-# DeepSeek API Key
-DEEPSEEK_API_KEY = os.getenv('DEEPSEEK_API_KEY')
-# 星火 API Key
-XUNFEI_API_KEY = os.getenv('XUNFEI_API_KEY')
-
-# ================================================= #
-# ************** 其他 配置  ************** #
-# ================================================= #
-DEBUG = os.getenv('DEBUG', 'True').lower() == 'true'
-ALLOWED_HOSTS = os.getenv('ALLOWED_HOSTS', '*').split(',')
\ No newline at end of file
+
+@functools.lru_cache(maxsize=1)
+def load_env() -> SimpleNamespace:
+    """解析 .env 并一次性完成类型转换，结果在进程内缓存"""
+    # 加载 .env 文件
+    load_dotenv(BASE_DIR / '.env')
+    getenv = os.getenv
+
+    redis_password = getenv('REDIS_PASSWORD', '')
+    redis_host = getenv('REDIS_HOST', '127.0.0.1')
+
+    return SimpleNamespace(
+        # ================================================= #
+        # ************** mysql数据库 配置  ************** #
+        # ================================================= #
+        # 数据库类型 MYSQL/POSTGRESQL
+        DATABASE_TYPE=getenv('DATABASE_TYPE', 'MYSQL'),
+        # 数据库地址
+        DATABASE_HOST=getenv('DATABASE_HOST', '127.0.0.1'),
+        # 数据库端口
+        DATABASE_PORT=int(getenv('DATABASE_PORT', 3306)),
+        # 数据库用户名
+        DATABASE_USER=getenv('DATABASE_USER', 'meetvoice'),
+        # 数据库密码
+        DATABASE_PASSWORD=getenv('DATABASE_PASSWORD', 'meetvoice'),
+        # 数据库名
+        DATABASE_NAME=getenv('DATABASE_NAME', 'meetvoice'),
+
+        # ================================================= #
+        # ************** redis配置，无redis 可不进行配置  ************** #
+        # ================================================= #
+        REDIS_PASSWORD=redis_password,
+        REDIS_HOST=redis_host,
+        REDIS_URL=f'redis://:{redis_password or ""}@{redis_host}:6379',
+
+        # ================================================= #
+        # ************** AI API Keys 配置  ************** #
+        # ================================================= #
+        # DeepSeek API Key
+        DEEPSEEK_API_KEY=getenv('DEEPSEEK_API_KEY'),
+        # 星火 API Key
+        XUNFEI_API_KEY=getenv('XUNFEI_API_KEY'),
+
+        # ================================================= #
+        # ************** 其他 配置  ************** #
+        # ================================================= #
+        DEBUG=getenv('DEBUG', 'True').lower() == 'true',
+        ALLOWED_HOSTS=getenv('ALLOWED_HOSTS', '*').split(','),
+    )
+
+
+_env = load_env()
+
+DATABASE_TYPE = _env.DATABASE_TYPE
+DATABASE_HOST = _env.DATABASE_HOST
+DATABASE_PORT = _env.DATABASE_PORT
+DATABASE_USER = _env.DATABASE_USER
+DATABASE_PASSWORD = _env.DATABASE_PASSWORD
+DATABASE_NAME = _env.DATABASE_NAME
+
+REDIS_PASSWORD = _env.REDIS_PASSWORD
+REDIS_HOST = _env.REDIS_HOST
+REDIS_URL = _env.REDIS_URL
+
+DEEPSEEK_API_KEY = _env.DEEPSEEK_API_KEY
+XUNFEI_API_KEY = _env.XUNFEI_API_KEY
+
+DEBUG = _env.DEBUG
+ALLOWED_HOSTS = _env.ALLOWED_HOSTS
@@ -1,216 +1,348 @@
 import os
-from typing import Dict, Optional
+from dataclasses import dataclass, field
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Dict, Mapping, Optional, Tuple
 from django.conf import settings
 
-class ModelConfig:
-    def __init__(self):
-        self.project_root = settings.BASE_DIR
-        self.model_lib = os.path.join(self.project_root, "model_lib")
-        
-        self.model_configs: Dict[str, dict] = {
-            "frcrn-ans": {
-                "model_id": "iic/speech_frcrn_ans_cirm_16k",
-                "local_path": os.path.join(self.model_lib, "iic", "speech_frcrn_ans_cirm_16k"),
-                "required": False,
-                "description": "FRCRN声学降噪模型，基于CIRM掩码的16kHz音频降噪，有效去除背景噪声",
-                "category": "audio_enhancement",
-                "config": {
-                    "device": "cuda:0" if self._is_cuda_available() else "cpu",
-                    "output_dir": "output"
-                },
-                "type": "enhancement",
-                "version": "v1.0.0"
+
+@dataclass(frozen=True, slots=True)
+class ModelSpec:
+    """单个模型的静态配置，未填写的字段使用与旧版字典配置一致的默认值"""
+    model_id: str                               # ModelScope 模型ID
+    local_path: str                             # 本地存放路径
+    required: bool = False                      # 是否为核心功能必需
+    description: str = ""
+    category: str = "unknown"
+    config: dict = field(default_factory=dict)  # 传给 AutoModel 的参数
+    type: str = "unknown"                       # offline / streaming / utility / enhancement
+    version: str = "latest"
+    streaming_config: Optional[dict] = None     # 仅流式模型使用
+
+
+# 说话人分离流程依赖的模型分类
+SPEAKER_SEPARATION_CATEGORIES = ("speaker_separation", "voice_activity_detection", "text_processing", "speaker_recognition")
+
+
+def _nvml_device_count() -> Optional[int]:
+    """
+    通过NVML查询可见GPU数量，不会初始化CUDA上下文
+    
+    Returns:
+        GPU数量；未安装pynvml或NVML不可用时返回None
+    """
+    try:
+        import pynvml
+    except ImportError:
+        return None
+    
+    try:
+        pynvml.nvmlInit()
+    except pynvml.NVMLError:
+        return None
+    try:
+        count = pynvml.nvmlDeviceGetCount()
+    except pynvml.NVMLError:
+        return None
+    finally:
+        pynvml.nvmlShutdown()
+    
+    # 与CUDA运行时保持一致：CUDA_VISIBLE_DEVICES 在第一个非法项处截断
+    visible = os.environ.get("CUDA_VISIBLE_DEVICES")
+    if visible is not None:
+        visible_count = 0
+        for item in visible.split(","):
+            item = item.strip()
+            if not item or item.startswith("-"):
+                break
+            visible_count += 1
+        count = min(count, visible_count)
+    return count
+
+
+@lru_cache(maxsize=1)
+def _is_cuda_available() -> bool:
+    """检查CUDA是否可用（进程内只探测一次，优先使用NVML避免初始化CUDA）"""
+    try:
+        import torch
+    except ImportError:
+        return False
+    
+    device_count = _nvml_device_count()
+    if device_count is None:
+        return torch.cuda.is_available()
+    # 有GPU还需要torch本身是CUDA构建版本，is_built() 同样不会初始化CUDA
+    return device_count > 0 and torch.backends.cuda.is_built()
+
+
+@lru_cache(maxsize=1)
+def get_cuda_device_count() -> int:
+    """获取可用GPU数量（进程内只探测一次，优先使用NVML避免初始化CUDA）"""
+    if not _is_cuda_available():
+        return 0
+    device_count = _nvml_device_count()
+    if device_count is None:
+        import torch
+        device_count = torch.cuda.device_count()
+    return device_count
+
+
+@lru_cache(maxsize=1)
+def get_default_device() -> str:
+    """
+    获取模型默认运行设备（进程内只探测一次）
+    
+    可通过环境变量 MEETVOICE_DEVICE 指定设备（如 "cpu"、"cuda:1"），跳过自动探测
+    
+    Returns:
+        带序号的设备字符串，按 cuda > xpu > hpu 的优先级选择，都不可用时返回 "cpu"
+    """
+    device = os.environ.get("MEETVOICE_DEVICE", "").strip()
+    if device:
+        return device
+    
+    if _is_cuda_available():
+        return "cuda:0"
+    
+    try:
+        import torch
+    except ImportError:
+        return "cpu"
+    
+    # Intel GPU（torch>=2.4 内置 xpu 后端）
+    xpu = getattr(torch, "xpu", None)
+    if xpu is not None and xpu.is_available():
+        return "xpu:0"
+    
+    # Habana Gaudi，需要先导入插件才会注册 hpu 后端
+    try:
+        import habana_frameworks.torch.core  # noqa: F401
+    except ImportError:
+        pass
+    else:
+        if torch.hpu.is_available():
+            return "hpu:0"
+    
+    return "cpu"
+
+
+@lru_cache(maxsize=None)
+def _build_model_configs(model_lib: str) -> Dict[str, ModelSpec]:
+    """构建模型配置表（按 model_lib 缓存，只构建一次）"""
+    device = get_default_device()
+
+    return {
+        "frcrn-ans": ModelSpec(
+            model_id="iic/speech_frcrn_ans_cirm_16k",
+            local_path=os.path.join(model_lib, "iic", "speech_frcrn_ans_cirm_16k"),
+            required=False,
+            description="FRCRN声学降噪模型，基于CIRM掩码的16kHz音频降噪，有效去除背景噪声",
+            category="audio_enhancement",
+            config={
+                "device": device,
+                "output_dir": "output"
             },
-            "sense_voice": {
-                "model_id": "iic/SenseVoiceSmall",
-                "local_path": os.path.join(self.model_lib, "iic", "SenseVoiceSmall"),
-                "required": True,
-                "description": "高精度多语言语音识别模型，支持中英文混合识别，具备情感识别和事件检测能力",
-                "category": "speech_recognition",
-                "config": {
-                    "vad_model": "fsmn-vad",
-                    "vad_kwargs": {"max_single_segment_time": 30000},
-                    "device": "cuda:0" if self._is_cuda_available() else "cpu"
-                },
-                "type": "offline"
+            type="enhancement",
+            version="v1.0.0"
+        ),
+        "sense_voice": ModelSpec(
+            model_id="iic/SenseVoiceSmall",
+            local_path=os.path.join(model_lib, "iic", "SenseVoiceSmall"),
+            required=True,
+            description="高精度多语言语音识别模型，支持中英文混合识别，具备情感识别和事件检测能力",
+            category="speech_recognition",
+            config={
+                "vad_model": "fsmn-vad",
+                "vad_kwargs": {"max_single_segment_time": 30000},
+                "device": device
             },
-            "paraformer-zh-streaming": {
-                "model_id": "iic/speech_paraformer-large_asr_nat-zh-cn-16k-common-vocab8404-online",
-                "local_path": os.path.join(self.model_lib, "iic", "speech_paraformer-large_asr_nat-zh-cn-16k-common-vocab8404-online"),
-                "required": True,
-                "description": "中文流式语音识别模型，支持实时语音转文字，低延迟高准确率",
-                "category": "speech_recognition",
-                "config": {
-                    "device": "cuda:0" if self._is_cuda_available() else "cpu",                    
-                },
-                "type": "streaming",
-                "version": "v2.0.4",
-                "streaming_config": {
-                    "chunk_size": [0, 10, 5],  # [0, 10, 5] 600ms, [0, 8, 4] 480ms
-                    "encoder_chunk_look_back": 4,
-                    "decoder_chunk_look_back": 1,
-                    "chunk_stride_ms": 600  # 600ms stride
-                }
+            type="offline"
+        ),
+        "paraformer-zh-streaming": ModelSpec(
+            model_id="iic/speech_paraformer-large_asr_nat-zh-cn-16k-common-vocab8404-online",
+            local_path=os.path.join(model_lib, "iic", "speech_paraformer-large_asr_nat-zh-cn-16k-common-vocab8404-online"),
+            required=True,
+            description="中文流式语音识别模型，支持实时语音转文字，低延迟高准确率",
+            category="speech_recognition",
+            config={
+                "device": device,
             },
-            
-            # === 说话人分离相关模型 ===
-            "paraformer-zh-large": {
-                "model_id": "iic/speech_seaco_paraformer_large_asr_nat-zh-cn-16k-common-vocab8404-pytorch",
-                "local_path": os.path.join(self.model_lib, "iic", "speech_seaco_paraformer_large_asr_nat-zh-cn-16k-common-vocab8404-pytorch"),
-                "required": False,
-                "description": "大型中文语音识别模型，用于说话人分离场景下的高精度语音识别",
-                "category": "speaker_separation",
-                "config": {
-                    "device": "cuda:0" if self._is_cuda_available() else "cpu",
-                    "batch_size_s": 300
-                },
-                "type": "offline",
-                "version": "v2.0.4"
+            type="streaming",
+            version="v2.0.4",
+            streaming_config={
+                "chunk_size": [0, 10, 5],  # [0, 10, 5] 600ms, [0, 8, 4] 480ms
+                "encoder_chunk_look_back": 4,
+                "decoder_chunk_look_back": 1,
+                "chunk_stride_ms": 600  # 600ms stride
+            }
+        ),
+        
+        # === 说话人分离相关模型 ===
+        "paraformer-zh-large": ModelSpec(
+            model_id="iic/speech_seaco_paraformer_large_asr_nat-zh-cn-16k-common-vocab8404-pytorch",
+            local_path=os.path.join(model_lib, "iic", "speech_seaco_paraformer_large_asr_nat-zh-cn-16k-common-vocab8404-pytorch"),
+            required=False,
+            description="大型中文语音识别模型，用于说话人分离场景下的高精度语音识别",
+            category="speaker_separation",
+            config={
+                "device": device,
+                "batch_size_s": 300
             },
-            "fsmn-vad": {
-                "model_id": "iic/speech_fsmn_vad_zh-cn-16k-common-pytorch",
-                "local_path": os.path.join(self.model_lib, "iic", "speech_fsmn_vad_zh-cn-16k-common-pytorch"),
-                "required": False,
-                "description": "基于FSMN的语音活动检测模型，用于检测语音的起止时间点",
-                "category": "voice_activity_detection",
-                "config": {
-                    "device": "cuda:0" if self._is_cuda_available() else "cpu"
-                },
-                "type": "utility",
-                "version": "v2.0.4"
+            type="offline",
+            version="v2.0.4"
+        ),
+        "fsmn-vad": ModelSpec(
+            model_id="iic/speech_fsmn_vad_zh-cn-16k-common-pytorch",
+            local_path=os.path.join(model_lib, "iic", "speech_fsmn_vad_zh-cn-16k-common-pytorch"),
+            required=False,
+            description="基于FSMN的语音活动检测模型，用于检测语音的起止时间点",
+            category="voice_activity_detection",
+            config={
+                "device": device
             },
-            "punc-transformer": {
-                "model_id": "iic/punc_ct-transformer_zh-cn-common-vocab272727-pytorch",
-                "local_path": os.path.join(self.model_lib, "iic", "punc_ct-transformer_zh-cn-common-vocab272727-pytorch"),
-                "required": False,
-                "description": "基于Transformer的中文标点符号预测模型，为识别结果添加标点符号",
-                "category": "text_processing",
-                "config": {
-                    "device": "cuda:0" if self._is_cuda_available() else "cpu"
-                },
-                "type": "utility",
-                "version": "v2.0.4"
+            type="utility",
+            version="v2.0.4"
+        ),
+        "punc-transformer": ModelSpec(
+            model_id="iic/punc_ct-transformer_zh-cn-common-vocab272727-pytorch",
+            local_path=os.path.join(model_lib, "iic", "punc_ct-transformer_zh-cn-common-vocab272727-pytorch"),
+            required=False,
+            description="基于Transformer的中文标点符号预测模型，为识别结果添加标点符号",
+            category="text_processing",
+            config={
+                "device": device
             },
-            "campplus-speaker": {
-                "model_id": "iic/speech_campplus_sv_zh-cn_16k-common",
-                "local_path": os.path.join(self.model_lib, "iic", "speech_campplus_sv_zh-cn_16k-common"),
-                "required": False,
-                "description": "基于CAM++的说话人识别模型，用于区分不同说话人的语音特征",
-                "category": "speaker_recognition",
-                "config": {
-                    "device": "cuda:0" if self._is_cuda_available() else "cpu"
-                },
-                "type": "utility",
-                "version": "v2.0.2"
-            }
-        }
+            type="utility",
+            version="v2.0.4"
+        ),
+        "campplus-speaker": ModelSpec(
+            model_id="iic/speech_campplus_sv_zh-cn_16k-common",
+            local_path=os.path.join(model_lib, "iic", "speech_campplus_sv_zh-cn_16k-common"),
+            required=False,
+            description="基于CAM++的说话人识别模型，用于区分不同说话人的语音特征",
+            category="speaker_recognition",
+            config={
+                "device": device
+            },
+            type="utility",
+            version="v2.0.2"
+        )
+    }
+
+
+@lru_cache(maxsize=None)
+def _build_model_index(model_lib: str) -> Tuple[Dict[str, Dict[str, ModelSpec]], Dict[str, ModelSpec], Dict[str, ModelSpec], Dict[str, ModelSpec]]:
+    """一次遍历建立索引：(分类→模型, 必需模型, 可选模型, 说话人分离模型)"""
+    by_category: Dict[str, Dict[str, ModelSpec]] = {}
+    required: Dict[str, ModelSpec] = {}
+    optional: Dict[str, ModelSpec] = {}
+    
+    for model_name, spec in _build_model_configs(model_lib).items():
+        by_category.setdefault(spec.category, {})[model_name] = spec
+        if spec.required:
+            required[model_name] = spec
+        else:
+            optional[model_name] = spec
+    
+    speaker: Dict[str, ModelSpec] = {}
+    for category in SPEAKER_SEPARATION_CATEGORIES:
+        speaker.update(by_category.get(category, {}))
+    
+    return by_category, required, optional, speaker
+
+
+_EMPTY_MODELS: Dict[str, ModelSpec] = {}
+
+
+class ModelConfig:
+    def __init__(self):
+        self.project_root = settings.BASE_DIR
+        self.model_lib = os.path.join(self.project_root, "model_lib")
+        self.model_configs: Dict[str, ModelSpec] = _build_model_configs(self.model_lib)
+        (self._by_category,
+         self._required_models,
+         self._optional_models,
+         self._speaker_models) = _build_model_index(self.model_lib)
     
-    def _is_cuda_available(self) -> bool:
-        """检查CUDA是否可用"""
-        try:
-            import torch
-            return torch.cuda.is_available()
-        except ImportError:
-            return False
+    def get_model_spec(self, model_name: str) -> Optional[ModelSpec]:
+        """获取模型完整配置"""
+        return self.model_configs.get(model_name)
     
     def get_model_path(self, model_name: str) -> Optional[str]:
         """获取模型本地路径"""
-        if model_name in self.model_configs:
-            return self.model_configs[model_name]["local_path"]
-        return None
+        spec = self.model_configs.get(model_name)
+        return spec.local_path if spec else None
 
     def get_model_id(self, model_name: str) -> Optional[str]:
         """获取模型在线ID"""
-        if model_name in self.model_configs:
-            return self.model_configs[model_name]["model_id"]
-        return None
+        spec = self.model_configs.get(model_name)
+        return spec.model_id if spec else None
 
     def get_model_config(self, model_name: str) -> Optional[dict]:
         """获取模型配置"""
-        if model_name in self.model_configs:
-            return self.model_configs[model_name]["config"]
-        return None
+        spec = self.model_configs.get(model_name)
+        return spec.config if spec else None
 
     def get_streaming_config(self, model_name: str) -> Optional[dict]:
         """获取流式配置"""
-        if model_name in self.model_configs:
-            return self.model_configs[model_name].get("streaming_config")
-        return None
+        spec = self.model_configs.get(model_name)
+        return spec.streaming_config if spec else None
     
     def get_model_description(self, model_name: str) -> Optional[str]:
         """获取模型描述"""
-        if model_name in self.model_configs:
-            return self.model_configs[model_name].get("description", "")
-        return None
+        spec = self.model_configs.get(model_name)
+        return spec.description if spec else None
     
     def get_model_category(self, model_name: str) -> Optional[str]:
         """获取模型分类"""
-        if model_name in self.model_configs:
-            return self.model_configs[model_name].get("category", "unknown")
-        return None
+        spec = self.model_configs.get(model_name)
+        return spec.category if spec else None
     
     def get_model_version(self, model_name: str) -> Optional[str]:
         """获取模型版本"""
-        if model_name in self.model_configs:
-            return self.model_configs[model_name].get("version", "latest")
-        return None
+        spec = self.model_configs.get(model_name)
+        return spec.version if spec else None
     
     def is_streaming_model(self, model_name: str) -> bool:
         """检查是否为流式模型"""
-        return self.model_configs.get(model_name, {}).get("type") == "streaming"
+        spec = self.model_configs.get(model_name)
+        return spec is not None and spec.type == "streaming"
 
     def is_model_required(self, model_name: str) -> bool:
         """检查模型是否必需"""
-        return self.model_configs.get(model_name, {}).get("required", False)
+        spec = self.model_configs.get(model_name)
+        return spec is not None and spec.required
     
-    def get_models_by_category(self, category: str) -> Dict[str, dict]:
+    # 以下查询返回缓存索引的只读视图，不复制；需要修改时请自行 dict(...)
+    def get_models_by_category(self, category: str) -> Mapping[str, ModelSpec]:
         """根据分类获取模型列表"""
-        models = {}
-        for model_name, config in self.model_configs.items():
-            if config.get("category") == category:
-                models[model_name] = config
-        return models
+        return MappingProxyType(self._by_category.get(category, _EMPTY_MODELS))
     
-    def get_speaker_separation_models(self) -> Dict[str, dict]:
+    def get_speaker_separation_models(self) -> Mapping[str, ModelSpec]:
         """获取说话人分离相关的所有模型"""
-        speaker_models = {}
-        categories = ["speaker_separation", "voice_activity_detection", "text_processing", "speaker_recognition"]
-        
-        for category in categories:
-            models = self.get_models_by_category(category)
-            speaker_models.update(models)
-        
-        return speaker_models
+        return MappingProxyType(self._speaker_models)
     
-    def get_required_models(self) -> Dict[str, dict]:
+    def get_required_models(self) -> Mapping[str, ModelSpec]:
         """获取所有必需的模型"""
-        required = {}
-        for model_name, config in self.model_configs.items():
-            if config.get("required", False):
-                required[model_name] = config
-        return required
+        return MappingProxyType(self._required_models)
     
-    def get_optional_models(self) -> Dict[str, dict]:
+    def get_optional_models(self) -> Mapping[str, ModelSpec]:
         """获取所有可选的模型"""
-        optional = {}
-        for model_name, config in self.model_configs.items():
-            if not config.get("required", False):
-                optional[model_name] = config
-        return optional
+        return MappingProxyType(self._optional_models)
     
     def list_all_models(self) -> Dict[str, dict]:
         """列出所有模型的详细信息"""
         model_info = {}
-        for model_name, config in self.model_configs.items():
+        for model_name, spec in self.model_configs.items():
             model_info[model_name] = {
                 "name": model_name,
-                "description": config.get("description", ""),
-                "category": config.get("category", "unknown"),
-                "type": config.get("type", "unknown"),
-                "required": config.get("required", False),
-                "version": config.get("version", "latest"),
-                "model_id": config.get("model_id", ""),
-                "local_path": config.get("local_path", "")
+                "description": spec.description,
+                "category": spec.category,
+                "type": spec.type,
+                "required": spec.required,
+                "version": spec.version,
+                "model_id": spec.model_id,
+                "local_path": spec.local_path
             }
         return model_info
     
@@ -220,33 +352,25 @@ class ModelConfig:
         print("📦 DotVoice 模型配置摘要")
         print("="*80)
         
-        # 按分类组织模型
-        categories = {}
-        for model_name, config in self.model_configs.items():
-            category = config.get("category", "unknown")
-            if category not in categories:
-                categories[category] = []
-            categories[category].append((model_name, config))
-        
         # 打印每个分类的模型
-        for category, models in categories.items():
+        for category, models in self._by_category.items():
             print(f"\n🏷️  {category.replace('_', ' ').title()}:")
             print("-" * 50)
             
-            for model_name, config in models:
-                required_mark = "🔴 必需" if config.get("required", False) else "🟡 可选"
+            for model_name, spec in models.items():
+                required_mark = "🔴 必需" if spec.required else "🟡 可选"
                 print(f"   {required_mark} {model_name}")
-                print(f"      📝 {config.get('description', '无描述')}")
-                print(f"      🏷️  类型: {config.get('type', 'unknown')}")
-                print(f"      📦 版本: {config.get('version', 'latest')}")
-                print(f"      🆔 ID: {config.get('model_id', '')}")
+                print(f"      📝 {spec.description or '无描述'}")
+                print(f"      🏷️  类型: {spec.type}")
+                print(f"      📦 版本: {spec.version}")
+                print(f"      🆔 ID: {spec.model_id}")
                 print()
         
         # 统计信息
         total_models = len(self.model_configs)
-        required_count = len(self.get_required_models())
-        optional_count = len(self.get_optional_models())
-        speaker_count = len(self.get_speaker_separation_models())
+        required_count = len(self._required_models)
+        optional_count = len(self._optional_models)
+        speaker_count = len(self._speaker_models)
         
         print("📊 统计信息:")
         print(f"   总模型数: {total_models}")
@@ -1,17 +1,30 @@
+from __future__ import annotations
+
 import sys
 import os
+import logging
+import re
 import time
-from typing import List, Tuple, Dict, Optional, Callable
-from config.model_config import ModelConfig
-from utils.download_manager import DownloadManager
-from utils.model_manager import ModelManager
-from utils.media_processor import MediaProcessor
-from services.audio_processor import AudioProcessor
-from services.speech_service import SpeechRecognitionService
-from services.streaming_speech_service import StreamingSpeechService
+import argparse
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from itertools import chain
+from typing import TYPE_CHECKING, FrozenSet, Iterable, Iterator, Sized, List, Tuple, Dict, Optional, Callable
+
+# 媒体格式表所在模块只依赖 soundfile，可以直接导入
+from utils.media_processor import MEDIA_EXTENSIONS, VIDEO_EXTENSIONS
+
+# 模型相关模块会连带导入 torch/funasr/modelscope，耗时数秒，
+# 只在真正需要识别时才导入，保证 --help 或无示例文件时快速返回
+if TYPE_CHECKING:
+    from services.audio_processor import AudioProcessor
 
 def initialize_models() -> bool:
     """初始化并下载所需模型"""
+    from config.model_config import ModelConfig
+    from utils.download_manager import DownloadManager
+    
     model_config = ModelConfig()
     download_manager = DownloadManager(model_config)
     
@@ -26,10 +39,45 @@ def initialize_models() -> bool:
     
     return all_success
 
-def find_project_example_audio() -> List[str]:
-    """查找项目根目录下 example 文件夹中的音频和视频文件"""
-    example_files = []
+
+def _iter_media_entries(directory: str) -> Iterator[os.DirEntry]:
+    """递归遍历目录，DirEntry 自带文件类型信息，无需额外 stat"""
+    with os.scandir(directory) as it:
+        for entry in it:
+            if entry.is_dir(follow_symlinks=False):
+                yield from _iter_media_entries(entry.path)
+            elif entry.is_file():
+                yield entry
+
+def _iter_example_dir(example_dir: str) -> Iterator[str]:
+    """边扫描边产出 example 目录中的媒体文件路径（按目录遍历顺序）"""
+    prefix_len = len(os.path.join(example_dir, ''))
     
+    for entry in _iter_media_entries(example_dir):
+        ext = os.path.splitext(entry.name)[1].lower()
+        if ext not in MEDIA_EXTENSIONS:
+            continue
+        
+        # 显示文件类型
+        relative_path = entry.path[prefix_len:]
+        if ext in VIDEO_EXTENSIONS:
+            print(f"✓ 找到视频: {relative_path}")
+        else:
+            print(f"✓ 找到音频: {relative_path}")
+        yield entry.path
+
+@lru_cache(maxsize=None)
+def _scan_example_dir(example_dir: str) -> Tuple[str, ...]:
+    """扫描 example 目录中的媒体文件并按文件名排序（结果按目录缓存）"""
+    return tuple(sorted(_iter_example_dir(example_dir)))
+
+def find_project_example_audio(sort: bool = False) -> Iterator[str]:
+    """
+    查找项目根目录下 example 文件夹中的音频和视频文件
+    
+    Args:
+        sort: 是否按文件名排序；排序需要先扫描完整个目录，默认边扫描边产出
+    """
     # 获取项目根目录
     project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
     example_dir = os.path.join(project_root, "example")
@@ -39,48 +87,78 @@ def find_project_example_audio() -> List[str]:
     if not os.path.exists(example_dir):
         print(f"❌ example 目录不存在: {example_dir}")
         print("💡 请在项目根目录创建 example 文件夹并放入音频/视频文件")
-        return example_files
-    
-    # 支持的媒体格式
-    media_extensions = (
-        # 音频格式
-        '.mp3', '.wav', '.m4a', '.flac', '.aac', '.ogg', '.wma',
-        # 视频格式
-        '.mp4', '.avi', '.mov', '.wmv', '.flv', '.mkv', '.webm', '.m4v'
-    )
+        return
     
     try:
         # 递归查找所有媒体文件
-        for root, dirs, files in os.walk(example_dir):
-            for file in files:
-                if file.lower().endswith(media_extensions):
-                    full_path = os.path.join(root, file)
-                    example_files.append(full_path)
-                    relative_path = os.path.relpath(full_path, example_dir)
-                    
-                    # 显示文件类型
-                    if file.lower().endswith(('.mp4', '.avi', '.mov', '.wmv', '.flv', '.mkv', '.webm', '.m4v')):
-                        print(f"✓ 找到视频: {relative_path}")
-                    else:
-                        print(f"✓ 找到音频: {relative_path}")
-        
-        # 按文件名排序
-        example_files.sort()
-        
+        if sort:
+            yield from _scan_example_dir(example_dir)
+        else:
+            yield from _iter_example_dir(example_dir)
     except Exception as e:
         print(f"❌ 查找媒体文件时出错: {e}")
-    
-    return example_files
 
-def compare_recognition_modes(processor: AudioProcessor, audio_file: str, language: str = "auto") -> Tuple[str, str, dict]:
-    """比较离线和流式识别模式"""
+# 支持的识别模式
+RECOGNITION_MODES = frozenset({'offline', 'streaming'})
+
+# 报告表格行模板
+_MODE_ROW = "│ {}    │ {:<55} │"
+_SUMMARY_ROW = "│ {:<23} │ {:<8} │ {:<8} │ {:<7} │ {:<7} │"
+
+def _ns_to_s(ns: int) -> float:
+    """纳秒整数转换为秒，仅用于显示"""
+    return ns / 1_000_000_000
+
+def _write_lines(lines: List[str]):
+    """整块写出报告，避免逐行 print 带来的多次刷新"""
+    sys.stdout.write("\n".join(lines) + "\n")
+    sys.stdout.flush()
+
+# 文件名中的语言标记 -> 识别语言代码
+_LANGUAGE_ALIASES = {
+    'en': 'en', 'english': 'en',
+    'zh': 'zh', 'cn': 'zh', 'chinese': 'zh',
+    'ja': 'ja', 'japanese': 'ja',
+    'ko': 'ko', 'korean': 'ko',
+    'yue': 'yue', 'cantonese': 'yue',
+}
+# 只匹配完整的语言标记（两侧不能是字母），避免 "lenovo.wav" 被误判为英文
+_LANGUAGE_RE = re.compile(
+    r'(?<![a-z])(' + '|'.join(sorted(_LANGUAGE_ALIASES, key=len, reverse=True)) + r')(?![a-z])'
+)
+
+def detect_language(file_name: str) -> str:
+    """根据文件名中的语言标记判断识别语言，未找到时返回 auto"""
+    match = _LANGUAGE_RE.search(file_name.lower())
+    return _LANGUAGE_ALIASES[match.group(1)] if match else "auto"
+
+# 预取深度：识别当前文件时，后台最多提前准备的文件数
+PREFETCH_DEPTH = 2
+
+def compare_recognition_modes(processor: AudioProcessor,
+                              audio_file: str,
+                              language: str = "auto",
+                              prepared_path: Optional[str] = None,
+                              modes: FrozenSet[str] = RECOGNITION_MODES) -> Tuple[str, str, dict]:
+    """
+    比较离线和流式识别模式
+    
+    Args:
+        processor: 音频处理器
+        audio_file: 原始媒体文件路径
+        language: 识别语言
+        prepared_path: 已预处理好的音频路径（由预取线程生成），为空时由处理器自行准备
+        modes: 需要运行的识别模式，默认离线和流式都运行
+    """
     file_name = os.path.basename(audio_file)
+    recognize_kwargs = {'audio_prepared': True} if prepared_path else {}
+    recognize_input = prepared_path or audio_file
     results = {
         'file_name': file_name,
         'offline_result': None,
         'streaming_result': None,
-        'offline_time': 0,
-        'streaming_time': 0,
+        'offline_time_ns': 0,
+        'streaming_time_ns': 0,
         'offline_error': None,
         'streaming_error': None
     }
@@ -91,215 +169,398 @@ def compare_recognition_modes(processor: AudioProcessor, audio_file: str, langua
     print(f"🌐 语言: {language}")
     print(f"{'='*60}")
     
-    print(f"\n🔄 正在进行流式识别...")
-    try:
-        start_time = time.time()
-        streaming_result = processor.process_single_audio(
-            audio_file, 
-            language=language, 
-            streaming=True
-        )
-        streaming_time = time.time() - start_time
+    if 'streaming' in modes:
+        print(f"\n🔄 正在进行流式识别...")
+        try:
+            start_ns = time.perf_counter_ns()
+            streaming_result = processor.process_single_audio(
+                recognize_input, 
+                language=language, 
+                streaming=True,
+                **recognize_kwargs
+            )
+            streaming_time_ns = time.perf_counter_ns() - start_ns
         
-        results['streaming_result'] = streaming_result
-        results['streaming_time'] = streaming_time
+            results['streaming_result'] = streaming_result
+            results['streaming_time_ns'] = streaming_time_ns
         
-        print(f"✅ 流式识别完成 (耗时: {streaming_time:.2f}秒)")
-        print(f"📝 结果: {streaming_result}")
+            print(f"✅ 流式识别完成 (耗时: {_ns_to_s(streaming_time_ns):.2f}秒)")
+            print(f"📝 结果: {streaming_result}")
         
-    except Exception as e:
-        results['streaming_error'] = str(e)
-        print(f"❌ 流式识别失败: {e}")
+        except Exception as e:
+            results['streaming_error'] = str(e)
+            print(f"❌ 流式识别失败: {e}")
 
-    print(f"\n🔄 正在进行离线识别...")
-    try:
-        start_time = time.time()
-        offline_result = processor.process_single_audio(
-            audio_file, 
-            language=language, 
-            streaming=False
-        )
-        offline_time = time.time() - start_time
+    if 'offline' in modes:
+        print(f"\n🔄 正在进行离线识别...")
+        try:
+            start_ns = time.perf_counter_ns()
+            offline_result = processor.process_single_audio(
+                recognize_input, 
+                language=language, 
+                streaming=False,
+                **recognize_kwargs
+            )
+            offline_time_ns = time.perf_counter_ns() - start_ns
         
-        results['offline_result'] = offline_result
-        results['offline_time'] = offline_time
+            results['offline_result'] = offline_result
+            results['offline_time_ns'] = offline_time_ns
         
-        print(f"✅ 离线识别完成 (耗时: {offline_time:.2f}秒)")
-        print(f"📝 结果: {offline_result}")
+            print(f"✅ 离线识别完成 (耗时: {_ns_to_s(offline_time_ns):.2f}秒)")
+            print(f"📝 结果: {offline_result}")
         
-    except Exception as e:
-        results['offline_error'] = str(e)
-        print(f"❌ 离线识别失败: {e}")
+        except Exception as e:
+            results['offline_error'] = str(e)
+            print(f"❌ 离线识别失败: {e}")
 
     # 结果对比
-    print(f"\n📊 结果对比:")
-    print(f"┌─────────────┬─────────────────────────────────────────────────────────┐")
-    print(f"│ 模式        │ 结果                                                    │")
-    print(f"├─────────────┼─────────────────────────────────────────────────────────┤")
-    
-    offline_display = results['offline_result'] if results['offline_result'] else f"错误: {results['offline_error']}"
-    streaming_display = results['streaming_result'] if results['streaming_result'] else f"错误: {results['streaming_error']}"
-    
-    # 截断过长的文本
-    offline_display = offline_display[:50] + "..." if len(offline_display) > 50 else offline_display
-    streaming_display = streaming_display[:50] + "..." if len(streaming_display) > 50 else streaming_display
-    
-    print(f"│ 离线模式    │ {offline_display:<55} │")
-    print(f"│ 流式模式    │ {streaming_display:<55} │")
-    print(f"└─────────────┴─────────────────────────────────────────────────────────┘")
-    
-    if results['offline_time'] > 0 and results['streaming_time'] > 0:
-        print(f"⏱️  性能对比:")
-        print(f"   离线模式: {results['offline_time']:.2f}秒")
-        print(f"   流式模式: {results['streaming_time']:.2f}秒")
+    lines = [
+        "\n📊 结果对比:",
+        "┌─────────────┬─────────────────────────────────────────────────────────┐",
+        "│ 模式        │ 结果                                                    │",
+        "├─────────────┼─────────────────────────────────────────────────────────┤",
+    ]
+    for mode, label in (('offline', "离线模式"), ('streaming', "流式模式")):
+        if mode not in modes:
+            continue
+        display = results[f'{mode}_result'] if results[f'{mode}_result'] else f"错误: {results[f'{mode}_error']}"
+        # 截断过长的文本
+        display = display[:50] + "..." if len(display) > 50 else display
+        lines.append(_MODE_ROW.format(label, display))
+    lines.append("└─────────────┴─────────────────────────────────────────────────────────┘")
+    
+    offline_ns = results['offline_time_ns']
+    streaming_ns = results['streaming_time_ns']
+    if offline_ns > 0 and streaming_ns > 0:
+        lines.append("⏱️  性能对比:")
+        lines.append(f"   离线模式: {_ns_to_s(offline_ns):.2f}秒")
+        lines.append(f"   流式模式: {_ns_to_s(streaming_ns):.2f}秒")
         
-        if results['offline_time'] < results['streaming_time']:
-            print(f"   🏆 离线模式更快 ({results['streaming_time']/results['offline_time']:.1f}x)")
+        if offline_ns < streaming_ns:
+            lines.append(f"   🏆 离线模式更快 ({streaming_ns/offline_ns:.1f}x)")
         else:
-            print(f"   🏆 流式模式更快 ({results['offline_time']/results['streaming_time']:.1f}x)")
+            lines.append(f"   🏆 流式模式更快 ({offline_ns/streaming_ns:.1f}x)")
+    
+    _write_lines(lines)
     
     return results['offline_result'], results['streaming_result'], results
 
-def auto_test_all_examples(processor: AudioProcessor, example_files: List[str]):
-    """自动测试所有示例音频文件"""
-    if not example_files:
+def warm_up_models(processor: AudioProcessor, modes: FrozenSet[str] = RECOGNITION_MODES):
+    """
+    用一段1秒的静音预热模型，在计时开始前完成模型加载、显存分配等一次性开销，
+    避免第一个测试文件的耗时明显偏高；预热耗时不计入测试报告
+    """
+    import numpy as np
+    
+    silence = np.zeros(16000, dtype=np.float32)
+    start_ns = time.perf_counter_ns()
+    
+    try:
+        if 'streaming' in modes:
+            for _ in processor.streaming_service.stream_recognize_chunks([silence]):
+                pass
+            processor.streaming_service.reset_cache()
+        if 'offline' in modes:
+            processor.speech_service.recognize(silence)
+    except Exception as e:
+        print(f"⚠️ 模型预热失败，将直接开始测试: {e}")
+        return
+    
+    print(f"🔥 模型预热完成 (耗时: {_ns_to_s(time.perf_counter_ns() - start_ns):.2f}秒)")
+
+def auto_test_all_examples(processor: AudioProcessor,
+                           example_files: Iterable[str],
+                           interactive: bool = True,
+                           modes: FrozenSet[str] = RECOGNITION_MODES):
+    """
+    自动测试所有示例音频文件
+    
+    Args:
+        processor: 音频处理器
+        example_files: 待测试的媒体文件，可以是边扫描边产出的迭代器
+        interactive: 是否在每个文件之间等待用户按键，关闭后连续测试
+        modes: 需要运行的识别模式
+    """
+    file_iter = iter(example_files)
+    first_file = next(file_iter, None)
+    if first_file is None:
         print("❌ 没有找到示例音频文件")
         return
     
-    print(f"\n🚀 开始自动测试 {len(example_files)} 个音频文件")
+    print(f"\n🚀 开始自动测试音频文件")
     print(f"{'='*80}")
     
+    example_files = chain((first_file,), file_iter)
+    
+    all_results = _run_examples(processor, example_files, interactive, modes)
+    
+    # 生成总结报告
+    generate_summary_report(all_results, modes=modes)
+
+def _run_examples(processor: AudioProcessor,
+                  example_files: Iterable[str],
+                  interactive: bool = False,
+                  modes: FrozenSet[str] = RECOGNITION_MODES) -> List[dict]:
+    """依次测试文件列表，返回每个文件的详细结果"""
     all_results = []
+    # 迭代器无法预知总数，只有列表等定长序列才显示总进度
+    total_files = len(example_files) if isinstance(example_files, Sized) else None
     
-    for i, audio_file in enumerate(example_files, 1):
-        file_name = os.path.basename(audio_file)
+    # 后台线程预先准备后续文件（格式探测/视频抽取音频），与当前文件的模型推理重叠；
+    # 模型推理本身仍在主线程串行执行
+    with ThreadPoolExecutor(max_workers=PREFETCH_DEPTH, thread_name_prefix="prefetch") as executor:
+        file_iter = iter(example_files)
+        pending = deque()
         
-        # 根据文件名智能判断语言
-        language = "auto"
-        if "en" in file_name.lower() or "english" in file_name.lower():
-            language = "en"
-        elif "zh" in file_name.lower() or "cn" in file_name.lower() or "chinese" in file_name.lower():
-            language = "zh"
-        elif "ja" in file_name.lower() or "japanese" in file_name.lower():
-            language = "ja"
-        elif "ko" in file_name.lower() or "korean" in file_name.lower():
-            language = "ko"
-        elif "yue" in file_name.lower() or "cantonese" in file_name.lower():
-            language = "yue"
+        def prefetch_next():
+            next_file = next(file_iter, None)
+            if next_file is not None:
+                # 后台线程的输出先收集起来，轮到该文件时再在主线程中打印
+                log: List[str] = []
+                pending.append((next_file, log, executor.submit(processor._prepare_audio_file, next_file, log)))
         
-        print(f"\n进度: [{i}/{len(example_files)}]")
+        for _ in range(PREFETCH_DEPTH):
+            prefetch_next()
         
-        try:
-            offline_result, streaming_result, detailed_results = compare_recognition_modes(
-                processor, audio_file, language
-            )
-            all_results.append(detailed_results)
+        i = 0
+        while pending:
+            audio_file, prepare_log, prepare_future = pending.popleft()
+            prefetch_next()
+            i += 1
+            file_name = os.path.basename(audio_file)
             
-        except Exception as e:
-            print(f"❌ 测试失败: {e}")
-            continue
+            # 根据文件名智能判断语言
+            language = detect_language(file_name)
+        
+            print(f"\n进度: [{i}/{total_files}]" if total_files else f"\n进度: [{i}]")
         
-        # 每个文件测试后暂停一下，让用户看清结果
-        if i < len(example_files):
-            input(f"\n按 Enter 继续测试下一个文件... ({i}/{len(example_files)})")
+            try:
+                prepared_path = prepare_future.result()
+                if prepare_log:
+                    print("\n".join(prepare_log))
+                if not prepared_path:
+                    print(f"❌ 音频准备失败: {audio_file}")
+                    continue
+                
+                offline_result, streaming_result, detailed_results = compare_recognition_modes(
+                    processor, audio_file, language, prepared_path=prepared_path, modes=modes
+                )
+                all_results.append(detailed_results)
+            
+            except Exception as e:
+                print(f"❌ 测试失败: {e}")
+                continue
+        
+            # 交互模式下每个文件测试后暂停一下，让用户看清结果
+            if interactive and pending:
+                input(f"\n按 Enter 继续测试下一个文件... (已完成 {i} 个)")
     
-    # 生成总结报告
-    generate_summary_report(all_results)
+    return all_results
+
+def _init_gpu_worker(device_index: int):
+    """GPU工作进程初始化：只暴露一块GPU，进程内模型配置的 cuda:0 即对应该卡"""
+    os.environ["CUDA_VISIBLE_DEVICES"] = str(device_index)
+
+def _run_examples_on_device(example_files: List[str], modes: FrozenSet[str]) -> List[dict]:
+    """GPU工作进程入口：独立创建处理器并测试分到的文件"""
+    import asyncio
+    from services.audio_processor import AudioProcessor
+    
+    processor = AudioProcessor()
+    try:
+        warm_up_models(processor, modes)
+        return _run_examples(processor, example_files, interactive=False, modes=modes)
+    finally:
+        asyncio.run(processor.cleanup())
+
+def auto_test_multi_gpu(example_files: List[str], device_count: int, modes: FrozenSet[str] = RECOGNITION_MODES):
+    """
+    多GPU并行测试：文件按轮询方式分片，每块GPU一个独立进程（spawn启动，避免fork后CUDA不可用），
+    结果在主进程汇总后统一生成报告
+    """
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    
+    shards = [example_files[i::device_count] for i in range(device_count)]
+    shards = [(device_index, shard) for device_index, shard in enumerate(shards) if shard]
+    
+    print(f"\n🚀 使用 {len(shards)} 块GPU并行测试 {len(example_files)} 个音频文件")
+    print(f"{'='*80}")
+    
+    mp_context = multiprocessing.get_context("spawn")
+    executors = []
+    futures = []
+    try:
+        for device_index, shard in shards:
+            executor = ProcessPoolExecutor(
+                max_workers=1,
+                mp_context=mp_context,
+                initializer=_init_gpu_worker,
+                initargs=(device_index,)
+            )
+            executors.append(executor)
+            futures.append((device_index, executor.submit(_run_examples_on_device, shard, modes)))
+        
+        all_results = []
+        for device_index, future in futures:
+            try:
+                all_results.extend(future.result())
+            except Exception as e:
+                print(f"❌ GPU {device_index} 测试失败: {e}")
+    finally:
+        for executor in executors:
+            executor.shutdown()
+    
+    # 按文件名恢复顺序后生成总结报告
+    all_results.sort(key=lambda r: r['file_name'])
+    generate_summary_report(all_results, modes=modes)
 
-def generate_summary_report(all_results: List[dict]):
-    """生成测试总结报告"""
+def generate_summary_report(all_results: List[dict], modes: FrozenSet[str] = RECOGNITION_MODES):
+    """生成测试总结报告（未运行的模式在表格中显示为 -）"""
     if not all_results:
         return
     
-    print(f"\n{'='*80}")
-    print(f"📋 测试总结报告")
-    print(f"{'='*80}")
+    lines = [
+        f"\n{'='*80}",
+        "📋 测试总结报告",
+        f"{'='*80}",
+    ]
     
     total_files = len(all_results)
     offline_success = sum(1 for r in all_results if r['offline_result'] is not None)
     streaming_success = sum(1 for r in all_results if r['streaming_result'] is not None)
     
-    print(f"📊 统计信息:")
-    print(f"   总文件数: {total_files}")
-    print(f"   离线成功: {offline_success}/{total_files} ({offline_success/total_files*100:.1f}%)")
-    print(f"   流式成功: {streaming_success}/{total_files} ({streaming_success/total_files*100:.1f}%)")
+    lines.append("📊 统计信息:")
+    lines.append(f"   总文件数: {total_files}")
+    if 'offline' in modes:
+        lines.append(f"   离线成功: {offline_success}/{total_files} ({offline_success/total_files*100:.1f}%)")
+    if 'streaming' in modes:
+        lines.append(f"   流式成功: {streaming_success}/{total_files} ({streaming_success/total_files*100:.1f}%)")
     
     # 性能统计
-    offline_times = [r['offline_time'] for r in all_results if r['offline_time'] > 0]
-    streaming_times = [r['streaming_time'] for r in all_results if r['streaming_time'] > 0]
+    offline_times = [r['offline_time_ns'] for r in all_results if r['offline_time_ns'] > 0]
+    streaming_times = [r['streaming_time_ns'] for r in all_results if r['streaming_time_ns'] > 0]
     
     if offline_times and streaming_times:
-        avg_offline = sum(offline_times) / len(offline_times)
-        avg_streaming = sum(streaming_times) / len(streaming_times)
+        avg_offline = _ns_to_s(sum(offline_times) // len(offline_times))
+        avg_streaming = _ns_to_s(sum(streaming_times) // len(streaming_times))
         
-        print(f"\n⏱️  平均耗时:")
-        print(f"   离线模式: {avg_offline:.2f}秒")
-        print(f"   流式模式: {avg_streaming:.2f}秒")
+        lines.append("\n⏱️  平均耗时:")
+        lines.append(f"   离线模式: {avg_offline:.2f}秒")
+        lines.append(f"   流式模式: {avg_streaming:.2f}秒")
         
         if avg_offline < avg_streaming:
-            print(f"   🏆 离线模式平均更快 ({avg_streaming/avg_offline:.1f}x)")
+            lines.append(f"   🏆 离线模式平均更快 ({avg_streaming/avg_offline:.1f}x)")
         else:
-            print(f"   🏆 流式模式平均更快 ({avg_offline/avg_streaming:.1f}x)")
+            lines.append(f"   🏆 流式模式平均更快 ({avg_offline/avg_streaming:.1f}x)")
     
     # 详细结果表格
-    print(f"\n📋 详细结果:")
-    print(f"┌─────────────────────────┬──────────┬──────────┬─────────┬─────────┐")
-    print(f"│ 文件名                  │ 离线状态 │ 流式状态 │ 离线耗时│ 流式耗时│")
-    print(f"├─────────────────────────┼──────────┼──────────┼─────────┼─────────┤")
+    lines.append("\n📋 详细结果:")
+    lines.append("┌─────────────────────────┬──────────┬──────────┬─────────┬─────────┐")
+    lines.append("│ 文件名                  │ 离线状态 │ 流式状态 │ 离线耗时│ 流式耗时│")
+    lines.append("├─────────────────────────┼──────────┼──────────┼─────────┼─────────┤")
     
     for result in all_results:
-        name = result['file_name'][:23]  # 截断文件名
-        offline_status = "✅" if result['offline_result'] else "❌"
-        streaming_status = "✅" if result['streaming_result'] else "❌"
-        offline_time = f"{result['offline_time']:.1f}s" if result['offline_time'] > 0 else "N/A"
-        streaming_time = f"{result['streaming_time']:.1f}s" if result['streaming_time'] > 0 else "N/A"
-        
-        print(f"│ {name:<23} │ {offline_status:<8} │ {streaming_status:<8} │ {offline_time:<7} │ {streaming_time:<7} │")
+        lines.append(_SUMMARY_ROW.format(
+            result['file_name'][:23],  # 截断文件名
+            ("✅" if result['offline_result'] else "❌") if 'offline' in modes else "-",
+            ("✅" if result['streaming_result'] else "❌") if 'streaming' in modes else "-",
+            f"{_ns_to_s(result['offline_time_ns']):.1f}s" if result['offline_time_ns'] > 0 else "N/A",
+            f"{_ns_to_s(result['streaming_time_ns']):.1f}s" if result['streaming_time_ns'] > 0 else "N/A",
+        ))
     
-    print(f"└─────────────────────────┴──────────┴──────────┴─────────┴─────────┘")
+    lines.append("└─────────────────────────┴──────────┴──────────┴─────────┴─────────┘")
+    _write_lines(lines)
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description="Dot Voice 语音识别自动测试系统")
+    parser.add_argument(
+        "--non-interactive",
+        dest="interactive",
+        action="store_false",
+        default=sys.stdin.isatty(),
+        help="不等待用户输入，连续测试所有文件（非终端环境下默认开启）"
+    )
+    parser.add_argument(
+        "--mode",
+        choices=("both", "offline", "streaming"),
+        default="both",
+        help="识别模式：只运行离线、只运行流式，或两者对比（默认）"
+    )
+    args = parser.parse_args(argv)
+    args.modes = RECOGNITION_MODES if args.mode == "both" else frozenset({args.mode})
+    return args
 
 def main():
+    args = parse_args()
+    
     print("🎵 Dot Voice 语音识别自动测试系统")
     print("📁 自动查找项目根目录下 example 文件夹中的音频/视频文件")
     print("🎬 支持视频格式: MP4, AVI, MOV, WMV, FLV, MKV, WEBM, M4V")
     print("🎵 支持音频格式: MP3, WAV, M4A, FLAC, AAC, OGG, WMA")
     
+    # 查找项目根目录下的示例音频文件（无需加载模型）
+    print("\n🔍 查找示例音频文件...")
+    # 交互模式需要先确认文件数量，按文件名排序后一次性列出；否则边扫描边测试
+    example_iter = find_project_example_audio(sort=args.interactive)
+    first_file = next(example_iter, None)
+    
+    if first_file is None:
+        print("\n💡 请在项目根目录创建 example 文件夹并放入音频/视频文件")
+        print("   支持的格式: .mp3, .wav, .m4a, .flac, .aac, .ogg, .wma, .mp4, .avi, .mov, .wmv, .flv, .mkv, .webm, .m4v")
+        return
+    
+    example_files = chain((first_file,), example_iter)
+    
+    # 询问是否开始自动测试
+    if args.interactive:
+        example_files = list(example_files)
+        print(f"\n✅ 找到 {len(example_files)} 个媒体文件")
+        response = input(f"\n🚀 是否开始自动测试所有音频文件? (y/n，默认y): ").strip().lower()
+        if response == 'n':
+            print("✋ 用户取消测试")
+            return
+    
     # 初始化模型
     print("\n🔧 初始化模型...")
     if not initialize_models():
         print("❌ 模型初始化失败，程序退出")
         sys.exit(1)
     
+    # 多GPU且无需交互时，每块GPU一个进程并行测试
+    if not args.interactive:
+        from conf.model import get_cuda_device_count
+        device_count = get_cuda_device_count()
+        if device_count > 1:
+            auto_test_multi_gpu(list(example_files), device_count, args.modes)
+            print("\n👋 程序退出")
+            return
+    
     # 创建音频处理器
     print("🔧 创建音频处理器...")
+    from services.audio_processor import AudioProcessor
     processor = AudioProcessor()
     
     try:
-        # 查找项目根目录下的示例音频文件
-        print("\n🔍 查找示例音频文件...")
-        example_files = find_project_example_audio()
-        
-        if not example_files:
-            print("\n💡 请在项目根目录创建 example 文件夹并放入音频/视频文件")
-            print("   支持的格式: .mp3, .wav, .m4a, .flac, .aac, .ogg, .wma, .mp4, .avi, .mov, .wmv, .flv, .mkv, .webm, .m4v")
-            return
-        
-        print(f"\n✅ 找到 {len(example_files)} 个媒体文件")
+        # 预热模型，排除首次推理的冷启动开销
+        print("🔧 预热模型...")
+        warm_up_models(processor, args.modes)
         
-        # 询问是否开始自动测试
-        response = input(f"\n🚀 是否开始自动测试所有音频文件? (y/n，默认y): ").strip().lower()
-        if response != 'n':
-            auto_test_all_examples(processor, example_files)
-        else:
-            print("✋ 用户取消测试")
+        auto_test_all_examples(processor, example_files, interactive=args.interactive, modes=args.modes)
         
     except Exception as e:
         print(f"❌ 运行时错误: {str(e)}")
         import traceback
         traceback.print_exc()
     finally:
-        processor.cleanup()
+        import asyncio
+        from utils.model_manager import release_device_memory
+        asyncio.run(processor.cleanup())
+        release_device_memory()
         print("\n👋 程序退出")
 
 if __name__ == "__main__":
+    # 各服务的进度信息通过 logging 输出，命令行下按原样打印 INFO 级别消息
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     main()
\ No newline at end of file
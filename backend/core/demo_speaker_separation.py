@@ -5,10 +5,56 @@
 """
 
 import os
-from typing import Optional, Dict, List
+import logging
+import asyncio
+import threading
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable, Optional, Dict, List
+from tqdm import tqdm
 from services.audio_processor import AudioProcessor
 from utils.download_manager import DownloadManager
+from utils.model_manager import release_device_memory
+from utils.media_processor import MEDIA_EXTENSIONS
 from config.model_config import ModelConfig  # 添加这行导入
+from conf.model import get_cuda_device_count, get_default_device
+
+@lru_cache(maxsize=1)
+def _get_model_config() -> ModelConfig:
+    """模型配置在进程内只创建一次，重复运行演示时复用"""
+    return ModelConfig()
+
+@lru_cache(maxsize=1)
+def _get_download_manager() -> DownloadManager:
+    """下载管理器在进程内只创建一次，重复运行演示时复用"""
+    return DownloadManager(_get_model_config())
+
+# 预处理缓存目录：MEETVOICE_CACHE=default|off|<路径>，默认 ~/.meetvoice/cache
+DEFAULT_CACHE_DIR = os.path.join("~", ".meetvoice", "cache")
+
+def _resolve_cache_dir(value: Optional[str] = None) -> Optional[str]:
+    """解析缓存设置，返回缓存目录，off 表示关闭缓存"""
+    value = (value or os.environ.get("MEETVOICE_CACHE") or "default").strip()
+    if value.lower() == "off":
+        return None
+    if value.lower() == "default":
+        value = DEFAULT_CACHE_DIR
+    return os.path.expanduser(value)
+
+@dataclass(slots=True)
+class AudioEntry:
+    """发现阶段一次性记录的媒体文件信息，后续展示无需再拆路径或 stat"""
+    path: str
+    name: str
+    size_mb: float
+
+def _find_media_files(example_dir: str) -> List[AudioEntry]:
+    """一次 scandir 遍历目录，文件大小取自目录项无需再次 stat"""
+    with os.scandir(example_dir) as it:
+        return [AudioEntry(entry.path, entry.name, entry.stat().st_size / (1 << 20)) for entry in it
+                if entry.is_file() and os.path.splitext(entry.name)[1].lower() in MEDIA_EXTENSIONS]
 
 def progress_callback(message: str, progress: int):
     """进度回调函数"""
@@ -17,7 +63,178 @@ def progress_callback(message: str, progress: int):
     else:
         print(f"[ERROR] {message}")
 
-def _select_audio_file(audio_files: List[str]) -> Optional[str]:
+# 批量模式工作进程内的处理器与进度队列（模型在首个文件处理时加载，进程内复用）
+_worker_processor: Optional[AudioProcessor] = None
+_worker_progress_queue = None
+
+def _init_batch_worker(progress_queue, device_queue):
+    """
+    批量模式工作进程初始化：创建处理器，进度消息通过队列转发给主进程
+    
+    GPU模式下每个进程从 device_queue 领取一块GPU，只暴露这一块，进程内模型配置的 cuda:0 即对应该卡
+    """
+    global _worker_processor, _worker_progress_queue
+    if device_queue is not None:
+        os.environ["CUDA_VISIBLE_DEVICES"] = device_queue.get()
+    _worker_progress_queue = progress_queue
+    _worker_processor = AudioProcessor(cache_dir=_resolve_cache_dir())
+
+def _plan_batch_workers(file_count: int) -> List[Optional[str]]:
+    """
+    规划批量模式的工作进程，返回每个进程绑定的GPU编号（None 表示不绑定）
+    
+    每个进程都会加载完整的识别+说话人分离管道：GPU上每块卡只放一个进程，避免同一块卡上多份模型显存溢出；
+    只有CPU推理时才按CPU核数启动多个进程
+    """
+    device = get_default_device()
+    if device == "cpu":
+        return [None] * min(file_count, max(1, (os.cpu_count() or 2) // 2))
+    if not device.startswith("cuda") or os.environ.get("MEETVOICE_DEVICE"):
+        # 指定了设备或使用 xpu/hpu 时只有一块可用的卡
+        return [None]
+    
+    visible = os.environ.get("CUDA_VISIBLE_DEVICES")
+    device_ids = [d.strip() for d in visible.split(",") if d.strip()] if visible else []
+    gpu_count = get_cuda_device_count()
+    if not device_ids:
+        device_ids = [str(i) for i in range(gpu_count)]
+    device_ids = device_ids[:max(1, min(gpu_count, file_count))]
+    return device_ids
+
+def _run_one(audio_file: str, output_dir: str, hotwords: Optional[List[str]]) -> Dict:
+    """在工作进程中对单个文件执行说话人分离"""
+    file_name = os.path.basename(audio_file)
+    
+    def queue_progress(message: str, progress: int):
+        _worker_progress_queue.put((file_name, message, progress))
+    
+    try:
+        return _worker_processor.separate_speakers(
+            audio_file,
+            output_dir,
+            merge_threshold=10,
+            save_audio_segments=True,
+            save_merged_audio=True,
+            hotwords=hotwords,
+            progress_callback=queue_progress
+        )
+    finally:
+        # 工作进程退出时不会执行 cleanup，逐个文件清理视频抽取出的临时音频
+        while _worker_processor.temp_files:
+            temp_file = _worker_processor.temp_files.pop()
+            try:
+                if os.path.exists(temp_file):
+                    os.remove(temp_file)
+            except OSError as e:
+                print(f"⚠️ 清理临时文件失败: {e}")
+
+def _drain_progress(progress_queue):
+    """主进程中统一显示各工作进程的进度，每个文件一个进度条，收到 None 时结束"""
+    bars: Dict[str, tqdm] = {}
+    for file_name, message, progress in iter(progress_queue.get, None):
+        bar = bars.get(file_name)
+        if progress < 0:
+            tqdm.write(f"[ERROR] {file_name}: {message}")
+            if bar is not None:
+                bars.pop(file_name).close()
+            continue
+        if bar is None:
+            bar = bars[file_name] = tqdm(total=100, desc=file_name, leave=False)
+        bar.set_postfix_str(message, refresh=False)
+        bar.update(progress - bar.n)
+        if progress >= 100:
+            bars.pop(file_name).close()
+    
+    for bar in bars.values():
+        bar.close()
+
+def _batch_separate_parallel(audio_files: List[str], output_dir: str, hotwords: Optional[List[str]]) -> List[Dict]:
+    """
+    多进程批量说话人分离，多个文件同时处理
+    
+    Args:
+        audio_files: 音频文件列表
+        output_dir: 输出目录
+        hotwords: 热词列表
+        
+    Returns:
+        处理结果列表（按完成顺序）
+    """
+    worker_devices = _plan_batch_workers(len(audio_files))
+    max_workers = len(worker_devices)
+    # spawn 启动，避免 fork 后子进程无法使用CUDA
+    mp_context = multiprocessing.get_context("spawn")
+    progress_queue = mp_context.Queue()
+    device_queue = None
+    if worker_devices[0] is not None:
+        device_queue = mp_context.Queue()
+        for device_id in worker_devices:
+            device_queue.put(device_id)
+    printer = threading.Thread(target=_drain_progress, args=(progress_queue,), daemon=True)
+    printer.start()
+    
+    print(f"🚀 使用 {max_workers} 个工作进程并行处理")
+    results = []
+    outer = tqdm(total=len(audio_files), desc="files", unit="file")
+    try:
+        with ProcessPoolExecutor(max_workers=max_workers,
+                                 mp_context=mp_context,
+                                 initializer=_init_batch_worker,
+                                 initargs=(progress_queue, device_queue)) as executor:
+            futures = {executor.submit(_run_one, audio_file, output_dir, hotwords): audio_file
+                       for audio_file in audio_files}
+            for future in as_completed(futures):
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    audio_file = futures[future]
+                    tqdm.write(f"❌ 处理文件失败: {audio_file}, 错误: {e}")
+                    results.append({'success': False, 'message': f'处理文件失败: {e}', 'audio_file': audio_file})
+                outer.update(1)
+    finally:
+        progress_queue.put(None)
+        printer.join()
+        outer.close()
+    
+    return results
+
+def _init_processor() -> AudioProcessor:
+    """创建音频处理器并加载（预热）说话人分离管道，在后台线程中执行"""
+    processor = AudioProcessor(cache_dir=_resolve_cache_dir())
+    try:
+        processor.speaker_service
+    except Exception:
+        asyncio.run(processor.cleanup())
+        raise
+    return processor
+
+def _start_processor_init() -> Future:
+    """在后台线程中初始化处理器，模型加载与用户选择文件同时进行"""
+    init_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="processor-init")
+    init_future = init_executor.submit(_init_processor)
+    init_executor.shutdown(wait=False)
+    return init_future
+
+def _wait_for_processor(init_future: Future) -> AudioProcessor:
+    """等待后台初始化的音频处理器就绪，初始化失败时抛出原异常"""
+    if not init_future.done():
+        print("\n⏳ 等待音频处理器初始化完成...")
+    processor = init_future.result()
+    print("✅ 音频处理器就绪")
+    return processor
+
+def _release_processor(init_future: Optional[Future]):
+    """等待后台初始化结束并清理处理器，释放模型及其占用的显存"""
+    if init_future is None:
+        return
+    try:
+        processor = init_future.result()
+    except Exception:
+        return
+    asyncio.run(processor.cleanup())
+    release_device_memory()
+
+def _select_audio_file(audio_files: List[AudioEntry]) -> Optional[AudioEntry]:
     """
     选择音频文件的辅助函数
     
@@ -25,17 +242,15 @@ def _select_audio_file(audio_files: List[str]) -> Optional[str]:
         audio_files: 音频文件列表
         
     Returns:
-        选中的音频文件路径，取消或错误返回None
+        选中的音频文件，取消或错误返回None
     """
     if len(audio_files) == 1:
         # 只有一个文件，直接返回
         return audio_files[0]
     
     print("\n请选择要处理的文件:")
-    for i, file in enumerate(audio_files, 1):
-        file_name = os.path.basename(file)
-        file_size = os.path.getsize(file) / (1024 * 1024)  # MB
-        print(f"   {i}. {file_name} ({file_size:.1f}MB)")
+    for i, entry in enumerate(audio_files, 1):
+        print(f"   {i}. {entry.name} ({entry.size_mb:.1f}MB)")
     
     try:
         while True:
@@ -49,7 +264,7 @@ def _select_audio_file(audio_files: List[str]) -> Optional[str]:
                 choice_idx = int(file_choice) - 1
                 if 0 <= choice_idx < len(audio_files):
                     selected_file = audio_files[choice_idx]
-                    print(f"✅ 已选择: {os.path.basename(selected_file)}")
+                    print(f"✅ 已选择: {selected_file.name}")
                     return selected_file
                 else:
                     print(f"❌ 编号超出范围，请输入 1-{len(audio_files)} 之间的数字")
@@ -65,13 +280,13 @@ def _select_audio_file(audio_files: List[str]) -> Optional[str]:
 
 def _print_analysis_result(result: Dict):
     """
-    打印完整分析结果的辅助函数
+    打印完整分析结果的辅助函数（使用 tqdm.write，不会打断正在显示的进度条）
     
     Args:
         result: 分析结果字典
     """
     if result.get('success', False):
-        print(f"\n✅ 完整分析完成!")
+        tqdm.write(f"\n✅ 完整分析完成!")
         
         # 显示降噪状态和模型信息
         if result.get('denoising_enabled', False):
@@ -81,13 +296,13 @@ def _print_analysis_result(result: Dict):
             model_status = denoising_model.get('status', 'unknown')
             
             if model_status == 'ready':
-                print(f"🔧 降噪模型: {model_name} ({model_type})")
+                tqdm.write(f"🔧 降噪模型: {model_name} ({model_type})")
             elif model_status == 'fallback':
-                print(f"🔧 降噪方法: {model_name} (FRCRN模型不可用时的回退方案)")
+                tqdm.write(f"🔧 降噪方法: {model_name} (FRCRN模型不可用时的回退方案)")
             else:
-                print(f"🔧 降噪: 已启用但状态未知")
+                tqdm.write(f"🔧 降噪: 已启用但状态未知")
         else:
-            print("🔧 降噪: 未启用")
+            tqdm.write("🔧 降噪: 未启用")
         
         # 显示语音识别结果
         speech_result = result.get('speech_recognition')
@@ -97,63 +312,182 @@ def _print_analysis_result(result: Dict):
             if len(speech_result) > preview_length:
                 text_preview = speech_result[:preview_length] + "..."
                 full_length = len(speech_result)
-                print(f"🎤 语音识别结果 ({full_length}字符): {text_preview}")
+                tqdm.write(f"🎤 语音识别结果 ({full_length}字符): {text_preview}")
             else:
-                print(f"🎤 语音识别结果: {speech_result}")
+                tqdm.write(f"🎤 语音识别结果: {speech_result}")
         else:
-            print("🎤 语音识别: 无结果")
+            tqdm.write("🎤 语音识别: 无结果")
         
         # 显示说话人分离结果
         speaker_result = result.get('speaker_separation')
         if speaker_result and speaker_result.get('success', False):
             speakers = speaker_result.get('speakers', [])
             speaker_count = len(speakers)
-            print(f"👥 说话人分离: 检测到 {speaker_count} 个说话人")
+            tqdm.write(f"👥 说话人分离: 检测到 {speaker_count} 个说话人")
             
             # 显示每个说话人的简要信息
             for i, speaker in enumerate(speakers[:3], 1):  # 最多显示前3个
                 duration = speaker.get('total_duration', 0)
                 segment_count = len(speaker.get('segments', []))
-                print(f"   说话人{i}: {duration:.1f}秒, {segment_count}个片段")
+                tqdm.write(f"   说话人{i}: {duration:.1f}秒, {segment_count}个片段")
             
             if len(speakers) > 3:
-                print(f"   ...还有{len(speakers) - 3}个说话人")
+                tqdm.write(f"   ...还有{len(speakers) - 3}个说话人")
             
             # 显示保存路径
             saved_paths = speaker_result.get('saved_paths', {})
             base_dir = saved_paths.get('base_dir')
             if base_dir:
-                print(f"📁 结果保存在: {base_dir}")
+                tqdm.write(f"📁 结果保存在: {base_dir}")
                 
                 # 显示主要输出文件
                 if 'summary_file' in saved_paths:
-                    print(f"   📄 分析报告: {os.path.basename(saved_paths['summary_file'])}")
+                    tqdm.write(f"   📄 分析报告: {os.path.basename(saved_paths['summary_file'])}")
                 if 'merged_audio_files' in saved_paths:
                     merged_files = saved_paths['merged_audio_files']
                     if merged_files:
-                        print(f"   🎵 合并音频: {len(merged_files)}个文件")
+                        tqdm.write(f"   🎵 合并音频: {len(merged_files)}个文件")
         else:
             speaker_error = speaker_result.get('message', '未知错误') if speaker_result else '无结果'
-            print(f"👥 说话人分离: 失败 ({speaker_error})")
+            tqdm.write(f"👥 说话人分离: 失败 ({speaker_error})")
         
         # 显示处理信息
         message = result.get('message', '')
         if message and message != '音频分析完成':
-            print(f"💬 处理信息: {message}")
+            tqdm.write(f"💬 处理信息: {message}")
             
     else:
         # 分析失败
         error_message = result.get('message', '未知错误')
-        print(f"\n❌ 分析失败: {error_message}")
+        tqdm.write(f"\n❌ 分析失败: {error_message}")
         
         # 如果有部分结果，也显示出来
         if result.get('speech_recognition'):
-            print(f"🎤 语音识别(部分): {result['speech_recognition'][:50]}...")
+            tqdm.write(f"🎤 语音识别(部分): {result['speech_recognition'][:50]}...")
         
         if result.get('speaker_separation'):
             speaker_msg = result['speaker_separation'].get('message', '')
             if speaker_msg:
-                print(f"👥 说话人分离错误: {speaker_msg}")
+                tqdm.write(f"👥 说话人分离错误: {speaker_msg}")
+
+
+def _choice_single(init_future: Future, audio_files: List[AudioEntry], output_dir: str, hotwords: List[str]):
+    """1. 单文件说话人分离"""
+    if len(audio_files) == 1:
+        audio_file = audio_files[0]
+    else:
+        print("\n请选择要处理的文件:")
+        for i, entry in enumerate(audio_files, 1):
+            print(f"   {i}. {entry.name}")
+
+        file_choice = int(input("请输入文件编号: ")) - 1
+        if 0 <= file_choice < len(audio_files):
+            audio_file = audio_files[file_choice]
+        else:
+            print("❌ 无效的文件编号")
+            return
+
+    processor = _wait_for_processor(init_future)
+    print(f"\n🔄 处理文件: {audio_file.name}")
+    result = processor.separate_speakers(
+        audio_file.path,
+        output_dir,
+        merge_threshold=10,
+        save_audio_segments=True,
+        save_merged_audio=True,
+        hotwords=hotwords,
+        progress_callback=progress_callback
+    )
+
+    if result['success']:
+        print(f"\n✅ 处理完成!")
+        print(f"📊 检测到 {len(result['speakers'])} 个说话人")
+        print(f"📁 结果保存在: {result['saved_paths']['base_dir']}")
+    else:
+        print(f"\n❌ 处理失败: {result['message']}")
+
+def _choice_batch(init_future: Optional[Future], audio_files: List[AudioEntry], output_dir: str, hotwords: List[str]):
+    """2. 批量说话人分离（多进程并行，不使用主进程的处理器）"""
+    print(f"\n🔄 批量处理 {len(audio_files)} 个文件...")
+    results = _batch_separate_parallel([entry.path for entry in audio_files], output_dir, hotwords)
+
+    success_count = sum(1 for r in results if r.get('success', False))
+    print(f"\n✅ 批量处理完成: {success_count}/{len(results)} 个文件成功")
+    print(f"📁 结果保存在: {output_dir}")
+
+def _choice_full(init_future: Future, audio_files: List[AudioEntry], output_dir: str, hotwords: List[str]):
+    """3. 完整音频分析（语音识别 + 说话人分离）"""
+    if len(audio_files) == 1:
+        audio_file = audio_files[0]
+    else:
+        print("\n请选择要分析的文件:")
+        for i, entry in enumerate(audio_files, 1):
+            print(f"   {i}. {entry.name}")
+
+        file_choice = int(input("请输入文件编号: ")) - 1
+        if 0 <= file_choice < len(audio_files):
+            audio_file = audio_files[file_choice]
+        else:
+            print("❌ 无效的文件编号")
+            return
+
+    processor = _wait_for_processor(init_future)
+    print(f"\n🔄 完整分析文件: {audio_file.name}")
+    result = processor.analyze_audio_with_all_features(
+        audio_file.path,
+        output_dir,
+        language="auto",
+        merge_threshold=10,
+        hotwords=hotwords
+    )
+
+    if result['success']:
+        print(f"\n✅ 完整分析完成!")
+        if result['speech_recognition']:
+            print(f"🎤 语音识别结果: {result['speech_recognition'][:100]}...")
+        if result['speaker_separation'] and result['speaker_separation']['success']:
+            print(f"👥 说话人分离: 检测到 {len(result['speaker_separation']['speakers'])} 个说话人")
+            print(f"📁 结果保存在: {result['speaker_separation']['saved_paths']['base_dir']}")
+    else:
+        print(f"\n❌ 分析失败: {result['message']}")
+
+def _choice_full_denoise(init_future: Future, audio_files: List[AudioEntry], output_dir: str, hotwords: List[str]):
+    """4. 完整音频分析 + FRCRN模型降噪"""
+    audio_file = _select_audio_file(audio_files)
+    if not audio_file:
+        return
+
+    processor = _wait_for_processor(init_future)
+    print(f"\n🔄 完整分析文件（启用FRCRN降噪）: {audio_file.name}")
+    print("💡 FRCRN模型能有效去除背景噪声，提升语音识别准确率")
+    print("⏱️  降噪处理可能需要额外时间，请耐心等待...")
+
+    result = processor.analyze_audio_with_all_features(
+        audio_file.path,
+        output_dir,
+        language="auto",
+        merge_threshold=10,
+        hotwords=hotwords,
+        enable_denoising=True  # 启用FRCRN降噪
+    )
+
+    _print_analysis_result(result)
+
+def _choice_exit(init_future: Optional[Future], audio_files: List[AudioEntry], output_dir: str, hotwords: List[str]):
+    """5. 退出"""
+    print("👋 退出程序")
+
+# 需要主进程处理器的菜单选项（批量模式在工作进程中各自创建处理器）
+_NEEDS_PROCESSOR = frozenset({"1", "3", "4"})
+
+# 菜单选项 -> 处理函数
+HANDLERS: Dict[str, Callable] = {
+    "1": _choice_single,
+    "2": _choice_batch,
+    "3": _choice_full,
+    "4": _choice_full_denoise,
+    "5": _choice_exit,
+}
 
 
 def demo_speaker_separation():
@@ -162,8 +496,7 @@ def demo_speaker_separation():
     
     # 1. 检查并下载模型
     print("🔄 检查说话人分离模型...")
-    model_config = ModelConfig()  # 创建 ModelConfig 实例
-    download_manager = DownloadManager(model_config)  # 传入 ModelConfig 实例
+    download_manager = _get_download_manager()
     
     # 下载模型并检查结果
     results = download_manager.download_speaker_separation_models()
@@ -175,17 +508,9 @@ def demo_speaker_separation():
         return
     
     print("✅ 所有必需模型下载完成")
+    print(f"🖥️  推理设备: {get_default_device()} (可通过环境变量 MEETVOICE_DEVICE 指定)")
     
-    # 2. 初始化处理器
-    print("\n🔄 初始化音频处理器...")
-    try:
-        processor = AudioProcessor()
-        print("✅ 音频处理器初始化完成")
-    except Exception as e:
-        print(f"❌ 初始化失败: {e}")
-        return
-    
-    # 3. 查找示例音频文件
+    # 2. 查找示例音频文件
     project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
     example_dir = os.path.join(project_root, "example")
     
@@ -195,20 +520,17 @@ def demo_speaker_separation():
         return
     
     # 查找音频文件
-    audio_files = []
-    for file in os.listdir(example_dir):
-        if file.lower().endswith(('.mp3', '.wav', '.m4a', '.flac', '.aac', '.mp4', '.avi', '.mov')):
-            audio_files.append(os.path.join(example_dir, file))
+    audio_files = _find_media_files(example_dir)
     
     if not audio_files:
         print(f"❌ 在 {example_dir} 中没有找到音频文件")
         return
     
     print(f"\n📁 找到 {len(audio_files)} 个媒体文件:")
-    for i, file in enumerate(audio_files, 1):
-        print(f"   {i}. {os.path.basename(file)}")
+    for i, entry in enumerate(audio_files, 1):
+        print(f"   {i}. {entry.name}")
     
-    # 4. 选择处理方式
+    # 3. 选择处理方式
     print("\n请选择处理方式:")
     print("1. 单文件说话人分离")
     print("2. 批量说话人分离")
@@ -222,6 +544,12 @@ def demo_speaker_separation():
         print("\n👋 用户取消操作")
         return
     
+    # 4. 需要处理器时在后台初始化，模型加载与用户选择文件同时进行
+    init_future = None
+    if choice in _NEEDS_PROCESSOR:
+        print("\n🔄 后台初始化音频处理器...")
+        init_future = _start_processor_init()
+    
     # 设置输出目录
     output_dir = os.path.join(project_root, "output", "speaker_separation")
     os.makedirs(output_dir, exist_ok=True)
@@ -230,120 +558,11 @@ def demo_speaker_separation():
     hotwords = ["AI", "zabbix", "snmp"]  # 示例热词
     
     try:
-        if choice == "1":
-            # 单文件处理
-            if len(audio_files) == 1:
-                audio_file = audio_files[0]
-            else:
-                print("\n请选择要处理的文件:")
-                for i, file in enumerate(audio_files, 1):
-                    print(f"   {i}. {os.path.basename(file)}")
-                
-                file_choice = int(input("请输入文件编号: ")) - 1
-                if 0 <= file_choice < len(audio_files):
-                    audio_file = audio_files[file_choice]
-                else:
-                    print("❌ 无效的文件编号")
-                    return
-            
-            print(f"\n🔄 处理文件: {os.path.basename(audio_file)}")
-            result = processor.separate_speakers(
-                audio_file,
-                output_dir,
-                merge_threshold=10,
-                save_audio_segments=True,
-                save_merged_audio=True,
-                hotwords=hotwords,
-                progress_callback=progress_callback
-            )
-            
-            if result['success']:
-                print(f"\n✅ 处理完成!")
-                print(f"📊 检测到 {len(result['speakers'])} 个说话人")
-                print(f"📁 结果保存在: {result['saved_paths']['base_dir']}")
-            else:
-                print(f"\n❌ 处理失败: {result['message']}")
-        
-        elif choice == "2":
-            # 批量处理
-            print(f"\n🔄 批量处理 {len(audio_files)} 个文件...")
-            results = processor.batch_separate_speakers(
-                audio_files,
-                output_dir,
-                merge_threshold=10,
-                save_audio_segments=True,
-                save_merged_audio=True,
-                hotwords=hotwords,
-                progress_callback=progress_callback
-            )
-            
-            success_count = sum(1 for r in results if r.get('success', False))
-            print(f"\n✅ 批量处理完成: {success_count}/{len(results)} 个文件成功")
-            print(f"📁 结果保存在: {output_dir}")
-        
-        elif choice == "3":
-            # 完整分析
-            if len(audio_files) == 1:
-                audio_file = audio_files[0]
-            else:
-                print("\n请选择要分析的文件:")
-                for i, file in enumerate(audio_files, 1):
-                    print(f"   {i}. {os.path.basename(file)}")
-                
-                file_choice = int(input("请输入文件编号: ")) - 1
-                if 0 <= file_choice < len(audio_files):
-                    audio_file = audio_files[file_choice]
-                else:
-                    print("❌ 无效的文件编号")
-                    return
-            
-            print(f"\n🔄 完整分析文件: {os.path.basename(audio_file)}")
-            result = processor.analyze_audio_with_all_features(
-                audio_file,
-                output_dir,
-                language="auto",
-                merge_threshold=10,
-                hotwords=hotwords
-            )
-            
-            if result['success']:
-                print(f"\n✅ 完整分析完成!")
-                if result['speech_recognition']:
-                    print(f"🎤 语音识别结果: {result['speech_recognition'][:100]}...")
-                if result['speaker_separation'] and result['speaker_separation']['success']:
-                    print(f"👥 说话人分离: 检测到 {len(result['speaker_separation']['speakers'])} 个说话人")
-                    print(f"📁 结果保存在: {result['speaker_separation']['saved_paths']['base_dir']}")
-            else:
-                print(f"\n❌ 分析失败: {result['message']}")
-        
-        elif choice == "4":
-            # 完整分析（启用FRCRN降噪）
-            audio_file = _select_audio_file(audio_files)
-            if not audio_file:
-                return
-            
-            print(f"\n🔄 完整分析文件（启用FRCRN降噪）: {os.path.basename(audio_file)}")
-            print("💡 FRCRN模型能有效去除背景噪声，提升语音识别准确率")
-            print("⏱️  降噪处理可能需要额外时间，请耐心等待...")
-            
-            result = processor.analyze_audio_with_all_features(
-                audio_file,
-                output_dir,
-                language="auto",
-                merge_threshold=10,
-                hotwords=hotwords,
-                enable_denoising=True  # 启用FRCRN降噪
-            )
-            
-            _print_analysis_result(result)
-
-        elif choice == "5":
-            print("👋 退出程序")
-            return
-        
-        else:
+        handler = HANDLERS.get(choice)
+        if handler is None:
             print("❌ 无效的选择")
             return
+        handler(init_future, audio_files, output_dir, hotwords)
     
     except (ValueError, IndexError):
         print("❌ 输入无效")
@@ -353,8 +572,10 @@ def demo_speaker_separation():
         import traceback
         traceback.print_exc()
     finally:
-        # 清理资源
-        processor.cleanup()
+        # 清理资源（提前退出时处理器可能仍在后台初始化，同样等待后清理）
+        _release_processor(init_future)
 
 if __name__ == "__main__":
+    # 各服务的进度信息通过 logging 输出，命令行下按原样打印 INFO 级别消息
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     demo_speaker_separation()
\ No newline at end of file
@@ -1,31 +1,111 @@
 import os
+import shutil
 import asyncio
+import hashlib
+import io
+import contextlib
 import logging
+import tempfile
+import itertools
 import numpy as np
-from time import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import cached_property
+from time import time, perf_counter
 from typing import AsyncIterator, Awaitable, List, Dict, Optional, Callable
 from core.utils.ffmpeg_manager import FFmpegAudioManager, FFmpegState
-from conf.model import ModelConfig
 from core.services.denoising_service import DenoisingService
-from core.utils.model_manager import ModelManager
+from core.utils.model_manager import get_model_manager
 from core.utils.media_processor import MediaProcessor
+from core.utils.pcm import pcm16_to_float32
 from core.services.speech_service import SpeechRecognitionService
 from core.services.streaming_speech_service import StreamingSpeechService
 from core.services.speaker_separation_service import SpeakerSeparationService
 
 logger = logging.getLogger(__name__)
 
+# 结果流无事件时的心跳间隔（秒）
+RESULTS_HEARTBEAT_INTERVAL = 30
+
+# 静音门限：整块采样峰值低于该值（约 -44 dBFS）时跳过转录
+SILENCE_PEAK_THRESHOLD = 200
+
+# 转录跟不上时最多积压的音频块数，积压的块合并为一次模型调用
+TRANSCRIBE_BATCH_MAX = 4
+
+# float32 缓冲池保留的缓冲区数：稳态下一块在转录、一块在填充，积压时多出的缓冲区用完即释放
+FLOAT_POOL_KEEP = 2
+
+# 临时文件多于该数量时放到线程池中删除，避免阻塞事件循环
+CLEANUP_OFFLOAD_THRESHOLD = 16
+
+# 批量处理时并行准备（探测/抽取音频）的最大文件数
+PREPARE_WORKERS = min(8, os.cpu_count() or 1)
+
+# 客户端音频帧合并写入FFmpeg的等待时间（秒）
+WRITE_COALESCE_DELAY = 0.02
+
+# 待写入FFmpeg的缓存超过该字节数时立即写入并等待完成，FFmpeg卡住时对客户端形成背压
+WRITE_BUFFER_HIGH_WATER = 64 * 1024
+
+# 预处理缓存容量上限（字节），超出时按最近使用时间淘汰最旧的条目
+CACHE_MAX_BYTES = 4 << 30
+
+# 预处理缓存条目的最长保留时间（秒），超过即删除
+CACHE_MAX_AGE = 7 * 24 * 3600
+
+# 音频流结束时用一小段静音（0.1秒）触发模型输出缓存中的尾部结果
+FLUSH_SAMPLES = 1600
+
+# 待转录队列中的停顿标记：语音后出现的第一个静音块处插入，转录器据此结束本段流式解码
+_FLUSH_MARKER = None
+
+# 转录结果中固定不变的字段，每次结果只复制后填入变化的部分
+_TRANSCRIPTION_RESULT_TEMPLATE = {
+    'confidence': 0.95,
+    'speaker_id': 'speaker_1',
+    'is_final': False
+}
+
+# 转录线程绑核时按实例轮流分配CPU
+_next_cpu_slot = itertools.count()
+
+
+def _pin_current_thread():
+    """把当前线程（及其后续创建的计算线程）绑定到一个CPU上，只在Linux上生效"""
+    if not hasattr(os, "sched_setaffinity"):
+        return
+    try:
+        cpus = sorted(os.sched_getaffinity(0))
+        cpu = cpus[next(_next_cpu_slot) % len(cpus)]
+        os.sched_setaffinity(0, {cpu})
+        logger.info(f"转录线程已绑定到CPU {cpu}")
+    except OSError as e:
+        logger.warning(f"转录线程绑核失败: {e}")
+
+
+def _as_async_callback(callback: Optional[Callable]) -> Optional[Callable[..., Awaitable[None]]]:
+    """把sync/async回调统一为可await的调用，只在设置回调时判断一次"""
+    if callback is None or asyncio.iscoroutinefunction(callback):
+        return callback
+
+    async def _invoke(*args):
+        callback(*args)
+    return _invoke
+
 class AudioProcessor:
     """音频处理业务逻辑"""
     
     def __init__(self, **kwargs):
-        self.model_config = ModelConfig()
-        self.model_manager = ModelManager(self.model_config)
-        self.speech_service = SpeechRecognitionService(self.model_manager)
-        self.streaming_service = StreamingSpeechService(self.model_manager)
-        self.speaker_service = SpeakerSeparationService(self.model_manager)
-        self.denoising_service = DenoisingService(self.model_manager)
+        # 模型管理器进程内共享；各业务服务在首次使用时才创建（见下方 cached_property）
+        self.model_manager = get_model_manager()
+        self.model_config = self.model_manager.model_config
         self.temp_files = []  # 用于跟踪临时文件
+        
+        # 预处理结果磁盘缓存（视频抽取的音频、降噪后的音频），None 表示不缓存
+        self.cache_dir = kwargs.get('cache_dir')
+        if self.cache_dir:
+            self.cache_dir = os.path.expanduser(self.cache_dir)
+            os.makedirs(self.cache_dir, exist_ok=True)
 
 
         # 音频处理配置
@@ -38,11 +118,16 @@ class AudioProcessor:
         self.samples_per_chunk = int(self.sample_rate * self.chunk_duration)
         self.bytes_per_chunk = self.samples_per_chunk * self.bytes_per_sample * self.channels
         self.max_buffer_size = self.bytes_per_chunk * 10  # 最大缓冲10个块
+        # 单次读取上限：FFmpeg按固定码率输出，读半个块即可，无需随调度抖动调整（块很短时不低于默认IO块大小）
+        self._read_size = min(max(self.bytes_per_chunk // 2, io.DEFAULT_BUFFER_SIZE), self.max_buffer_size)
+        # 暂无数据时的等待间隔，不超过块时长的1/4，短块配置下不额外拖慢出结果
+        self._idle_sleep = min(0.1, self.chunk_duration / 4)
         
-        # FFmpeg管理器
+        # FFmpeg管理器（input_format='s16le' 表示客户端直接发送16kHz单声道PCM，跳过FFmpeg解码）
         self.ffmpeg_manager = FFmpegAudioManager(
             sample_rate=self.sample_rate,
             channels=self.channels,
+            input_format=kwargs.get('input_format'),
         )
         
         # 状态管理 - 简化为3个状态
@@ -51,12 +136,46 @@ class AudioProcessor:
         # STOPPED: 已停止，可以被清理
         self._state = "IDLE"
         self._state_lock = asyncio.Lock()
+        # 停止信号：循环中只需读取标志，锁只用于状态转换本身
+        self._stopping = asyncio.Event()
+        # 推送给结果流的状态事件：只在有新进展时产生，None 表示结束
+        self._results_q: asyncio.Queue = asyncio.Queue(maxsize=64)
         
-        self.pcm_buffer = bytearray()
-        self.temp_files = []
+        # PCM缓冲区：一次性预分配，用读写偏移管理，读取和取块都不再切片拷贝
+        self._pcm_ring = bytearray(self.max_buffer_size * 2)
+        self._pcm_view = memoryview(self._pcm_ring)
+        self._pcm_read_off = 0
+        self._pcm_write_off = 0
+        # 转换后的 float32 缓冲池：转录完成后归还复用，稳态下不再分配新数组
+        self._float_pool: List[np.ndarray] = []
         
         # 异步任务管理
-        self.transcription_queue = asyncio.Queue()
+        # 每个实例独占一个转录线程，多个会话之间不争抢默认线程池；
+        # cpu_affinity=True 时在Linux上把该线程绑定到一个CPU（注意torch计算线程会继承该绑定）
+        self._transcribe_executor = ThreadPoolExecutor(
+            max_workers=1,
+            thread_name_prefix=f"asr-{id(self):x}",
+            initializer=_pin_current_thread if kwargs.get('cpu_affinity', False) else None
+        )
+        
+        # 读取器 -> 转录器的有界通道：转录跟不上时积压的块合并处理，超过上限则丢弃最旧的块，避免延迟无限累积
+        self._pending_chunks: List[Optional[np.ndarray]] = []
+        # 上一块是否为语音：语音后的第一个静音块触发一次尾部结果输出
+        self._voiced = False
+        # 触发模型输出尾部结果用的静音，只分配一次
+        self._flush_audio = np.zeros(FLUSH_SAMPLES, dtype=np.float32)
+        # 本连接的流式识别缓存：整个音频流内保留编码/解码上下文，逐块增量解码
+        self._stream_cache: dict = {}
+        self._chunk_event = asyncio.Event()
+        self._eof = False
+        
+        # 待写入FFmpeg的音频帧：短时间内到达的小帧合并为一次写入
+        self._write_buffer = bytearray()
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._flush_task: Optional[asyncio.Task] = None
+        # 后台合并写入失败后置位，下一次 process_audio 返回 False 报告给调用方
+        self._write_failed = False
+        self._write_lock = asyncio.Lock()  # 保证合并后的数据按到达顺序写入
         self.ffmpeg_reader_task = None
         self.transcription_task = None
         self.watchdog_task = None
@@ -65,6 +184,8 @@ class AudioProcessor:
         # 回调函数（支持sync和async）
         self.on_transcription_callback: Optional[Callable] = None
         self.on_error_callback: Optional[Callable] = None
+        self._invoke_transcription_cb: Optional[Callable[..., Awaitable[None]]] = None
+        self._invoke_error_cb: Optional[Callable[..., Awaitable[None]]] = None
 
     async def create_tasks(self) -> AsyncIterator[dict]:
         """
@@ -140,10 +261,8 @@ class AudioProcessor:
 
     async def process_audio(self, audio_bytes: bytes) -> bool:
         """处理音频数据 - 只在RUNNING状态接受数据"""
-        # 检查状态
-        async with self._state_lock:
-            current_state = self._state
-        
+        # 检查状态（单线程事件循环内读取状态无需加锁）
+        current_state = self._state
         if current_state != "RUNNING":
             logger.warning(f"AudioProcessor状态为{current_state}，拒绝音频数据")
             return False
@@ -151,9 +270,52 @@ class AudioProcessor:
         # 空数据表示结束
         if not audio_bytes:
             logger.info("收到空音频消息，停止FFmpeg输入")
+            await self._flush_to_ffmpeg()
             await self.ffmpeg_manager.stop()
             return True
 
+        # 先缓存，WRITE_COALESCE_DELAY 后统一写入；积压过多时直接写入并等待，形成背压
+        self._write_buffer += audio_bytes
+        if len(self._write_buffer) >= WRITE_BUFFER_HIGH_WATER:
+            success = await self._flush_to_ffmpeg()
+        else:
+            if self._flush_handle is None:
+                self._flush_handle = asyncio.get_running_loop().call_later(
+                    WRITE_COALESCE_DELAY, self._schedule_flush
+                )
+            success = True
+        
+        # 报告此前后台写入的失败
+        if self._write_failed:
+            self._write_failed = False
+            return False
+        return success
+
+    def _schedule_flush(self):
+        """定时器回调：启动一次合并写入"""
+        self._flush_handle = None
+        self._flush_task = asyncio.ensure_future(self._flush_to_ffmpeg())
+
+    async def _flush_to_ffmpeg(self) -> bool:
+        """把已缓存的音频帧一次写入FFmpeg，失败时记录下来供 process_audio 报告"""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        async with self._write_lock:
+            if not self._write_buffer:
+                return True
+            audio_bytes, self._write_buffer = self._write_buffer, bytearray()
+            try:
+                success = await self._write_to_ffmpeg(audio_bytes)
+            except Exception as e:
+                logger.error(f"写入FFmpeg异常: {e}")
+                success = False
+            if not success:
+                self._write_failed = True
+            return success
+
+    async def _write_to_ffmpeg(self, audio_bytes) -> bool:
+        """写入FFmpeg，失败时尝试重启一次"""
         # 健康检查
         if not await self.ffmpeg_manager.health_check():
             logger.error("FFmpeg健康检查失败，尝试重启")
@@ -184,15 +346,14 @@ class AudioProcessor:
     async def ffmpeg_stdout_reader(self):
         """FFmpeg stdout读取器 - 清晰的状态检查"""
         logger.info("开始FFmpeg stdout读取...")
-        beg = time()
+        buffer_size = self._read_size
         
         try:
             while True:
                 # 检查状态
-                async with self._state_lock:
-                    if self._state != "RUNNING":
-                        logger.info(f"状态变为{self._state}，停止读取FFmpeg输出")
-                        break
+                if self._stopping.is_set():
+                    logger.info(f"状态变为{self._state}，停止读取FFmpeg输出")
+                    break
                 try:
                     # 检查FFmpeg状态
                     state = await self.ffmpeg_manager.get_state()
@@ -207,37 +368,53 @@ class AudioProcessor:
                         await asyncio.sleep(0.5)
                         continue
                     
-                    # 计算动态缓冲区大小
-                    current_time = time()
-                    elapsed_time = max(0.1, current_time - beg)
-                    buffer_size = max(int(32000 * elapsed_time), 4096)
-                    beg = current_time
-
-                    # 从FFmpeg读取PCM数据
-                    chunk = await self.ffmpeg_manager.read_data(buffer_size)
+                    # 从FFmpeg读取PCM数据（单次读取不超过最大缓冲，压缩后缓冲区总有足够的连续空间），直接写入缓冲区尾部
+                    if self._pcm_write_off + buffer_size > len(self._pcm_ring):
+                        self._compact_pcm_buffer()
+                    read_size = await self.ffmpeg_manager.read_into(
+                        self._pcm_view[self._pcm_write_off:self._pcm_write_off + buffer_size]
+                    )
                     
-                    if not chunk:
+                    if not read_size:
                         # 无数据时短暂等待
-                        await asyncio.sleep(0.1)
+                        await asyncio.sleep(self._idle_sleep)
                         continue
                     
-                    # 添加到PCM缓冲区
-                    self.pcm_buffer.extend(chunk)
+                    self._pcm_write_off += read_size
 
                     # 当有足够数据时处理
-                    if len(self.pcm_buffer) >= self.bytes_per_chunk:
-                        if len(self.pcm_buffer) > self.max_buffer_size:
-                            logger.warning(f"PCM缓冲区过大: {len(self.pcm_buffer) / self.bytes_per_chunk:.1f}块")
+                    available = self._pcm_buffered_bytes()
+                    if available >= self.bytes_per_chunk:
+                        if available > self.max_buffer_size:
+                            logger.warning(f"PCM缓冲区过大: {available / self.bytes_per_chunk:.1f}块")
 
-                        # 提取音频块并转换
-                        pcm_chunk = self.pcm_buffer[:self.max_buffer_size]
-                        self.pcm_buffer = self.pcm_buffer[self.max_buffer_size:]
+                        # 取出整帧数据（不超过最大缓冲），直接在缓冲区视图上转换
+                        frame_size = self.bytes_per_sample * self.channels
+                        take = min(available, self.max_buffer_size)
+                        take -= take % frame_size
+                        pcm_chunk = self._pcm_view[self._pcm_read_off:self._pcm_read_off + take]
+                        
+                        if self._is_silent(pcm_chunk):
+                            # 静音块不交给模型，只通知前端
+                            audio_array = None
+                        else:
+                            # 转换为numpy数组，写入池中的独立缓冲区
+                            audio_array = self.convert_pcm_to_float(pcm_chunk, out=self._acquire_float_buffer())
+                        self._pcm_read_off += take
+                        if self._pcm_read_off == self._pcm_write_off:
+                            self._pcm_read_off = self._pcm_write_off = 0
                         
-                        # 转换为numpy数组
-                        audio_array = self.convert_pcm_to_float(pcm_chunk)
+                        if audio_array is None:
+                            if self._voiced:
+                                # 语音后出现停顿：让转录器立即输出缓存中的尾部结果，不必等到下一句话
+                                self._voiced = False
+                                self._publish_chunk(_FLUSH_MARKER)
+                            self._push_result({"status": "silence", "timestamp": time()})
+                            continue
                         
-                        # 放入转录队列
-                        await self.transcription_queue.put(audio_array.copy())
+                        # 交给转录器（缓冲区由转录处理器用完后归还，无需再拷贝）
+                        self._voiced = True
+                        self._publish_chunk(audio_array)
                         
                 except Exception as e:
                     logger.error(f"FFmpeg读取错误: {e}")
@@ -247,7 +424,8 @@ class AudioProcessor:
             logger.error(f"FFmpeg stdout读取任务异常: {e}")
         finally:
             # 发送结束信号
-            await self.transcription_queue.put(None)
+            self._eof = True
+            self._chunk_event.set()
             logger.info("FFmpeg stdout读取任务结束")
 
     async def transcription_processor(self):
@@ -257,34 +435,35 @@ class AudioProcessor:
         try:
             while True:
                 try:
-                    # 等待音频数据
-                    audio_array = await self.transcription_queue.get()
-                    
-                    # 检查结束信号
-                    if audio_array is None:
-                        logger.info("收到转录结束信号")
-                        self.transcription_queue.task_done()
-                        break
-                    
-                    # 异步转录处理
-                    result = await asyncio.get_event_loop().run_in_executor(
-                        None, 
-                        self._transcribe_audio_array, 
-                        audio_array
-                    )
-                    
-                    # 调用回调（支持sync和async）
-                    if result and self.on_transcription_callback:
-                        if asyncio.iscoroutinefunction(self.on_transcription_callback):
-                            await self.on_transcription_callback(result)
+                    # 等待新的音频块
+                    if not self._pending_chunks:
+                        # 检查结束信号（结束前已到达的音频块仍会处理完）
+                        if self._eof:
+                            logger.info("收到转录结束信号")
+                            if self._stream_cache:
+                                # 结束流式解码，取回缓存中尚未输出的尾部结果
+                                await self._transcribe_and_notify([], is_final=True)
+                            break
+                        await self._chunk_event.wait()
+                        self._chunk_event.clear()
+                        continue
+                    # 取走当前积压的全部音频块，按停顿标记分段，每段一次调用完成转录
+                    batch, self._pending_chunks = self._pending_chunks, []
+                    segment = []
+                    for audio_array in batch:
+                        if audio_array is _FLUSH_MARKER:
+                            await self._transcribe_and_notify(segment, is_final=True)
+                            segment = []
                         else:
-                            self.on_transcription_callback(result)
+                            segment.append(audio_array)
+                    if segment:
+                        await self._transcribe_and_notify(segment)
                     
-                    self.transcription_queue.task_done()
+                    # 每处理完一块推送一次状态
+                    self._push_result(self._status_event())
                     
                 except Exception as e:
                     logger.error(f"转录处理错误: {e}")
-                    self.transcription_queue.task_done()
                     
         except Exception as e:
             logger.error(f"转录处理器异常: {e}")
@@ -298,10 +477,9 @@ class AudioProcessor:
         try:
             while True:
                 # 检查状态
-                async with self._state_lock:
-                    if self._state != "RUNNING":
-                        logger.info(f"状态变为{self._state}，停止监控")
-                        break
+                if self._stopping.is_set():
+                    logger.info(f"状态变为{self._state}，停止监控")
+                    break
                 try:
                     # 检查任务状态
                     for task in tasks_to_monitor:
@@ -318,12 +496,11 @@ class AudioProcessor:
                         logger.error("FFmpeg处于失败状态")
                     elif ffmpeg_state == FFmpegState.STOPPED:
                         # FFmpeg意外停止，尝试重启
-                        async with self._state_lock:
-                            if self._state == "RUNNING":
-                                logger.warning("FFmpeg意外停止，尝试重启")
-                                await self.ffmpeg_manager.restart()
+                        if not self._stopping.is_set():
+                            logger.warning("FFmpeg意外停止，尝试重启")
+                            await self.ffmpeg_manager.restart()
                     
-                    await asyncio.sleep(5)  # 每5秒检查一次
+                    await self._wait_stopping(5)  # 每5秒检查一次，停止时立即返回
                     
                 except asyncio.CancelledError:
                     logger.info("监控任务被取消")
@@ -342,23 +519,25 @@ class AudioProcessor:
         logger.info("启动结果格式化器...")
         
         try:
+            # 启动后先发送一次当前状态
+            yield self._status_event()
+            
             while True:
                 # 检查状态
-                async with self._state_lock:
-                    current_state = self._state
-                
-                if current_state != "RUNNING":
-                    logger.info(f"状态变为{current_state}，停止结果格式化")
+                if self._stopping.is_set():
+                    logger.info(f"状态变为{self._state}，停止结果格式化")
                     break
                 try:
-                    # 发送状态更新
-                    yield {
-                        "status": "processing",
-                        "timestamp": time(),
-                        "buffer_size": len(self.pcm_buffer)
-                    }
+                    # 有新进展时才发送状态更新，长时间无事件时发送一次心跳保活
+                    try:
+                        item = await asyncio.wait_for(self._results_q.get(), timeout=RESULTS_HEARTBEAT_INTERVAL)
+                    except asyncio.TimeoutError:
+                        item = self._status_event()
                     
-                    await asyncio.sleep(0.5)  # 每500ms发送一次状态
+                    if item is None:
+                        logger.info(f"状态变为{self._state}，停止结果格式化")
+                        break
+                    yield item
                     
                 except Exception as e:
                     logger.error(f"结果格式化器错误: {e}")
@@ -388,6 +567,19 @@ class AudioProcessor:
             logger.info(f"开始清理AudioProcessor（当前状态: {self._state}）...")
             # 状态转换 -> STOPPED
             self._state = "STOPPED"
+            self._stopping.set()
+            # 唤醒正在等待事件的结果流
+            self._push_result(None, force=True)
+        
+        # 丢弃尚未写入的音频帧
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        self._write_buffer = bytearray()
+        flush_task, self._flush_task = self._flush_task, None
+        if flush_task is not None and not flush_task.done():
+            flush_task.cancel()
+            await asyncio.gather(flush_task, return_exceptions=True)
         
         # 取消所有任务
         for task in self.all_tasks_for_cleanup:
@@ -404,41 +596,198 @@ class AudioProcessor:
         await self.ffmpeg_manager.stop()
         logger.info("FFmpeg管理器已停止")
         
-        # 清理临时文件
-        for temp_file in self.temp_files:
+        self._transcribe_executor.shutdown(wait=False)
+        
+        # 清理临时文件（去重后删除）
+        temp_files = list(dict.fromkeys(self.temp_files))
+        self.temp_files = []
+        if len(temp_files) > CLEANUP_OFFLOAD_THRESHOLD:
+            await asyncio.get_running_loop().run_in_executor(None, self._remove_files, temp_files)
+        else:
+            self._remove_files(temp_files)
+        
+        # 只清理本实例实际创建过的服务；模型本身留在共享的模型管理器中供其他连接复用
+        services = self.__dict__
+        if 'denoising_service' in services:
+            services['denoising_service'].cleanup()
+        if 'streaming_service' in services:
+            services['streaming_service'].release()
+        self._stream_cache = {}
+        if 'speaker_service' in services:
+            services['speaker_service'].release()
+        for name in ('speech_service', 'streaming_service', 'speaker_service', 'denoising_service',
+                     '_denoising_available', '_denoising_info'):
+            services.pop(name, None)
+        # 显存回收（gc + 清空CUDA缓存）不在这里做：模型仍由其他连接共享，
+        # 由模型缓存卸载空闲模型时或命令行入口退出时执行
+        logger.info("服务已释放")
+        
+        logger.info("AudioProcessor清理完成，状态: STOPPED")
+
+    @cached_property
+    def speech_service(self) -> SpeechRecognitionService:
+        return SpeechRecognitionService(self.model_manager)
+
+    @cached_property
+    def streaming_service(self) -> StreamingSpeechService:
+        return StreamingSpeechService(self.model_manager)
+
+    @cached_property
+    def speaker_service(self) -> SpeakerSeparationService:
+        return SpeakerSeparationService(self.model_manager)
+
+    @cached_property
+    def denoising_service(self) -> DenoisingService:
+        return DenoisingService(self.model_manager)
+
+    # 降噪模型在实例生命周期内不会变化，可用性和模型信息只查询一次
+    @cached_property
+    def _denoising_available(self) -> bool:
+        return self.denoising_service.is_available()
+
+    @cached_property
+    def _denoising_info(self) -> dict:
+        return self.denoising_service.get_model_info()
+
+    @staticmethod
+    def _remove_files(paths: List[str]):
+        """删除文件，文件已不存在时忽略"""
+        for path in paths:
             try:
-                if os.path.exists(temp_file):
-                    os.remove(temp_file)
-            except Exception as e:
+                with contextlib.suppress(FileNotFoundError):
+                    os.unlink(path)
+            except OSError as e:
                 logger.warning(f"清理临时文件失败: {e}")
+
+    def _pcm_buffered_bytes(self) -> int:
+        """PCM缓冲区中尚未处理的字节数"""
+        return self._pcm_write_off - self._pcm_read_off
+
+    def _compact_pcm_buffer(self):
+        """把未处理的数据移到缓冲区开头，为后续读取腾出连续空间（积压时才会发生）"""
+        pending = self._pcm_buffered_bytes()
+        if pending and self._pcm_read_off:
+            # memoryview 之间的赋值按 memmove 处理重叠区域，原地搬移，不生成中间 bytes
+            self._pcm_view[:pending] = self._pcm_view[self._pcm_read_off:self._pcm_write_off]
+        self._pcm_read_off = 0
+        self._pcm_write_off = pending
+
+    def _status_event(self) -> dict:
+        """当前处理状态"""
+        return {
+            "status": "processing",
+            "timestamp": time(),
+            "buffer_size": self._pcm_buffered_bytes()
+        }
+
+    def _push_result(self, item: Optional[dict], force: bool = False):
+        """
+        向结果流推送事件；队列满时丢弃新的状态事件（前端只关心最新状态）
         
-        logger.info("AudioProcessor清理完成，状态: STOPPED")
+        force 为 True 时腾出一个位置保证事件送达，用于结束信号
+        """
+        if force and self._results_q.full():
+            self._results_q.get_nowait()
+        try:
+            self._results_q.put_nowait(item)
+        except asyncio.QueueFull:
+            pass
+
+    async def _wait_stopping(self, timeout: float):
+        """等待停止信号，最多等待 timeout 秒；代替固定 sleep，停止时无需等满间隔"""
+        try:
+            await asyncio.wait_for(self._stopping.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
 
-    def convert_pcm_to_float(self, pcm_buffer) -> np.ndarray:
-        """将PCM缓冲区转换为标准化的NumPy数组（接受bytes或bytearray）"""
+    async def _transcribe_and_notify(self, audio_arrays: List[np.ndarray], is_final: bool = False):
+        """
+        在转录线程中转录一段连续的音频块并回调结果，用完的缓冲区归还缓冲池
+        
+        is_final 为 True 时在末尾追加一小段静音结束本段流式解码，之后重置流式缓存
+        """
+        chunks = audio_arrays + [self._flush_audio] if is_final else audio_arrays
+        if not chunks:
+            return
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(
+                self._transcribe_executor,
+                self._transcribe_audio_batch,
+                chunks,
+                is_final
+            )
+        finally:
+            for audio_array in audio_arrays:
+                self._release_float_buffer(audio_array)
+        if is_final:
+            self._stream_cache = {}
+        
+        # 调用回调（支持sync和async）
+        if result and self._invoke_transcription_cb:
+            await self._invoke_transcription_cb(result)
+
+    def _publish_chunk(self, audio_array: Optional[np.ndarray]):
+        """发布音频块（或停顿标记）；积压超过 TRANSCRIBE_BATCH_MAX 时丢弃最旧的块"""
+        if len(self._pending_chunks) >= TRANSCRIBE_BATCH_MAX:
+            logger.warning("转录速度跟不上，丢弃较旧的音频块")
+            dropped = self._pending_chunks.pop(0)
+            if dropped is not _FLUSH_MARKER:
+                self._release_float_buffer(dropped)
+        self._pending_chunks.append(audio_array)
+        self._chunk_event.set()
+
+    def _acquire_float_buffer(self) -> np.ndarray:
+        """从缓冲池取出一块能容纳最大PCM块的 float32 缓冲区"""
+        if self._float_pool:
+            return self._float_pool.pop()
+        return np.empty(self.max_buffer_size // self.bytes_per_sample, dtype=np.float32)
+
+    def _release_float_buffer(self, audio_array: np.ndarray):
+        """把转录完的数组所在缓冲区归还缓冲池"""
+        if len(self._float_pool) >= FLOAT_POOL_KEEP:
+            return
+        buffer = audio_array.base if audio_array.base is not None else audio_array
+        self._float_pool.append(buffer)
+
+    def convert_pcm_to_float(self, pcm_buffer, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        将PCM缓冲区转换为标准化的NumPy数组（接受bytes、bytearray或memoryview）
+        
+        用乘以倒数代替除法，一次遍历完成类型转换和缩放；提供 out 时结果写入其前部并返回该切片
+        """
+        return pcm16_to_float32(pcm_buffer, out)
+
+    @staticmethod
+    def _is_silent(pcm_buffer) -> bool:
+        """按峰值判断PCM块是否为静音（分别取最大/最小值，避免 abs(-32768) 溢出）"""
         audio_int16 = np.frombuffer(pcm_buffer, dtype=np.int16)
-        return audio_int16.astype(np.float32) / 32768.0
+        if audio_int16.size == 0:
+            return True
+        return (audio_int16.max() < SILENCE_PEAK_THRESHOLD
+                and audio_int16.min() > -SILENCE_PEAK_THRESHOLD)
 
     def _transcribe_audio_array(self, audio_array: np.ndarray) -> Optional[dict]:
         """转录音频数组 - 同步方法"""
+        return self._transcribe_audio_batch([audio_array])
+
+    def _transcribe_audio_batch(self, audio_arrays: List[np.ndarray], is_final: bool = False) -> Optional[dict]:
+        """转录连续的多个音频块 - 同步方法，模型只准备一次，结果合并为一条；沿用本连接的流式缓存"""
         try:
-            import datetime
-            
             # 直接使用音频数组进行转录
             results = list(self.streaming_service.stream_recognize_chunks(
-                audio_chunks=[audio_array],  # 将单个数组作为一个块传入
-                sample_rate=self.sample_rate  # 直接使用当前的采样率
+                audio_chunks=audio_arrays,
+                sample_rate=self.sample_rate,  # 直接使用当前的采样率
+                merge=True,  # 积压的块在时间上连续，一次模型调用完成
+                cache=self._stream_cache,
+                is_final=is_final
             ))
             
             if results:
-                return {
-                    'text': results[-1],
-                    'confidence': 0.95,
-                    'speaker_id': 'speaker_1',
-                    'timestamp': datetime.datetime.now().isoformat(),
-                    'is_final': False,
-                    'audio_duration': len(audio_array) / self.sample_rate
-                }
+                result = _TRANSCRIPTION_RESULT_TEMPLATE.copy()
+                result['text'] = ''.join(results)
+                result['timestamp'] = time()
+                result['audio_duration'] = sum(len(a) for a in audio_arrays) / self.sample_rate
+                return result
         except Exception as e:
             logger.error(f"音频转录失败: {e}")
             return None
@@ -446,59 +795,141 @@ class AudioProcessor:
     def set_transcription_callback(self, callback: Callable[[dict], None]):
         """设置转录结果回调"""
         self.on_transcription_callback = callback
+        self._invoke_transcription_cb = _as_async_callback(callback)
 
     def set_error_callback(self, callback: Callable[[str], None]):
         """设置错误回调"""
         self.on_error_callback = callback
+        self._invoke_error_cb = _as_async_callback(callback)
     
-    def _prepare_audio_file(self, media_path: str) -> Optional[str]:
+    def _cache_path(self, media_path: str, stage: str) -> Optional[str]:
+        """
+        获取预处理结果的缓存路径，未启用缓存时返回None
+        
+        缓存键取绝对路径、文件大小、修改时间（纳秒）+ 前 1MiB 内容的哈希：
+        同一文件被修改、或不同文件开头相同时都不会误命中，且无需读取整个大文件
+        """
+        if not self.cache_dir:
+            return None
+        
+        digest = hashlib.blake2b(digest_size=16)
+        try:
+            abs_path = os.path.abspath(media_path)
+            st = os.stat(abs_path)
+            digest.update(f"{abs_path}\0{st.st_size}\0{st.st_mtime_ns}\0".encode())
+            with open(abs_path, 'rb') as f:
+                digest.update(f.read(1 << 20))
+        except OSError:
+            return None
+        return os.path.join(self.cache_dir, f"{digest.hexdigest()}.{stage}.wav")
+
+    @staticmethod
+    def _lookup_cache(cache_path: Optional[str]) -> bool:
+        """检查缓存是否命中，命中时刷新条目的使用时间（淘汰按最近使用排序）"""
+        if not cache_path:
+            return False
+        try:
+            os.utime(cache_path)
+            return True
+        except OSError:
+            return False
+
+    def _store_in_cache(self, audio_path: str, cache_path: str):
+        """把预处理结果写入缓存，先写临时文件再原子替换，避免留下半截文件"""
+        part_path = None
+        try:
+            fd, part_path = tempfile.mkstemp(suffix='.part', dir=self.cache_dir)
+            os.close(fd)
+            shutil.copyfile(audio_path, part_path)
+            os.replace(part_path, cache_path)
+        except OSError as e:
+            logger.warning(f"写入预处理缓存失败: {e}")
+            if part_path:
+                with contextlib.suppress(OSError):
+                    os.remove(part_path)
+            return
+        self._prune_cache()
+
+    def _prune_cache(self):
+        """删除过期的缓存条目，总大小超过上限时从最久未使用的条目开始淘汰"""
+        now = time()
+        entries = []
+        try:
+            with os.scandir(self.cache_dir) as it:
+                for entry in it:
+                    if not entry.name.endswith('.wav') or not entry.is_file():
+                        continue
+                    st = entry.stat()
+                    entries.append((st.st_mtime, st.st_size, entry.path))
+        except OSError as e:
+            logger.warning(f"扫描预处理缓存失败: {e}")
+            return
+        
+        entries.sort(reverse=True)
+        total = 0
+        for mtime, size, path in entries:
+            total += size
+            if now - mtime > CACHE_MAX_AGE or total > CACHE_MAX_BYTES:
+                with contextlib.suppress(OSError):
+                    os.remove(path)
+
+    def _prepare_audio_file(self, media_path: str, log: Optional[List[str]] = None) -> Optional[str]:
         """
         准备音频文件，如果是视频文件则提取音频
         
         Args:
             media_path: 媒体文件路径
+            log: 在后台线程中调用时传入列表，输出信息追加到列表中由调用方统一打印，避免多线程输出交错
             
         Returns:
             音频文件路径，失败返回None
         """
+        emit = print if log is None else log.append
         if not os.path.exists(media_path):
-            print(f"❌ 文件不存在: {media_path}")
+            emit(f"❌ 文件不存在: {media_path}")
             return None
         
         # 获取媒体信息
         media_info = MediaProcessor.get_media_info(media_path)
         if not media_info:
-            print(f"❌ 无法获取媒体文件信息: {media_path}")
+            emit(f"❌ 无法获取媒体文件信息: {media_path}")
             return None
         
-        print(f"📁 文件信息:")
-        print(f"   类型: {media_info['type']}")
-        print(f"   时长: {media_info['duration']:.2f}秒")
-        print(f"   大小: {media_info['file_size'] / 1024 / 1024:.2f}MB")
+        emit(f"📁 文件信息:")
+        emit(f"   类型: {media_info['type']}")
+        emit(f"   时长: {media_info['duration']:.2f}秒")
+        emit(f"   大小: {media_info['file_size'] / 1024 / 1024:.2f}MB")
         
         if media_info['type'] == 'audio':
             # 音频文件直接返回
-            print(f"🎵 音频文件，直接处理")
+            emit(f"🎵 音频文件，直接处理")
             return media_path
         elif media_info['type'] == 'video':
             # 视频文件需要提取音频
             if not media_info['has_audio']:
-                print(f"❌ 视频文件不包含音频流")
+                emit(f"❌ 视频文件不包含音频流")
                 return None
             
-            print(f"🎬 视频文件，包含 {media_info['audio_streams']} 个音频流")
+            emit(f"🎬 视频文件，包含 {media_info['audio_streams']} 个音频流")
+            
+            cache_path = self._cache_path(media_path, "extracted")
+            if self._lookup_cache(cache_path):
+                emit(f"⚡ 使用缓存的音频: {cache_path}")
+                return cache_path
             
             # 提取音频
             audio_path = MediaProcessor.extract_audio_from_video(media_path)
             if audio_path:
                 self.temp_files.append(audio_path)  # 记录临时文件
-                print(f"✅ 音频提取完成: {audio_path}")
+                emit(f"✅ 音频提取完成: {audio_path}")
+                if cache_path:
+                    self._store_in_cache(audio_path, cache_path)
                 return audio_path
             else:
-                print(f"❌ 音频提取失败")
+                emit(f"❌ 音频提取失败")
                 return None
         else:
-            print(f"❌ 不支持的文件类型")
+            emit(f"❌ 不支持的文件类型")
             return None
 
     def _preprocess_audio(self, media_path: str, enable_denoising: bool = False) -> Optional[str]:
@@ -512,6 +943,14 @@ class AudioProcessor:
         Returns:
             预处理后的音频文件路径，失败返回None
         """
+        # 降噪耗时最长，命中缓存时直接跳过准备和降噪
+        cache_path = None
+        if enable_denoising and self._denoising_available:
+            cache_path = self._cache_path(media_path, "denoised")
+            if self._lookup_cache(cache_path):
+                print(f"⚡ 使用缓存的降噪音频: {cache_path}")
+                return cache_path
+        
         # 1. 现有的媒体文件准备逻辑
         audio_path = self._prepare_audio_file(media_path)
         if not audio_path:
@@ -519,13 +958,16 @@ class AudioProcessor:
         
         # 2. 可选的FRCRN模型降噪处理
         if enable_denoising:
-            if self.denoising_service.is_available():
-                model_info = self.denoising_service.get_model_info()
-                print(f"🔧 启用降噪: {model_info['model']} ({model_info['type']})")
+            if self._denoising_available:
+                if logger.isEnabledFor(logging.DEBUG):
+                    model_info = self._denoising_info
+                    logger.debug(f"启用降噪: {model_info['model']} ({model_info['type']})")
                 
                 denoised_path = self.denoising_service.denoise(audio_path)
                 if denoised_path and denoised_path != audio_path:
                     print(f"✅ 降噪处理完成")
+                    if cache_path:
+                        self._store_in_cache(denoised_path, cache_path)
                     return denoised_path
                 else:
                     print("⚠️ 降噪处理失败或无效果，使用原始音频")
@@ -539,15 +981,20 @@ class AudioProcessor:
     def process_single_audio(self, 
                            media_path: str, 
                            language: str = "auto",
-                           streaming: bool = False) -> Optional[str]:
-        """处理单个媒体文件（音频或视频）- 语音识别"""
+                           streaming: bool = False,
+                           audio_prepared: bool = False) -> Optional[str]:
+        """
+        处理单个媒体文件（音频或视频）- 语音识别
+        
+        audio_prepared 为 True 时表示 media_path 已经过 _prepare_audio_file 处理，跳过准备步骤
+        """
         print(f"\n=== 处理媒体文件 ===")
         print(f"文件: {media_path}")
         print(f"语言: {language}")
         print(f"模式: {'流式' if streaming else '离线'}")
         
         # 准备音频文件
-        audio_path = self._prepare_audio_file(media_path)
+        audio_path = media_path if audio_prepared else self._prepare_audio_file(media_path)
         if not audio_path:
             return None
         
@@ -555,13 +1002,12 @@ class AudioProcessor:
             if streaming:
                 # 流式识别
                 print("🔄 开始流式识别...")
-                results = []
-                for result in self.streaming_service.stream_recognize_file(audio_path):
-                    results.append(result)
+                # stream_recognize_file 直接产出各块的文本，无需再解析前缀
+                results = list(self.streaming_service.stream_recognize_file(audio_path))
                 
                 # 合并所有结果
                 if results:
-                    full_text = " ".join([r.split(": ", 1)[1] for r in results if ": " in r])
+                    full_text = " ".join(results)
                     print(f"\n✅ 完整识别结果: {full_text}")
                     return full_text
                 return None
@@ -591,7 +1037,8 @@ class AudioProcessor:
                          save_audio_segments: bool = True,
                          save_merged_audio: bool = True,
                          hotwords: Optional[List[str]] = None,
-                         progress_callback: Optional[Callable] = None) -> Dict:
+                         progress_callback: Optional[Callable] = None,
+                         audio_prepared: bool = False) -> Dict:
         """
         执行说话人分离
         
@@ -603,6 +1050,7 @@ class AudioProcessor:
             save_merged_audio: 是否保存合并的音频
             hotwords: 热词列表
             progress_callback: 进度回调函数
+            audio_prepared: media_path 是否已经过 _prepare_audio_file 处理（为 True 时跳过准备步骤）
             
         Returns:
             分离结果字典
@@ -613,7 +1061,7 @@ class AudioProcessor:
         print(f"合并阈值: {merge_threshold}")
         
         # 准备音频文件
-        audio_path = self._prepare_audio_file(media_path)
+        audio_path = media_path if audio_prepared else self._prepare_audio_file(media_path)
         if not audio_path:
             return {'success': False, 'message': '音频文件准备失败'}
         
@@ -681,10 +1129,22 @@ class AudioProcessor:
         print(f"文件数量: {len(media_paths)}")
         print(f"输出目录: {output_dir}")
         
-        # 准备音频文件列表
+        # 准备音频文件列表：各文件互不依赖，ffprobe/ffmpeg 子进程并行执行（重复的路径只准备一次）
+        unique_paths = list(dict.fromkeys(media_paths))
+        logs = {media_path: [] for media_path in unique_paths}
+        workers = max(1, min(PREPARE_WORKERS, len(unique_paths)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="prepare") as executor:
+            prepared = dict(zip(unique_paths, executor.map(
+                lambda media_path: self._prepare_audio_file(media_path, logs[media_path]), unique_paths
+            )))
+        
+        # 各文件的准备信息在主线程中按顺序打印
+        for media_path in unique_paths:
+            print("\n".join(logs[media_path]))
+        
         audio_files = []
         for media_path in media_paths:
-            audio_path = self._prepare_audio_file(media_path)
+            audio_path = prepared[media_path]
             if audio_path:
                 audio_files.append(audio_path)
             else:
@@ -731,19 +1191,17 @@ class AudioProcessor:
             'streaming_time': 0
         }
         
-        import time
-        
         # 离线模式
         print("\n🔄 测试离线模式...")
-        start_time = time.time()
+        start_time = perf_counter()
         results['offline'] = self.process_single_audio(media_path, language, streaming=False)
-        results['offline_time'] = time.time() - start_time
+        results['offline_time'] = perf_counter() - start_time
         
         # 流式模式
         print("\n🔄 测试流式模式...")
-        start_time = time.time()
+        start_time = perf_counter()
         results['streaming'] = self.process_single_audio(media_path, language, streaming=True)
-        results['streaming_time'] = time.time() - start_time
+        results['streaming_time'] = perf_counter() - start_time
         
         # 显示对比结果
         print(f"\n📊 对比结果:")
@@ -785,7 +1243,7 @@ class AudioProcessor:
         try:
              # 记录降噪模型信息
             if enable_denoising:
-                results['denoising_model'] = self.denoising_service.get_model_info()
+                results['denoising_model'] = dict(self._denoising_info)
 
             # 1. 统一音频预处理（包含可选FRCRN降噪）
             processed_audio = self._preprocess_audio(media_path, enable_denoising)
@@ -795,7 +1253,8 @@ class AudioProcessor:
 
             # 1. 执行语音识别
             print("\n🔄 执行语音识别...")
-            speech_result = self.process_single_audio(processed_audio, language)
+            # 预处理结果已是可直接识别的音频，后续步骤不再重复探测文件
+            speech_result = self.process_single_audio(processed_audio, language, audio_prepared=True)
             results['speech_recognition'] = speech_result
             
             # 2. 执行说话人分离
@@ -804,7 +1263,8 @@ class AudioProcessor:
                 processed_audio, 
                 output_dir,
                 merge_threshold=merge_threshold,
-                hotwords=hotwords
+                hotwords=hotwords,
+                audio_prepared=True
             )
             results['speaker_separation'] = speaker_result
             
@@ -834,7 +1294,7 @@ class AudioProcessor:
             if progress_callback:
                 await progress_callback("initializing_models", "正在初始化模型...")
             
-            if hasattr(self, 'streaming_service') and self.streaming_service:
+            if self.streaming_service:
                 # 报告：加载中
                 if progress_callback:
                     await progress_callback("loading_models", "正在加载AI模型...")
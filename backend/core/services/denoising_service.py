@@ -1,12 +1,86 @@
 import os
+import logging
 import tempfile
 import numpy as np
+from functools import lru_cache, partial
+from types import SimpleNamespace
 from typing import Optional
 from modelscope.pipelines import pipeline
 from modelscope.utils.constant import Tasks
-import librosa
 import soundfile as sf
-from core.utils.model_manager import ModelManager
+from core.utils.model_manager import ModelManager, get_model_registry
+
+logger = logging.getLogger(__name__)
+
+# librosa 只在回退降噪中使用，未安装时用 scipy 的STFT代替（省去 librosa/llvmlite 的导入开销）
+try:
+    import librosa
+except ImportError:
+    librosa = None
+
+# 回退降噪的STFT参数
+N_FFT = 2048
+HOP_LENGTH = 512
+
+# 可选：安装 numba 后频谱减法在一次遍历内完成求模、减噪和缩放（显式签名在导入时即完成编译）
+try:
+    from numba import njit, prange
+except ImportError:
+    _spectral_subtract = None
+else:
+    @njit(['void(complex64[:, :], float32[:], float32, float32)'],
+          parallel=True, fastmath=True, cache=True)
+    def _spectral_subtract(stft, noise, alpha, beta):
+        for t in prange(stft.shape[1]):
+            for f in range(stft.shape[0]):
+                z = stft[f, t]
+                magnitude = np.sqrt(z.real * z.real + z.imag * z.imag)
+                if magnitude > 0:
+                    cleaned = max(magnitude - alpha * noise[f], beta * magnitude)
+                    stft[f, t] = z * (cleaned / magnitude)
+
+@lru_cache(maxsize=1)
+def _configure_fft_backend():
+    """
+    让 librosa 的 STFT 使用多线程 FFT（进程内只设置一次）
+    
+    librosa 每次对一整块帧做批量 rfft：优先用 pyFFTW（缓存 FFT 计划），否则用 scipy.fft 的 workers=-1
+    """
+    if librosa is None:
+        return
+    
+    try:
+        import pyfftw
+        pyfftw.interfaces.cache.enable()
+        pyfftw.config.NUM_THREADS = os.cpu_count() or 1
+        librosa.set_fftlib(pyfftw.interfaces.numpy_fft)
+        return
+    except ImportError:
+        pass
+    
+    import scipy.fft
+    librosa.set_fftlib(SimpleNamespace(
+        fft=partial(scipy.fft.fft, workers=-1),
+        ifft=partial(scipy.fft.ifft, workers=-1),
+        rfft=partial(scipy.fft.rfft, workers=-1),
+        irfft=partial(scipy.fft.irfft, workers=-1),
+    ))
+
+def _stft(audio: np.ndarray) -> np.ndarray:
+    """短时傅里叶变换，返回 (频点, 帧) 复数谱"""
+    if librosa is not None:
+        return librosa.stft(audio, n_fft=N_FFT, hop_length=HOP_LENGTH)
+    from scipy.signal import stft
+    _, _, spectrum = stft(audio, window='hann', nperseg=N_FFT, noverlap=N_FFT - HOP_LENGTH)
+    return spectrum
+
+def _istft(spectrum: np.ndarray) -> np.ndarray:
+    """_stft 的逆变换"""
+    if librosa is not None:
+        return librosa.istft(spectrum, hop_length=HOP_LENGTH)
+    from scipy.signal import istft
+    _, audio = istft(spectrum, window='hann', nperseg=N_FFT, noverlap=N_FFT - HOP_LENGTH)
+    return audio.astype(np.float32, copy=False)
 
 class DenoisingService:
     """
@@ -17,12 +91,13 @@ class DenoisingService:
         self.model_manager = model_manager
         self.temp_files = []
         self._pipeline = None
+        self._registry_key = None
         self._init_pipeline()
     
     def _init_pipeline(self):
         """初始化降噪管道"""
         try:
-            print("🔄 初始化降噪模型...")
+            logger.info("初始化降噪模型...")
             
             # 获取模型配置
             model_config = self.model_manager.model_config.get_model_config("frcrn-ans")
@@ -31,26 +106,27 @@ class DenoisingService:
             model_revision = self.model_manager.model_config.get_model_version("frcrn-ans")
             
             if not model_id:
-                print("❌ 降噪模型配置未找到")
+                logger.error("降噪模型配置未找到")
                 return
             
             # 尝试使用本地模型，如果不存在则使用在线模型
             model_source = model_path if os.path.exists(model_path) else model_id
             
-            print(f"📦 使用降噪模型: {model_source}")
+            logger.debug("使用降噪模型: %s", model_source)
             
-            # 创建降噪管道
-            self._pipeline = pipeline(
+            # 创建或复用进程内共享的降噪管道
+            self._registry_key = f"frcrn-ans:{model_source}"
+            self._pipeline = get_model_registry().get_or_load(self._registry_key, lambda: pipeline(
                 Tasks.acoustic_noise_suppression,
                 model=model_source,
                 model_revision = model_revision
-            )
+            ))
             
-            print("✅ 降噪模型初始化完成")
+            logger.info("降噪模型初始化完成")
             
         except Exception as e:
-            print(f"⚠️ 降噪模型初始化失败: {e}")
-            print("🔄 将回退到简单降噪方法")
+            logger.warning("降噪模型初始化失败: %s", e)
+            logger.info("将回退到简单降噪方法")
             self._pipeline = None
     
     def denoise(self, audio_path: str) -> Optional[str]:
@@ -64,46 +140,47 @@ class DenoisingService:
             降噪后的音频文件路径，失败返回None
         """
         if not os.path.exists(audio_path):
-            print(f"❌ 音频文件不存在: {audio_path}")
+            logger.error("音频文件不存在: %s", audio_path)
             return None
         
         if not self._pipeline:
-            print("⚠️ 降噪模型未就绪，跳过降噪处理")
+            logger.warning("降噪模型未就绪，跳过降噪处理")
             return audio_path
         
         try:
-            print("🔄 开始FRCRN模型降噪...")
+            logger.info("开始FRCRN模型降噪...")
             
             # 生成输出路径
             output_path = self._generate_output_path(audio_path)
             
-            # 使用ModelScope降噪管道
-            result = self._pipeline(
-                audio_path,
-                output_path=output_path
-            )
+            # 使用ModelScope降噪管道（管道由所有连接共享，调用按模型串行）
+            with get_model_registry().generate_lock(self._registry_key):
+                result = self._pipeline(
+                    audio_path,
+                    output_path=output_path
+                )
             
             # 检查结果
             if result and 'output_path' in result and os.path.exists(result['output_path']):
-                print(f"✅ FRCRN降噪完成: {result['output_path']}")
+                logger.info("FRCRN降噪完成: %s", result['output_path'])
                 self.temp_files.append(result['output_path'])
                 return result['output_path']
             elif os.path.exists(output_path):
                 # 有些版本直接输出到指定路径
-                print(f"✅ FRCRN降噪完成: {output_path}")
+                logger.info("FRCRN降噪完成: %s", output_path)
                 self.temp_files.append(output_path)
                 return output_path
             else:
-                print("❌ 降噪输出文件未生成")
+                logger.error("降噪输出文件未生成")
                 return None
                 
         except Exception as e:
-            print(f"❌ FRCRN降噪失败: {e}")
+            logger.error("FRCRN降噪失败: %s", e)
             import traceback
             traceback.print_exc()
             
             # 降级到简单处理
-            print("🔄 回退到基础降噪方法...")
+            logger.info("回退到基础降噪方法...")
             return self._fallback_denoise(audio_path)
     
     def _generate_output_path(self, input_path: str) -> str:
@@ -119,46 +196,67 @@ class DenoisingService:
         当FRCRN模型失败时使用
         """
         try:
-            import librosa
-            import soundfile as sf
-            import numpy as np
-            
-            print("🔄 使用基础频谱减法降噪...")
+            logger.info("使用基础频谱减法降噪...")
+            _configure_fft_backend()
             
-            # 加载音频
-            audio, sr = librosa.load(audio_path, sr=16000)  # 统一到16kHz
+            # 加载音频（float32，后续频谱为complex64），统一到16kHz
+            audio, sr = self._load_float32(audio_path, 16000)
             
             # 简单的频谱减法降噪
-            stft = librosa.stft(audio, n_fft=2048, hop_length=512)
-            magnitude = np.abs(stft)
-            phase = np.angle(stft)
+            stft = _stft(audio)
             
             # 估计噪声谱（前0.5秒）
-            noise_frames = int(0.5 * sr / 512)
-            noise_spectrum = np.mean(magnitude[:, :noise_frames], axis=1, keepdims=True)
+            noise_frames = int(0.5 * sr / HOP_LENGTH)
+            noise_spectrum = np.mean(np.abs(stft[:, :noise_frames]), axis=1, keepdims=True)
             
-            # 频谱减法
+            # 频谱减法：max(|X| - α·N, β·|X|) 等价于增益 max(1 - α·N/|X|, β) 乘到复数谱上，
+            # 相位保持不变，无需求 angle 再用 exp 重构
             alpha = 1.5  # 保守的过减因子
             beta = 0.1   # 保留比例
-            cleaned_magnitude = magnitude - alpha * noise_spectrum
-            cleaned_magnitude = np.maximum(cleaned_magnitude, beta * magnitude)
+            if _spectral_subtract is not None and stft.dtype == np.complex64:
+                _spectral_subtract(stft, noise_spectrum[:, 0], alpha, beta)
+            else:
+                magnitude = np.abs(stft)
+                gain = np.divide(alpha * noise_spectrum, magnitude,
+                                 out=np.full_like(magnitude, np.inf), where=magnitude > 0)
+                np.subtract(1.0, gain, out=gain)
+                np.maximum(gain, beta, out=gain)
+                stft *= gain
             
             # 重构音频
-            cleaned_stft = cleaned_magnitude * np.exp(1j * phase)
-            cleaned_audio = librosa.istft(cleaned_stft, hop_length=512)
+            cleaned_audio = _istft(stft)
             
             # 保存结果
             output_path = self._generate_output_path(audio_path).replace("_frcrn_", "_fallback_")
             sf.write(output_path, cleaned_audio, sr)
             
-            print(f"✅ 基础降噪完成: {output_path}")
+            logger.info("基础降噪完成: %s", output_path)
             self.temp_files.append(output_path)
             return output_path
             
         except Exception as e:
-            print(f"❌ 基础降噪也失败了: {e}")
+            logger.error("基础降噪也失败了: %s", e)
             return None
     
+    @staticmethod
+    def _load_float32(audio_path: str, target_sr: int):
+        """用soundfile读取并以多相滤波重采样，全程float32；soundfile不支持的格式回退到librosa"""
+        try:
+            audio, sr = sf.read(audio_path, dtype='float32', always_2d=False)
+        except Exception:
+            if librosa is None:
+                raise
+            return librosa.load(audio_path, sr=target_sr)
+        
+        if audio.ndim > 1:
+            audio = audio.mean(axis=1, dtype=np.float32)
+        if sr != target_sr:
+            from math import gcd
+            from scipy.signal import resample_poly
+            g = gcd(sr, target_sr)
+            audio = resample_poly(audio, target_sr // g, sr // g).astype(np.float32, copy=False)
+        return audio, target_sr
+    
     def is_available(self) -> bool:
         """检查降噪服务是否可用"""
         return self._pipeline is not None
@@ -184,15 +282,12 @@ class DenoisingService:
             try:
                 if os.path.exists(temp_file):
                     os.remove(temp_file)
-                    print(f"🧹 已清理降噪临时文件: {os.path.basename(temp_file)}")
+                    logger.debug("已清理降噪临时文件: %s", os.path.basename(temp_file))
             except Exception as e:
-                print(f"⚠️ 清理临时文件失败 {temp_file}: {e}")
+                logger.warning("清理临时文件失败 %s: %s", temp_file, e)
         self.temp_files.clear()
         
-        # 清理模型管道（如果需要）
-        if self._pipeline:
-            try:
-                # ModelScope管道通常自动管理资源
-                pass
-            except Exception as e:
-                print(f"⚠️ 降噪模型清理失败: {e}")
+        # 归还共享管道的引用，模型由模型缓存按空闲时间回收
+        if self._pipeline is not None:
+            self._pipeline = None
+            get_model_registry().release(self._registry_key)
@@ -47,11 +47,8 @@ class OfflineAudioProcessor:
             # 确保输出目录存在
             os.makedirs(os.path.dirname(output_path), exist_ok=True)
             
-            # 直接拼接字节
-            with open(output_path, 'wb') as f:
-                for segment in audio_segments:
-                    if segment:
-                        f.write(segment)
+            # 直接拼接字节（writev 批量写入）
+            MediaProcessor.write_segments(output_path, audio_segments)
             
             # 验证文件
             if os.path.exists(output_path):
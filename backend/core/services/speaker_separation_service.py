@@ -1,14 +1,42 @@
 import os
+import logging
 import ffmpeg
+import subprocess
 import time
-import torch
-from datetime import datetime, timedelta
+import numpy as np
+import soundfile as sf
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
 from typing import List, Dict, Optional, Tuple, Any, Callable
 from pydub import AudioSegment
 from funasr import AutoModel
-from core.utils.model_manager import ModelManager
+from core.utils.model_manager import ModelManager, get_model_registry, inference_context
 from core.utils.media_processor import MediaProcessor
+from core.utils.pcm import pcm16_to_float32
 from core.utils.download_manager import DownloadManager
+from conf.model import get_default_device
+
+logger = logging.getLogger(__name__)
+
+# 音频预处理（ffmpeg解码）在后台线程执行，与模型预热/推理准备重叠
+_preprocess_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="spk-preprocess")
+
+# 新加载的模型在独立线程中预热，不占用预处理线程
+_warmup_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="spk-warmup")
+
+# 批量处理时提前解码的文件数：当前文件推理时解码下一个，避免同时在内存中保留过多解码结果
+BATCH_PREFETCH = 1
+
+# 模型CPU计算线程数：GPU推理时过多的CPU线程只会互相争抢
+CPU_THREADS = min(8, os.cpu_count() or 1)
+
+# 模型输入采样率，及从ffmpeg管道读取解码结果的块大小
+MODEL_SAMPLE_RATE = 16000
+DECODE_READ_SIZE = 4 << 20
+
+# 保存分离结果时并行写出的最大说话人数
+SAVE_WORKERS = 8
 
 class SpeakerSeparationService:
     """说话人分离服务"""
@@ -16,14 +44,16 @@ class SpeakerSeparationService:
     def __init__(self, model_manager: ModelManager):
         self.model_manager = model_manager
         self.model = None
-        self.device = "cuda" if torch.cuda.is_available() else "cpu"
+        self.device = get_default_device()
         self.hotwords = ""
+        # 同一设备上的说话人分离管道在进程内共享
+        self._registry_key = f"funasr-spk-pipeline:{self.device}"
         self._init_models()
         
     def _init_models(self):
         """初始化说话人分离所需的模型"""
         try:
-            print("🔄 正在初始化说话人分离模型...")
+            logger.info("正在初始化说话人分离模型...")
             
             # 检查说话人分离模型是否可用
             download_manager = DownloadManager(self.model_manager.model_config)
@@ -31,8 +61,8 @@ class SpeakerSeparationService:
             # 检查缺失的说话人分离模型
             missing_models = download_manager.get_missing_speaker_models()
             if missing_models:
-                print(f"⚠️ 缺失说话人分离模型: {missing_models}")
-                print("🔄 正在下载缺失的模型...")
+                logger.warning("缺失说话人分离模型: %s", missing_models)
+                logger.info("正在下载缺失的模型...")
                 
                 results = download_manager.download_speaker_separation_models()
                 failed_models = [name for name, success, _ in results if not success]
@@ -40,7 +70,7 @@ class SpeakerSeparationService:
                 if failed_models:
                     raise Exception(f"说话人分离模型下载失败: {failed_models}")
                 
-                print("✅ 说话人分离模型下载完成")
+                logger.info("说话人分离模型下载完成")
             
             # 获取模型路径
             config = self.model_manager.model_config
@@ -67,34 +97,46 @@ class SpeakerSeparationService:
             punc_version = config.get_model_version("punc-transformer")
             spk_version = config.get_model_version("campplus-speaker")
             
-            # 创建AutoModel实例
-            self.model = AutoModel(
-                model=asr_model_path,
-                model_revision=asr_version,
-                vad_model=vad_model_path,
-                vad_model_revision=vad_version,
-                punc_model=punc_model_path,
-                punc_model_revision=punc_version,
-                spk_model=spk_model_path,
-                spk_model_revision=spk_version,
-                ngpu=1 if torch.cuda.is_available() else 0,
-                ncpu=os.cpu_count(),
-                device=self.device,
-                disable_pbar=True,
-                disable_log=True,
-                disable_update=True
-            )
+            def load_pipeline():
+                model = AutoModel(
+                    model=asr_model_path,
+                    model_revision=asr_version,
+                    vad_model=vad_model_path,
+                    vad_model_revision=vad_version,
+                    punc_model=punc_model_path,
+                    punc_model_revision=punc_version,
+                    spk_model=spk_model_path,
+                    spk_model_revision=spk_version,
+                    ngpu=0 if self.device == "cpu" else 1,
+                    ncpu=CPU_THREADS,
+                    device=self.device,
+                    disable_pbar=True,
+                    disable_log=True,
+                    disable_update=True
+                )
+                # 新加载的模型在后台预热；预热任务挂在模型上，所有复用该模型的实例首次推理前都会等待它结束
+                model._warmup_future = _warmup_executor.submit(self._run_warm_up, model)
+                return model
+
+            # 创建或复用AutoModel实例
+            self.model = get_model_registry().get_or_load(self._registry_key, load_pipeline)
             
-            print(f"✅ 说话人分离模型初始化完成 (设备: {self.device})")
-            print(f"   📦 ASR模型: {os.path.basename(asr_model_path)} ({asr_version})")
-            print(f"   📦 VAD模型: {os.path.basename(vad_model_path)} ({vad_version})")
-            print(f"   📦 标点模型: {os.path.basename(punc_model_path)} ({punc_version})")
-            print(f"   📦 说话人模型: {os.path.basename(spk_model_path)} ({spk_version})")
+            logger.info("说话人分离模型初始化完成 (设备: %s)", self.device)
+            logger.debug("ASR模型: %s (%s)", os.path.basename(asr_model_path), asr_version)
+            logger.debug("VAD模型: %s (%s)", os.path.basename(vad_model_path), vad_version)
+            logger.debug("标点模型: %s (%s)", os.path.basename(punc_model_path), punc_version)
+            logger.debug("说话人模型: %s (%s)", os.path.basename(spk_model_path), spk_version)
             
         except Exception as e:
-            print(f"❌ 说话人分离模型初始化失败: {e}")
+            logger.error("说话人分离模型初始化失败: %s", e)
             raise e
     
+    def release(self):
+        """归还共享模型的引用，模型本身由模型缓存按空闲时间回收"""
+        if self.model is not None:
+            self.model = None
+            get_model_registry().release(self._registry_key)
+    
     def set_hotwords(self, hotwords_file: Optional[str] = None, hotwords_list: Optional[List[str]] = None):
         """设置热词"""
         if hotwords_file and os.path.exists(hotwords_file):
@@ -102,61 +144,156 @@ class SpeakerSeparationService:
                 lines = f.readlines()
                 lines = [line.strip() for line in lines if line.strip()]
             self.hotwords = " ".join(lines)
-            print(f"📝 从文件加载热词: {self.hotwords}")
+            logger.debug("从文件加载热词: %s", self.hotwords)
         elif hotwords_list:
             self.hotwords = " ".join(hotwords_list)
-            print(f"📝 设置热词: {self.hotwords}")
+            logger.debug("设置热词: %s", self.hotwords)
         else:
             self.hotwords = ""
     
     def _to_date(self, milliseconds: int) -> str:
-        """将时间戳转换为SRT格式的时间"""
-        time_obj = timedelta(milliseconds=milliseconds)
-        hours = time_obj.seconds // 3600
-        minutes = (time_obj.seconds // 60) % 60
-        seconds = time_obj.seconds % 60
-        microseconds = time_obj.microseconds // 1000
-        return f"{hours:02d}:{minutes:02d}:{seconds:02d}.{microseconds:03d}"
+        """将时间戳转换为SRT格式的时间（整数运算，不构造timedelta）"""
+        seconds, millis = divmod(int(milliseconds), 1000)
+        minutes, seconds = divmod(seconds, 60)
+        hours, minutes = divmod(minutes, 60)
+        return f"{hours % 24:02d}:{minutes:02d}:{seconds:02d}.{millis:03d}"
+    
+    def _to_dates(self, milliseconds: List[int]) -> List[str]:
+        """批量转换时间戳：时分秒的拆分在NumPy中一次完成，只剩字符串格式化逐个进行"""
+        values = np.asarray(milliseconds, dtype=np.int64)
+        seconds, millis = np.divmod(values, 1000)
+        minutes, seconds = np.divmod(seconds, 60)
+        hours, minutes = np.divmod(minutes, 60)
+        return [
+            f"{h:02d}:{m:02d}:{sec:02d}.{ms:03d}"
+            for h, m, sec, ms in zip((hours % 24).tolist(), minutes.tolist(),
+                                     seconds.tolist(), millis.tolist())
+        ]
+    
+    @staticmethod
+    def _parse_timestamp(timestamp: str) -> float:
+        """把 _to_date 生成的 HH:MM:SS.mmm 转换为秒"""
+        hours, minutes, seconds = timestamp.split(":")
+        return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+    
+    def _load_audio_once(self, audio_file: str) -> Optional[Tuple[np.ndarray, int]]:
+        """一次性解码整段音频为 int16 采样，供各片段按下标切片；无法解码时返回None"""
+        try:
+            samples, sample_rate = sf.read(audio_file, dtype='int16', always_2d=False)
+            return samples, sample_rate
+        except Exception as e:
+            logger.warning("无法直接解码音频，回退到逐段提取: %s", e)
+            return None
+    
+    def _slice_segment(self, samples: np.ndarray, sample_rate: int, segment: Dict[str, Any]) -> np.ndarray:
+        """
+        按片段时间切出采样（视图，不拷贝）
+        
+        优先使用分离时保留的毫秒数，旧结果中没有时才解析时间字符串
+        """
+        if 'start_ms' in segment and 'end_ms' in segment:
+            start = int(round(segment['start_ms'] * sample_rate / 1000))
+            end = int(round(segment['end_ms'] * sample_rate / 1000))
+        else:
+            start = int(round(self._parse_timestamp(segment['start']) * sample_rate))
+            end = int(round(self._parse_timestamp(segment['end']) * sample_rate))
+        return samples[start:end]
     
-    def _preprocess_audio(self, audio_file: str) -> bytes:
-        """预处理音频文件，转换为模型所需格式"""
+    def _run_warm_up(self, model: AutoModel):
+        """用一秒静音跑一遍完整流程，提前完成显存分配和CUDA内核初始化"""
         try:
-            print(f"🔄 预处理音频文件: {audio_file}")
+            with get_model_registry().generate_lock(self._registry_key), inference_context(self.device):
+                model.generate(
+                    input=np.zeros(MODEL_SAMPLE_RATE, dtype=np.float32),
+                    batch_size_s=300,
+                    is_final=True,
+                    sentence_timestamp=True,
+                    hotword=""
+                )
+            if self.device.startswith("cuda"):
+                import torch
+                torch.cuda.synchronize()
+        except Exception as e:
+            # 静音输入可能没有任何语音片段，预热失败不影响正式推理
+            logger.warning("模型预热未完成: %s", e)
+    
+    def _wait_warm_up(self):
+        """等待后台预热结束，避免与正式推理同时使用模型（模型可能由其他实例加载）"""
+        warmup_future = getattr(self.model, "_warmup_future", None)
+        if warmup_future is not None:
+            warmup_future.result()
+            self.model._warmup_future = None
+    
+    def _preprocess_audio(self, audio_file: str) -> np.ndarray:
+        """
+        预处理音频文件，转换为模型所需格式（16kHz单声道 float32）
+        
+        输入已是16kHz单声道PCM16 WAV（如降噪输出）时直接读取采样，跳过ffmpeg；
+        其余情况下 ffmpeg 的输出按块直接读入 int16 数组，不在内存中保留完整的 bytes 副本
+        """
+        try:
+            logger.info("预处理音频文件: %s", audio_file)
             
-            # 使用ffmpeg预处理音频
-            audio_bytes, _ = (
-                ffmpeg.input(audio_file, threads=0)
-                .output("-", format="wav", acodec="pcm_s16le", ac=1, ar=16000)
-                .run(cmd=["ffmpeg", "-nostdin"], capture_stdout=True, capture_stderr=True)
+            # 只解析文件头，不解码
+            try:
+                info = sf.info(audio_file)
+            except Exception:
+                info = None
+            
+            if (info is not None and info.format == 'WAV' and info.subtype == 'PCM_16'
+                    and info.samplerate == MODEL_SAMPLE_RATE and info.channels == 1):
+                samples, _ = sf.read(audio_file, dtype='int16')
+                audio = pcm16_to_float32(samples)
+                logger.info("音频已是模型输入格式，跳过ffmpeg转码")
+                return audio
+            
+            # 使用ffmpeg预处理音频（线程数交给ffmpeg默认值，避免与torch计算线程争抢CPU）
+            process = (
+                ffmpeg.input(audio_file)
+                .output("-", format="s16le", acodec="pcm_s16le", ac=1, ar=MODEL_SAMPLE_RATE)
+                .global_args("-loglevel", "error")  # stderr 只在读完stdout后读取，避免日志塞满管道
+                .run_async(cmd=["ffmpeg", "-nostdin"], pipe_stdout=True, pipe_stderr=True)
             )
             
-            print(f"✅ 音频预处理完成")
-            return audio_bytes
+            # 按容器声明的时长预分配，不够时倍增
+            if info is not None:
+                estimate = int(info.duration * MODEL_SAMPLE_RATE) + 1
+            else:
+                estimate = MODEL_SAMPLE_RATE * 60
+            samples = np.empty(max(estimate, 1), dtype=np.int16)
+            filled = 0
+            pending = b""
+            while True:
+                block = process.stdout.read(DECODE_READ_SIZE)
+                if not block:
+                    break
+                if pending:
+                    block, pending = pending + block, b""
+                if len(block) % 2:
+                    block, pending = block[:-1], block[-1:]
+                block_samples = np.frombuffer(block, dtype=np.int16)
+                if filled + block_samples.size > samples.size:
+                    samples = np.resize(samples, max(samples.size * 2, filled + block_samples.size))
+                samples[filled:filled + block_samples.size] = block_samples
+                filled += block_samples.size
+            
+            stderr = process.stderr.read()
+            if process.wait() != 0:
+                raise RuntimeError(stderr.decode(errors="ignore").strip() or f"ffmpeg 返回码 {process.returncode}")
+            
+            audio = pcm16_to_float32(samples[:filled])
+            logger.info("音频预处理完成")
+            return audio
             
         except Exception as e:
-            print(f"❌ 音频预处理失败: {e}")
+            logger.error("音频预处理失败: %s", e)
             raise e
 
-    def _get_audio_duration(self, audio_file: str) -> float:
-        """获取音频时长（秒）"""
-        try:
-            import subprocess
-            result = subprocess.run(
-                ['ffprobe', '-v', 'error', '-show_entries', 'format=duration',
-                '-of', 'default=noprint_wrappers=1:nokey=1', audio_file],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True
-            )
-            return float(result.stdout.strip())
-        except Exception as e:
-            print(f"获取音频时长失败: {e}")
-            return 0.0
-    
     def separate_speakers(self, 
                          audio_file: str,
                          merge_threshold: int = 10,
-                         progress_callback: Optional[Callable] = None) -> Dict[str, Any]:
+                         progress_callback: Optional[Callable] = None,
+                         preprocessed: Optional[Future] = None) -> Dict[str, Any]:
         """
         执行说话人分离
         
@@ -164,6 +301,7 @@ class SpeakerSeparationService:
             audio_file: 音频文件路径
             merge_threshold: 合并相邻相同说话人的字数阈值
             progress_callback: 进度回调函数
+            preprocessed: 已提交的 _preprocess_audio 任务（批量处理时预取），为None时在此提交
             
         Returns:
             包含分离结果的字典
@@ -175,21 +313,25 @@ class SpeakerSeparationService:
             if progress_callback:
                 progress_callback("开始说话人分离...", 0)
             
-            # 预处理音频
-            audio_bytes = self._preprocess_audio(audio_file)
+            # 预处理音频（后台解码，同时等待模型预热完成）
+            preprocess_future = preprocessed or _preprocess_executor.submit(self._preprocess_audio, audio_file)
+            self._wait_warm_up()
+            audio = preprocess_future.result()
             
             if progress_callback:
                 progress_callback("正在执行语音识别和说话人分离...", 30)
             
             # 执行语音识别和说话人分离
             start_time = time.time()
-            res = self.model.generate(
-                input=audio_bytes, 
-                batch_size_s=300, 
-                is_final=True, 
-                sentence_timestamp=True, 
-                hotword=self.hotwords
-            )
+            # 模型由所有连接共享，推理按模型串行，避免各连接的热词等参数串用
+            with get_model_registry().generate_lock(self._registry_key), inference_context(self.device):
+                res = self.model.generate(
+                    input=audio, 
+                    batch_size_s=300, 
+                    is_final=True, 
+                    sentence_timestamp=True, 
+                    hotword=self.hotwords
+                )
             end_time = time.time()
             
             if progress_callback:
@@ -199,7 +341,7 @@ class SpeakerSeparationService:
             asr_result_text = rec_result['text']
             
             if not asr_result_text:
-                print("⚠️ 没有检测到语音内容")
+                logger.warning("没有检测到语音内容")
                 return {
                     'success': False,
                     'message': '没有检测到语音内容',
@@ -210,57 +352,58 @@ class SpeakerSeparationService:
                     'processing_time': end_time - start_time
                 }
             
-            # 处理句子信息，合并相邻相同说话人的短句
-            sentences = []
+            # 处理句子信息，合并相邻相同说话人的短句（先保留毫秒数，合并完成后再统一格式化）
+            merged = []
+            last = None
             for sentence in rec_result["sentence_info"]:
-                start = self._to_date(sentence["start"])
-                end = self._to_date(sentence["end"])
-                
+                spk = sentence["spk"]
                 # 如果是相同说话人且当前句子长度小于阈值，则合并
-                if (sentences and 
-                    sentence["spk"] == sentences[-1]["spk"] and 
-                    len(sentences[-1]["text"]) < merge_threshold):
-                    sentences[-1]["text"] += sentence["text"]
-                    sentences[-1]["end"] = end
+                if last is not None and spk == last[0] and len(last[1]) < merge_threshold:
+                    last[1] += sentence["text"]
+                    last[3] = sentence["end"]
                 else:
-                    sentences.append({
-                        "text": sentence["text"],
-                        "start": start,
-                        "end": end,
-                        "spk": sentence["spk"]
-                    })
+                    last = [spk, sentence["text"], sentence["start"], sentence["end"]]
+                    merged.append(last)
+            
+            starts = self._to_dates([item[2] for item in merged])
+            ends = self._to_dates([item[3] for item in merged])
+            # 保留整数毫秒，保存音频片段时直接换算采样下标，无需再解析时间字符串
+            sentences = [
+                {"text": text, "start": start, "end": end, "spk": spk,
+                 "start_ms": int(start_ms), "end_ms": int(end_ms)}
+                for (spk, text, start_ms, end_ms), start, end in zip(merged, starts, ends)
+            ]
             
             # 按说话人分组
-            speakers = {}
+            segments_by_spk: Dict[Any, List[Dict[str, Any]]] = {}
             for sentence in sentences:
-                spk_id = sentence["spk"]
-                if spk_id not in speakers:
-                    speakers[spk_id] = {
-                        'segments': [],
-                        'total_text': '',
-                        'total_duration': 0
-                    }
-                
-                speakers[spk_id]['segments'].append({
+                segments_by_spk.setdefault(sentence["spk"], []).append({
                     'text': sentence['text'],
                     'start': sentence['start'],
-                    'end': sentence['end']
+                    'end': sentence['end'],
+                    'start_ms': sentence['start_ms'],
+                    'end_ms': sentence['end_ms']
                 })
-                speakers[spk_id]['total_text'] += sentence['text']
+            speakers = {
+                spk_id: {
+                    'segments': segments,
+                    'total_text': ''.join(seg['text'] for seg in segments),
+                    'total_duration': 0
+                }
+                for spk_id, segments in segments_by_spk.items()
+            }
             
             if progress_callback:
                 progress_callback("分离完成", 100)
             
-            print(f"✅ 说话人分离完成，耗时: {end_time - start_time:.2f}秒")
-            print(f"📊 检测到 {len(speakers)} 个说话人")
-            for spk_id, info in speakers.items():
-                print(f"   说话人 {spk_id}: {len(info['segments'])} 个片段")
+            logger.info("说话人分离完成，耗时: %.2f秒", end_time - start_time)
+            logger.info("检测到 %s 个说话人", len(speakers))
+            if logger.isEnabledFor(logging.DEBUG):
+                for spk_id, info in speakers.items():
+                    logger.debug("说话人 %s: %s 个片段", spk_id, len(info['segments']))
 
-            try:
-                audio_duration = self._get_audio_duration(audio_file)
-            except Exception as e:
-                print(f"获取音频时长失败: {e}")
-                audio_duration = 0.0
+            # 解码结果即为完整音频，直接由采样数得出时长，无需再调用ffprobe
+            audio_duration = len(audio) / MODEL_SAMPLE_RATE
             
             return {
                 'success': True,
@@ -275,7 +418,7 @@ class SpeakerSeparationService:
             
         except Exception as e:
             error_msg = f"说话人分离失败: {e}"
-            print(f"❌ {error_msg}")
+            logger.error(error_msg)
             if progress_callback:
                 progress_callback(f"错误: {error_msg}", -1)
             return {
@@ -319,6 +462,9 @@ class SpeakerSeparationService:
             final_output_dir = os.path.join(output_dir, date, audio_name)
             os.makedirs(final_output_dir, exist_ok=True)
             
+            # 需要输出音频时只解码一次源文件
+            decoded = self._load_audio_once(audio_file) if save_audio_segments else None
+            
             saved_paths = {
                 'base_dir': final_output_dir,
                 'text_files': {},
@@ -326,65 +472,106 @@ class SpeakerSeparationService:
                 'merged_audio': {}
             }
             
-            # 保存每个说话人的文本
-            for spk_id, info in speakers.items():
-                # 创建说话人目录
-                spk_dir = os.path.join(final_output_dir, f"speaker_{spk_id}")
-                os.makedirs(spk_dir, exist_ok=True)
-                
-                # 保存文本文件
-                text_file = os.path.join(spk_dir, f"speaker_{spk_id}.txt")
-                with open(text_file, 'w', encoding='utf-8') as f:
-                    for segment in info['segments']:
-                        f.write(f"{segment['start']} --> {segment['end']}\n")
-                        f.write(f"{segment['text']}\n\n")
-                
-                saved_paths['text_files'][spk_id] = text_file
-                
-                # 保存音频片段（如果需要）
-                if save_audio_segments:
-                    segment_files = []
-                    for i, segment in enumerate(info['segments']):
-                        segment_file = os.path.join(spk_dir, f"segment_{i:03d}.wav")
-                        self._extract_audio_segment(
-                            audio_file, 
-                            segment['start'], 
-                            segment['end'], 
-                            segment_file
-                        )
-                        segment_files.append(segment_file)
-                    
-                    saved_paths['audio_segments'][spk_id] = segment_files
-                    
-                    # 合并说话人的所有音频片段（如果需要）
-                    if save_merged_audio and segment_files:
-                        merged_file = os.path.join(spk_dir, f"speaker_{spk_id}_merged.mp3")
-                        self._merge_audio_segments(segment_files, merged_file)
-                        saved_paths['merged_audio'][spk_id] = merged_file
+            # 各说话人的目录、文本和音频互不依赖，并行写出（ffmpeg/文件IO期间释放GIL）
+            workers = max(1, min(SAVE_WORKERS, len(speakers)))
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="spk-save") as executor:
+                speaker_paths = list(executor.map(
+                    lambda item: self._save_one_speaker(
+                        item[0], item[1], final_output_dir, audio_file, decoded,
+                        save_audio_segments, save_merged_audio
+                    ),
+                    speakers.items()
+                ))
+            
+            for spk_id, paths in zip(speakers, speaker_paths):
+                saved_paths['text_files'][spk_id] = paths['text_file']
+                if 'audio_segments' in paths:
+                    saved_paths['audio_segments'][spk_id] = paths['audio_segments']
+                if 'merged_audio' in paths:
+                    saved_paths['merged_audio'][spk_id] = paths['merged_audio']
             
             # 保存完整的分离报告
             report_file = os.path.join(final_output_dir, "separation_report.txt")
-            with open(report_file, 'w', encoding='utf-8') as f:
-                f.write(f"说话人分离报告\n")
-                f.write(f"=" * 50 + "\n")
-                f.write(f"音频文件: {audio_file}\n")
-                f.write(f"处理时间: {separation_result['processing_time']:.2f}秒\n")
-                f.write(f"检测到说话人数量: {len(speakers)}\n\n")
-                
-                for spk_id, info in speakers.items():
-                    f.write(f"说话人 {spk_id}:\n")
-                    f.write(f"  片段数量: {len(info['segments'])}\n")
-                    f.write(f"  总文本: {info['total_text'][:100]}...\n\n")
+            report_lines = [
+                f"说话人分离报告\n",
+                f"=" * 50 + "\n",
+                f"音频文件: {audio_file}\n",
+                f"处理时间: {separation_result['processing_time']:.2f}秒\n",
+                f"检测到说话人数量: {len(speakers)}\n\n",
+            ]
+            for spk_id, info in speakers.items():
+                report_lines.append(
+                    f"说话人 {spk_id}:\n"
+                    f"  片段数量: {len(info['segments'])}\n"
+                    f"  总文本: {info['total_text'][:100]}...\n\n"
+                )
+            Path(report_file).write_text(''.join(report_lines), encoding='utf-8')
             
             saved_paths['report'] = report_file
             
-            print(f"✅ 分离结果已保存到: {final_output_dir}")
+            logger.info("分离结果已保存到: %s", final_output_dir)
             return saved_paths
             
         except Exception as e:
-            print(f"❌ 保存分离结果失败: {e}")
+            logger.error("保存分离结果失败: %s", e)
             raise e
     
+    def _save_one_speaker(self,
+                          spk_id: Any,
+                          info: Dict[str, Any],
+                          final_output_dir: str,
+                          audio_file: str,
+                          decoded: Optional[Tuple[np.ndarray, int]],
+                          save_audio_segments: bool,
+                          save_merged_audio: bool) -> Dict[str, Any]:
+        """保存单个说话人的文本、音频片段和合并音频，返回各文件路径"""
+        # 创建说话人目录
+        spk_dir = os.path.join(final_output_dir, f"speaker_{spk_id}")
+        os.makedirs(spk_dir, exist_ok=True)
+        
+        # 保存文本文件（内容拼好后一次写入，减少慢速/网络文件系统上的小写入）
+        text_file = os.path.join(spk_dir, f"speaker_{spk_id}.txt")
+        Path(text_file).write_text(''.join(
+            f"{segment['start']} --> {segment['end']}\n{segment['text']}\n\n"
+            for segment in info['segments']
+        ), encoding='utf-8')
+        
+        paths = {'text_file': text_file}
+        
+        # 保存音频片段（如果需要）
+        if save_audio_segments:
+            segment_files = []
+            slices = []
+            for i, segment in enumerate(info['segments']):
+                segment_file = os.path.join(spk_dir, f"segment_{i:03d}.wav")
+                if decoded is not None:
+                    # 直接从已解码的采样中切片写出，不再为每个片段启动ffmpeg
+                    samples, sample_rate = decoded
+                    piece = self._slice_segment(samples, sample_rate, segment)
+                    sf.write(segment_file, piece, sample_rate, subtype='PCM_16')
+                    slices.append(piece)
+                else:
+                    self._extract_audio_segment(
+                        audio_file, 
+                        segment['start'], 
+                        segment['end'], 
+                        segment_file
+                    )
+                segment_files.append(segment_file)
+            
+            paths['audio_segments'] = segment_files
+            
+            # 合并说话人的所有音频片段（如果需要）
+            if save_merged_audio and segment_files:
+                merged_file = os.path.join(spk_dir, f"speaker_{spk_id}_merged.mp3")
+                if decoded is not None:
+                    self._export_merged_samples(slices, decoded[1], merged_file)
+                else:
+                    self._merge_audio_segments(segment_files, merged_file)
+                paths['merged_audio'] = merged_file
+        
+        return paths
+    
     def _extract_audio_segment(self, audio_file: str, start_time: str, end_time: str, output_file: str):
         """提取音频片段"""
         try:
@@ -394,7 +581,34 @@ class SpeakerSeparationService:
                 .run(cmd=["ffmpeg", "-nostdin"], overwrite_output=True, capture_stdout=True, capture_stderr=True)
             )
         except Exception as e:
-            print(f"⚠️ 提取音频片段失败: {e}")
+            logger.warning("提取音频片段失败: %s", e)
+    
+    def _export_merged_samples(self, slices: List[np.ndarray], sample_rate: int, output_file: str):
+        """把已切好的采样拼接后一次编码输出，不再重新解码各片段文件"""
+        try:
+            if not slices:
+                return
+            
+            merged = np.concatenate(slices)
+            channels = merged.shape[1] if merged.ndim > 1 else 1
+            self._encode_mp3(merged.tobytes(), sample_rate, channels, output_file)
+            logger.info("音频片段已合并到: %s", output_file)
+            
+        except Exception as e:
+            logger.warning("合并音频片段失败: %s", e)
+    
+    @staticmethod
+    def _encode_mp3(pcm: bytes, sample_rate: int, channels: int, output_file: str):
+        """把 16-bit PCM 通过管道交给ffmpeg，一次编码为mp3"""
+        subprocess.run(
+            ["ffmpeg", "-nostdin", "-y", "-loglevel", "error",
+             "-f", "s16le", "-ar", str(sample_rate), "-ac", str(channels), "-i", "pipe:0",
+             "-codec:a", "libmp3lame", "-q:a", "4", output_file],
+            input=pcm,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            check=True
+        )
     
     def _merge_audio_segments(self, segment_files: List[str], output_file: str):
         """合并音频片段"""
@@ -402,18 +616,20 @@ class SpeakerSeparationService:
             if not segment_files:
                 return
             
-            # 使用pydub合并音频
-            combined = AudioSegment.from_file(segment_files[0])
-            for segment_file in segment_files[1:]:
-                if os.path.exists(segment_file):
-                    segment = AudioSegment.from_file(segment_file)
-                    combined += segment
-            
-            combined.export(output_file, format="mp3")
-            print(f"✅ 音频片段已合并到: {output_file}")
+            # 逐个解码后一次拼接PCM（AudioSegment 反复 += 会不断复制已累积的数据）
+            segments = [
+                AudioSegment.from_file(f).set_sample_width(2)
+                for f in segment_files if os.path.exists(f)
+            ]
+            if not segments:
+                return
+            first = segments[0]
+            pcm = b"".join(seg.raw_data for seg in segments)
+            self._encode_mp3(pcm, first.frame_rate, first.channels, output_file)
+            logger.info("音频片段已合并到: %s", output_file)
             
         except Exception as e:
-            print(f"⚠️ 合并音频片段失败: {e}")
+            logger.warning("合并音频片段失败: %s", e)
     
     def batch_separate_speakers(self, 
                               audio_files: List[str], 
@@ -435,16 +651,28 @@ class SpeakerSeparationService:
         results = []
         total_files = len(audio_files)
         
+        # 预取：推理当前文件时，后台解码后续文件
+        prefetched: Dict[int, Future] = {}
+        
+        def prefetch(index: int):
+            if index < total_files and os.path.exists(audio_files[index]):
+                prefetched[index] = _preprocess_executor.submit(self._preprocess_audio, audio_files[index])
+        
+        for index in range(min(BATCH_PREFETCH, total_files)):
+            prefetch(index)
+        
         for i, audio_file in enumerate(audio_files):
+            prefetch(i + BATCH_PREFETCH)
             try:
                 if progress_callback:
                     progress_callback(f"处理文件 {i+1}/{total_files}: {os.path.basename(audio_file)}", 
                                     int((i / total_files) * 100))
                 
-                print(f"\n🔄 处理文件 {i+1}/{total_files}: {audio_file}")
+                logger.info("处理文件 %s/%s: %s", i+1, total_files, audio_file)
                 
                 # 执行说话人分离
-                result = self.separate_speakers(audio_file, merge_threshold)
+                result = self.separate_speakers(audio_file, merge_threshold,
+                                                preprocessed=prefetched.pop(i, None))
                 
                 if result['success']:
                     # 保存结果
@@ -460,7 +688,7 @@ class SpeakerSeparationService:
                     'audio_file': audio_file
                 }
                 results.append(error_result)
-                print(f"❌ 处理文件失败: {audio_file}, 错误: {e}")
+                logger.error("处理文件失败: %s, 错误: %s", audio_file, e)
         
         if progress_callback:
             progress_callback("批量处理完成", 100)
@@ -52,7 +52,9 @@ class SpeechRecognitionService:
             print(f"使用模型: {model_name}, 语言: {language}")
             
             # 执行识别
-            res = model.generate(**params)
+            # 模型由所有连接共享，推理按模型串行
+            with self.model_manager.generate_lock(model_name):
+                res = model.generate(**params)
             
             if res and len(res) > 0 and "text" in res[0]:
                 # 后处理
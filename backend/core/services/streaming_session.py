@@ -7,16 +7,31 @@
 3. 资源所有权明确：谁创建谁负责清理
 4. 无状态机复杂性：要么运行要么停止
 """
+import io
 import asyncio
 import logging
+from collections import deque
 import numpy as np
 from time import time
-from typing import Optional, Callable, AsyncIterator
+from typing import Optional, Callable, AsyncIterator, List
 from core.utils.ffmpeg_manager import FFmpegAudioManager, FFmpegState
+from core.utils.pcm import pcm16_to_float32
 from core.services.streaming_speech_service import StreamingSpeechService
 
 logger = logging.getLogger(__name__)
 
+# float32 缓冲池保留的缓冲区数：一块在转录、一块在填充
+FLOAT_POOL_KEEP = 2
+
+# 转录跟不上时一次最多合并的排队音频块数
+TRANSCRIBE_BATCH_MAX = 4
+
+# 流结束时若没有剩余音频，用一小段静音（0.1秒）触发模型输出缓存中的尾部结果
+FLUSH_SAMPLES = 1600
+
+# 转录队列最多排队的音频块数（默认5秒一块，约30秒）；超出时丢弃最旧的块，转录结果不会越来越滞后于实时
+TRANSCRIPTION_QUEUE_MAX = 6
+
 
 class StreamingSession:
     """单个流式转录会话 - 简洁、独立、可并发"""
@@ -27,7 +42,8 @@ class StreamingSession:
         speech_service: StreamingSpeechService,
         sample_rate: int = 16000,
         channels: int = 1,
-        chunk_duration: float = 5.0
+        chunk_duration: float = 5.0,
+        input_format: Optional[str] = None
     ):
         self.session_id = session_id
         self.speech_service = speech_service
@@ -42,11 +58,25 @@ class StreamingSession:
         self.samples_per_chunk = int(sample_rate * chunk_duration)
         self.bytes_per_chunk = self.samples_per_chunk * self.bytes_per_sample * channels
         self.max_buffer_size = self.bytes_per_chunk * 10
+        # FFmpeg按固定码率输出，单次读取半个块（块很短时不低于默认IO块大小）
+        self._read_size = max(self.bytes_per_chunk // 2, io.DEFAULT_BUFFER_SIZE)
+        # 暂无数据时的等待间隔，不超过块时长的1/4
+        self._idle_sleep = min(0.1, chunk_duration / 4)
         
         # 核心组件
-        self.ffmpeg = FFmpegAudioManager(sample_rate=sample_rate, channels=channels)
-        self.pcm_buffer = bytearray()
-        self.transcription_queue = asyncio.Queue()
+        # input_format='s16le' 时客户端已发送PCM，FFmpeg管理器直通数据，不启动解码进程
+        self.ffmpeg = FFmpegAudioManager(sample_rate=sample_rate, channels=channels, input_format=input_format)
+        # PCM数据按读到的块排队，取数据时只拷贝取出的部分，不再整体切片重建缓冲区
+        self.pcm_buffer: deque = deque()
+        self._buffered_bytes = 0
+        # 读到奇数字节时暂存最后一个字节，保证队列中的每块都是整数个采样，可以直接按 int16 解释
+        self._odd_byte = b""
+        # 转录用的 float32 缓冲区按需创建，转录完归还复用
+        self._float_pool: deque = deque()
+        # 读取器 -> 转录器的通道：单生产者单消费者，deque + Event 即可，一次唤醒取走全部积压的块
+        self.transcription_queue: deque = deque()
+        self._chunk_event = asyncio.Event()
+        self._eof = False
         
         # 状态标志 - 简单明了
         self.running = False
@@ -55,6 +85,17 @@ class StreamingSession:
         # 异步任务
         self.tasks = []
         
+        # 本会话的流式识别缓存：整个会话内保留编码/解码上下文，逐块增量解码
+        self._stream_cache: dict = {}
+        
+        # 转录结果中固定不变的字段，每次结果只复制后填入变化的部分
+        self._result_template = {
+            'confidence': 0.95,
+            'speaker_id': 'speaker_1',
+            'is_final': False,
+            'session_id': session_id
+        }
+        
         # 回调函数
         self.on_transcription: Optional[Callable] = None
         self.on_error: Optional[Callable] = None
@@ -81,7 +122,9 @@ class StreamingSession:
             logger.error(f"[{self.session_id}] Failed to start FFmpeg")
             return False
         
-        # 2. 标记运行状态
+        # 2. 标记运行状态（新的音频流从空的识别缓存开始）
+        self._stream_cache = {}
+        self._eof = False
         self.running = True
         self.stopping = False
         
@@ -152,6 +195,10 @@ class StreamingSession:
         
         self.tasks.clear()
         self.pcm_buffer.clear()
+        self.transcription_queue.clear()
+        self._buffered_bytes = 0
+        self._odd_byte = b""
+        self._float_pool.clear()
         
         logger.info(f"[{self.session_id}] Cleanup complete")
     
@@ -163,8 +210,8 @@ class StreamingSession:
             "running": self.running,
             "stopping": self.stopping,
             "ffmpeg_state": ffmpeg_state.value,
-            "buffer_size": len(self.pcm_buffer),
-            "queue_size": self.transcription_queue.qsize()
+            "buffer_size": self._buffered_bytes,
+            "queue_size": len(self.transcription_queue)
         }
     
     # ==================== 内部处理任务 ====================
@@ -172,7 +219,6 @@ class StreamingSession:
     async def _ffmpeg_reader(self):
         """FFmpeg输出读取器"""
         logger.info(f"[{self.session_id}] FFmpeg reader started")
-        beg = time()
         
         try:
             while self.running and not self.stopping:
@@ -186,34 +232,33 @@ class StreamingSession:
                         await asyncio.sleep(0.5)
                         continue
                     
-                    # 动态缓冲区大小
-                    current_time = time()
-                    elapsed = max(0.1, current_time - beg)
-                    buffer_size = max(int(32000 * elapsed), 4096)
-                    beg = current_time
-                    
                     # 读取PCM数据
-                    chunk = await self.ffmpeg.read_data(buffer_size)
+                    chunk = await self.ffmpeg.read_data(self._read_size)
                     
                     if not chunk:
                         if self.stopping:
                             break
-                        await asyncio.sleep(0.1)
+                        await asyncio.sleep(self._idle_sleep)
                         continue
                     
-                    # 添加到缓冲区
-                    self.pcm_buffer.extend(chunk)
+                    # 添加到缓冲区（采样跨块时把半个采样留给下一块）
+                    if self._odd_byte:
+                        chunk, self._odd_byte = self._odd_byte + chunk, b""
+                    if len(chunk) % self.bytes_per_sample:
+                        self._odd_byte = bytes(chunk[-1:])
+                        chunk = memoryview(chunk)[:-1]
+                    self.pcm_buffer.append(chunk)
+                    self._buffered_bytes += len(chunk)
                     
                     # 当有足够数据时处理
-                    if len(self.pcm_buffer) >= self.bytes_per_chunk:
-                        pcm_chunk = self.pcm_buffer[:self.max_buffer_size]
-                        self.pcm_buffer = self.pcm_buffer[self.max_buffer_size:]
-                        
-                        # 转换为numpy数组
-                        audio_array = self._pcm_to_float(pcm_chunk)
+                    if self._buffered_bytes >= self.bytes_per_chunk:
+                        frame_size = self.bytes_per_sample * self.channels
+                        take = min(self._buffered_bytes, self.max_buffer_size)
+                        # 转换为numpy数组，直接写入池中的独立缓冲区
+                        audio_array = self._take_float(take - take % frame_size)
                         
-                        # 放入转录队列
-                        await self.transcription_queue.put(audio_array.copy())
+                        # 放入转录队列（缓冲区由转录处理器用完后归还）
+                        self._enqueue(audio_array)
                 
                 except Exception as e:
                     logger.error(f"[{self.session_id}] FFmpeg reader error: {e}")
@@ -224,7 +269,8 @@ class StreamingSession:
         
         finally:
             # 发送结束信号
-            await self.transcription_queue.put(None)
+            self._eof = True
+            self._chunk_event.set()
             logger.info(f"[{self.session_id}] FFmpeg reader stopped")
     
     async def _transcription_processor(self):
@@ -233,32 +279,39 @@ class StreamingSession:
         
         try:
             while True:
+                end_signal = False
                 try:
                     # 等待音频数据
-                    audio_array = await self.transcription_queue.get()
-                    
-                    # 检查结束信号
-                    if audio_array is None:
-                        logger.info(f"[{self.session_id}] Transcription end signal received")
-                        self.transcription_queue.task_done()
-                        break
+                    if not self.transcription_queue:
+                        # 检查结束信号（结束前已排队的音频块已处理完）
+                        if self._eof:
+                            logger.info(f"[{self.session_id}] Transcription end signal received")
+                            end_signal = True
+                            if self._stream_cache:
+                                # 没有剩余音频，用一小段静音结束流式解码，取回缓存中的尾部结果
+                                await self._transcribe_and_notify([np.zeros(FLUSH_SAMPLES, dtype=np.float32)], True)
+                            break
+                        await self._chunk_event.wait()
+                        self._chunk_event.clear()
+                        continue
                     
-                    # 异步转录
-                    result = await asyncio.get_event_loop().run_in_executor(
-                        None,
-                        self._transcribe_chunk,
-                        audio_array
-                    )
+                    # 取走已经排队的块，合并为一次转录；流已结束且这是最后一批时带上结束标记
+                    batch = [self.transcription_queue.popleft()
+                             for _ in range(min(len(self.transcription_queue), TRANSCRIBE_BATCH_MAX))]
+                    end_signal = self._eof and not self.transcription_queue
                     
-                    # 回调
-                    if result and self.on_transcription:
-                        await self.on_transcription(result)
+                    await self._transcribe_and_notify(batch, end_signal)
+                    for audio_array in batch:
+                        self._release_float_buffer(audio_array)
                     
-                    self.transcription_queue.task_done()
+                    if end_signal:
+                        logger.info(f"[{self.session_id}] Transcription end signal received")
+                        break
                 
                 except Exception as e:
                     logger.error(f"[{self.session_id}] Transcription error: {e}")
-                    self.transcription_queue.task_done()
+                    if end_signal:
+                        break
         
         except Exception as e:
             logger.error(f"[{self.session_id}] Transcription processor crashed: {e}")
@@ -266,31 +319,72 @@ class StreamingSession:
         finally:
             logger.info(f"[{self.session_id}] Transcription processor stopped")
     
-    def _pcm_to_float(self, pcm_buffer: bytes) -> np.ndarray:
-        """PCM转浮点数组"""
-        audio_int16 = np.frombuffer(pcm_buffer, dtype=np.int16)
-        return audio_int16.astype(np.float32) / 32768.0
+    async def _transcribe_and_notify(self, audio_arrays: List[np.ndarray], is_final: bool):
+        """在线程池中转录一批音频块，并把结果交给回调"""
+        result = await asyncio.get_running_loop().run_in_executor(
+            None,
+            self._transcribe_chunk,
+            audio_arrays,
+            is_final
+        )
+        if result and self.on_transcription:
+            await self.on_transcription(result)
     
-    def _transcribe_chunk(self, audio_array: np.ndarray) -> Optional[dict]:
-        """转录音频块 - 同步方法"""
+    def _enqueue(self, audio_array: np.ndarray):
+        """放入转录队列；队列已满时丢弃最旧的音频块，保证延迟和内存都有上限"""
+        if len(self.transcription_queue) >= TRANSCRIPTION_QUEUE_MAX:
+            logger.warning(f"[{self.session_id}] Transcription lagging, dropped oldest chunk")
+            self._release_float_buffer(self.transcription_queue.popleft())
+        self.transcription_queue.append(audio_array)
+        self._chunk_event.set()
+    
+    def _take_float(self, size: int) -> np.ndarray:
+        """
+        从块队列头部取出 size 字节PCM，逐块转换后直接写入池中的 float32 缓冲区
+        
+        PCM不先拼接成连续的字节缓冲区，每个采样只被读取一次；头部块只消耗一部分时剩余部分留在队首
+        """
+        if self._float_pool:
+            out = self._float_pool.popleft()
+        else:
+            out = np.empty(self.max_buffer_size // self.bytes_per_sample, dtype=np.float32)
+        filled = 0
+        while filled < size:
+            block = self.pcm_buffer.popleft()
+            need = size - filled
+            if len(block) > need:
+                self.pcm_buffer.appendleft(memoryview(block)[need:])
+                block = memoryview(block)[:need]
+            start = filled // self.bytes_per_sample
+            pcm16_to_float32(block, out[start:start + len(block) // self.bytes_per_sample])
+            filled += len(block)
+        self._buffered_bytes -= size
+        return out[:size // self.bytes_per_sample]
+    
+    def _release_float_buffer(self, audio_array: np.ndarray):
+        """把转录完的数组所在缓冲区归还缓冲池"""
+        if len(self._float_pool) >= FLOAT_POOL_KEEP:
+            return
+        buffer = audio_array.base if audio_array.base is not None else audio_array
+        self._float_pool.append(buffer)
+    
+    def _transcribe_chunk(self, audio_arrays: List[np.ndarray], is_final: bool = False) -> Optional[dict]:
+        """转录连续的一个或多个音频块 - 同步方法，合并为一次模型调用，沿用会话的流式缓存"""
         try:
-            import datetime
-            
             results = list(self.speech_service.stream_recognize_chunks(
-                audio_chunks=[audio_array],
-                sample_rate=self.sample_rate
+                audio_chunks=audio_arrays,
+                sample_rate=self.sample_rate,
+                merge=True,
+                cache=self._stream_cache,
+                is_final=is_final
             ))
             
             if results:
-                return {
-                    'text': results[-1],
-                    'confidence': 0.95,
-                    'speaker_id': 'speaker_1',
-                    'timestamp': datetime.datetime.now().isoformat(),
-                    'is_final': False,
-                    'audio_duration': len(audio_array) / self.sample_rate,
-                    'session_id': self.session_id
-                }
+                result = self._result_template.copy()
+                result['text'] = ''.join(results)
+                result['timestamp'] = time()
+                result['audio_duration'] = sum(len(a) for a in audio_arrays) / self.sample_rate
+                return result
         except Exception as e:
             logger.error(f"[{self.session_id}] Transcription failed: {e}")
         
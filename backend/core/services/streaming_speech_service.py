@@ -1,10 +1,13 @@
 import os
+import asyncio
 import numpy as np
-from typing import Optional, Generator, Callable, Union
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import AsyncIterator, Dict, Optional, Generator, Callable, Tuple, Union
 import soundfile
 import torchaudio
 import torch
-from core.utils.model_manager import ModelManager
+from core.utils.model_manager import ModelManager, quantize_for_cpu
 
 class StreamingSpeechService:
     """流式语音识别服务"""
@@ -14,14 +17,31 @@ class StreamingSpeechService:
         self.cache = {}
         self.current_model = None
         self.streaming_config = None
+        # 已准备好的模型名：重复调用时不再重新查找模型和流式配置
+        self._prepared_model_name: Optional[str] = None
+        # 绑定了流式配置参数的 generate，热路径只需传入音频、缓存和结束标记
+        self._generate: Optional[Callable] = None
+        # 逐块打印识别进度（调试用），默认关闭，避免热路径上的格式化和输出开销
+        self._verbose = False
+        # 重采样器按 (原采样率, 目标采样率) 缓存，滤波器系数只计算一次
+        self._resamplers: Dict[Tuple[int, int], torchaudio.transforms.Resample] = {}
     
-    def _prepare_streaming_model(self, model_name: str = "paraformer-zh-streaming") -> bool:
-        """准备流式模型"""
+    def _prepare_streaming_model(self, model_name: str = "paraformer-zh-streaming", reset_cache: bool = True) -> bool:
+        """准备流式模型（同一模型只查找一次），reset_cache 为True时清空服务自身的流式缓存"""
+        # 已准备好同一模型时直接返回，不再查找模型和流式配置
+        if self.current_model is not None and model_name == self._prepared_model_name:
+            if reset_cache:
+                self.cache = {}
+            return True
+        
         try:
+            self._prepared_model_name = None
             self.current_model = self.model_manager.get_model(model_name)
             if not self.current_model:
                 print(f"❌ 无法加载流式模型: {model_name}")
                 return False
+            # CPU上按配置做int8动态量化（模型由管理器共享，只量化一次）
+            quantize_for_cpu(self.current_model)
             
             # 获取流式配置
             self.streaming_config = self.model_manager.model_config.get_streaming_config(model_name)
@@ -29,15 +49,48 @@ class StreamingSpeechService:
                 print(f"❌ 无法获取流式配置: {model_name}")
                 return False
             
-            # 重置缓存
+            bound_generate = partial(
+                self.current_model.generate,
+                chunk_size=self.streaming_config["chunk_size"],
+                encoder_chunk_look_back=self.streaming_config["encoder_chunk_look_back"],
+                decoder_chunk_look_back=self.streaming_config["decoder_chunk_look_back"]
+            )
+            # 模型由所有连接共享，推理按模型串行，避免各连接的流式缓存串用
+            generate_lock = self.model_manager.generate_lock(model_name)
+            
+            def _generate(**kwargs):
+                with generate_lock:
+                    return bound_generate(**kwargs)
+            self._generate = _generate
+            self._prepared_model_name = model_name
+            self._warm_up()
+            
+            # 换了模型，旧模型的流式缓存不能再用
             self.cache = {}
-            print(f"✓ 流式模型准备完成: {model_name}")
+            if self._verbose:
+                print(f"✓ 流式模型准备完成: {model_name}")
             return True
             
         except Exception as e:
             print(f"❌ 准备流式模型失败: {e}")
             return False
     
+    def _warm_up(self):
+        """
+        用一个步长的静音预热流式模型（每个共享模型只做一次），
+        把CUDA内核加载、显存分配等首次推理开销挪出用户的第一句话
+        """
+        if getattr(self.current_model, "_streaming_warmed", False):
+            return
+        try:
+            dummy = np.zeros(self._calculate_chunk_stride(16000), dtype=np.float32)
+            self._generate(input=dummy, cache={}, is_final=True)
+            if str(self.current_model.kwargs.get("device", "cpu")).startswith("cuda"):
+                torch.cuda.synchronize()
+            self.current_model._streaming_warmed = True
+        except Exception as e:
+            print(f"⚠️ 流式模型预热失败: {e}")
+    
     def _calculate_chunk_stride(self, sample_rate: int = 16000) -> int:
         """计算块步长"""
         chunk_stride_ms = self.streaming_config.get("chunk_stride_ms", 600)
@@ -61,16 +114,19 @@ class StreamingSpeechService:
         try:
             print(f"🔄 使用FunASR重采样功能: {original_sr}Hz -> {target_sr}Hz")
             
-            # 转换为torch tensor
-            speech_tensor = torch.from_numpy(speech)
+            # 转换为torch tensor（已是连续float32数组时共享内存，不拷贝）
+            speech_tensor = torch.as_tensor(np.ascontiguousarray(speech, dtype=np.float32))
             
-            # 使用torchaudio的重采样器
-            resampler = torchaudio.transforms.Resample(original_sr, target_sr)
+            # 使用torchaudio的重采样器（按采样率对复用）
+            key = (original_sr, target_sr)
+            resampler = self._resamplers.get(key)
+            if resampler is None:
+                resampler = self._resamplers[key] = torchaudio.transforms.Resample(
+                    original_sr, target_sr, dtype=torch.float32
+                )
             
-            # 重采样 (需要添加batch维度)
-            if speech_tensor.dim() == 1:
-                resampled = resampler(speech_tensor.unsqueeze(0)).squeeze(0)
-            else:
+            # 重采样（Resample 接受 (..., time) 形状，一维音频无需添加batch维度）
+            with torch.inference_mode():
                 resampled = resampler(speech_tensor)
             
             # 转换回numpy
@@ -84,47 +140,34 @@ class StreamingSpeechService:
             print("⚠️ 将继续使用原始音频，但可能影响识别效果")
             return speech
     
-    def stream_recognize_file(self, 
-                            audio_file: str, 
-                            model_name: str = "paraformer-zh-streaming",
-                            callback: Optional[Callable] = None) -> Generator[str, None, None]:
-        """
-        流式识别音频文件
-        
-        Args:
-            audio_file: 音频文件路径
-            model_name: 模型名称
-            callback: 结果回调函数
-        
-        Yields:
-            识别结果
-        """
-        if not os.path.exists(audio_file):
-            raise FileNotFoundError(f"音频文件不存在: {audio_file}")
-        
-        # 准备模型
-        if not self._prepare_streaming_model(model_name):
-            return
+    def _load_audio_file(self, audio_file: str) -> np.ndarray:
+        """读取音频文件，采样率不是16kHz时重采样"""
+        speech, sample_rate = soundfile.read(audio_file)
+        print(f"音频文件: {audio_file}")
+        print(f"采样率: {sample_rate}, 时长: {len(speech)/sample_rate:.2f}秒")
         
+        # 如果采样率不是16kHz，需要重采样
+        if sample_rate != 16000:
+            print("⚠️ 音频采样率不是16kHz，正在进行重采样...")
+            speech = self._resample_audio(speech, sample_rate, 16000)
+            sample_rate = 16000
+            print(f"✅ 重采样完成，新采样率: {sample_rate}Hz, 新时长: {len(speech)/sample_rate:.2f}秒")
+        return speech
+    
+    def _recognize_speech(self,
+                          speech: np.ndarray,
+                          callback: Optional[Callable] = None,
+                          sample_rate: int = 16000) -> Generator[str, None, None]:
+        """按流式步长切块识别已加载的音频（模型需已准备好）"""
         try:
-            # 读取音频文件
-            speech, sample_rate = soundfile.read(audio_file)
-            print(f"音频文件: {audio_file}")
-            print(f"采样率: {sample_rate}, 时长: {len(speech)/sample_rate:.2f}秒")
-            
-            # 如果采样率不是16kHz，需要重采样
-            if sample_rate != 16000:
-                print("⚠️ 音频采样率不是16kHz，正在进行重采样...")
-                speech = self._resample_audio(speech, sample_rate, 16000)
-                sample_rate = 16000
-                print(f"✅ 重采样完成，新采样率: {sample_rate}Hz, 新时长: {len(speech)/sample_rate:.2f}秒")
-
-            
             chunk_stride = self._calculate_chunk_stride(sample_rate)
             total_chunk_num = int((len(speech) - 1) / chunk_stride + 1)
             
             print(f"开始流式识别(file)，共 {total_chunk_num} 个块")
             
+            generate = self._generate
+            verbose = self._verbose
+            
             for i in range(total_chunk_num):
                 # 提取音频块
                 start_idx = i * chunk_stride
@@ -135,21 +178,14 @@ class StreamingSpeechService:
                 is_final = i == total_chunk_num - 1
                 
                 # 执行识别
-                res = self.current_model.generate(
-                    input=speech_chunk,
-                    cache=self.cache,
-                    is_final=is_final,
-                    chunk_size=self.streaming_config["chunk_size"],
-                    encoder_chunk_look_back=self.streaming_config["encoder_chunk_look_back"],
-                    decoder_chunk_look_back=self.streaming_config["decoder_chunk_look_back"]
-                )
+                res = generate(input=speech_chunk, cache=self.cache, is_final=is_final)
                 
                 # 处理结果
-                if res and len(res) > 0:
+                if res:
                     text = res[0].get("text", "")
                     if text.strip():
-                        result = f"块 {i+1}/{total_chunk_num}: {text}"
-                        print(result)
+                        if verbose:
+                            print(f"块 {i+1}/{total_chunk_num}: {text}")
                         
                         # 调用回调函数
                         if callback:
@@ -162,10 +198,82 @@ class StreamingSpeechService:
             import traceback
             traceback.print_exc()
     
+    def stream_recognize_file(self, 
+                            audio_file: str, 
+                            model_name: str = "paraformer-zh-streaming",
+                            callback: Optional[Callable] = None) -> Generator[str, None, None]:
+        """
+        流式识别音频文件
+        
+        Args:
+            audio_file: 音频文件路径
+            model_name: 模型名称
+            callback: 结果回调函数
+        
+        Yields:
+            识别结果
+        """
+        if not os.path.exists(audio_file):
+            raise FileNotFoundError(f"音频文件不存在: {audio_file}")
+        
+        # 准备模型
+        if not self._prepare_streaming_model(model_name):
+            return
+        
+        try:
+            # 读取音频文件
+            speech = self._load_audio_file(audio_file)
+        except Exception as e:
+            print(f"❌ 流式识别失败: {e}")
+            return
+        
+        yield from self._recognize_speech(speech, callback)
+    
+    async def astream_recognize_file(self,
+                                     audio_file: str,
+                                     model_name: str = "paraformer-zh-streaming",
+                                     callback: Optional[Callable] = None) -> AsyncIterator[str]:
+        """
+        stream_recognize_file 的异步版本：读文件、重采样和逐块推理都在后台线程中执行，不阻塞事件循环
+        
+        所有步骤在同一个单线程执行器中依次执行，调用方提前停止迭代时，关闭生成器的操作排在正在进行的推理之后
+        """
+        if not os.path.exists(audio_file):
+            raise FileNotFoundError(f"音频文件不存在: {audio_file}")
+        
+        loop = asyncio.get_running_loop()
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="stream-file")
+        results = None
+        try:
+            # 准备模型
+            if not await loop.run_in_executor(executor, self._prepare_streaming_model, model_name):
+                return
+            
+            try:
+                # 读取音频文件
+                speech = await loop.run_in_executor(executor, self._load_audio_file, audio_file)
+            except Exception as e:
+                print(f"❌ 流式识别失败: {e}")
+                return
+            
+            results = self._recognize_speech(speech, callback)
+            while True:
+                text = await loop.run_in_executor(executor, next, results, None)
+                if text is None:
+                    break
+                yield text
+        finally:
+            if results is not None:
+                executor.submit(results.close)
+            executor.shutdown(wait=False)
+    
     def stream_recognize_chunks(self, 
                               audio_chunks: list, 
                               model_name: str = "paraformer-zh-streaming",
-                              sample_rate: int = 16000) -> Generator[str, None, None]:
+                              sample_rate: int = 16000,
+                              merge: bool = False,
+                              cache: Optional[dict] = None,
+                              is_final: bool = True) -> Generator[str, None, None]:
         """
         流式识别音频块序列
         
@@ -173,12 +281,17 @@ class StreamingSpeechService:
             audio_chunks: 音频块列表
             model_name: 模型名称
             sample_rate: 采样率
+            merge: 音频块在时间上连续时设为True，拼接后一次 generate 完成识别
+                   （流式模型内部按 chunk_size 切分，结果与逐块调用一致，只省去逐块调用的开销）
+            cache: 调用方持有的流式缓存（如每个会话一份），跨多次调用保留编码/解码上下文；
+                   为None时使用服务自身的缓存，每次调用都从空缓存开始
+            is_final: 最后一块是否为流的结尾；使用调用方缓存时，流未结束应传False，结尾时传True
         
         Yields:
             识别结果
         """
         # 准备模型
-        if not self._prepare_streaming_model(model_name):
+        if not self._prepare_streaming_model(model_name, reset_cache=cache is None):
             return
         
         # 检查采样率并重采样音频块
@@ -192,29 +305,31 @@ class StreamingSpeechService:
             sample_rate = 16000
             print(f"✅ 所有音频块重采样完成")
         
+        if merge and len(audio_chunks) > 1:
+            audio_chunks = [np.concatenate(audio_chunks)]
+        
         total_chunks = len(audio_chunks)
-        print(f"开始流式识别(chunks)，共 {total_chunks} 个块")
+        verbose = self._verbose
+        if verbose:
+            print(f"开始流式识别(chunks)，共 {total_chunks} 个块")
+        
+        # 循环中不变的对象提前取出
+        generate = self._generate
+        if cache is None:
+            cache = self.cache
+        last = total_chunks - 1
         
         try:
             for i, chunk in enumerate(audio_chunks):
-                is_final = i == total_chunks - 1
-                
                 # 执行识别
-                res = self.current_model.generate(
-                    input=chunk,
-                    cache=self.cache,
-                    is_final=is_final,
-                    chunk_size=self.streaming_config["chunk_size"],
-                    encoder_chunk_look_back=self.streaming_config["encoder_chunk_look_back"],
-                    decoder_chunk_look_back=self.streaming_config["decoder_chunk_look_back"]
-                )
+                res = generate(input=chunk, cache=cache, is_final=is_final and i == last)
                 
                 # 处理结果
-                if res and len(res) > 0:
+                if res:
                     text = res[0].get("text", "")
                     if text.strip():
-                        result = f"块 {i+1}/{total_chunks}: {text}"
-                        print(result)
+                        if verbose:
+                            print(f"块 {i+1}/{total_chunks}: {text}")
                         yield text
                         
         except Exception as e:
@@ -222,6 +337,13 @@ class StreamingSpeechService:
             import traceback
             traceback.print_exc()
     
+    def release(self):
+        """释放对模型的引用（模型本身留在模型管理器中）"""
+        self.current_model = None
+        self._generate = None
+        self._prepared_model_name = None
+        self.cache = {}
+    
     def reset_cache(self):
         """重置缓存"""
         self.cache = {}
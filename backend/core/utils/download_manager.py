@@ -1,11 +1,30 @@
 import os
-from typing import List, Tuple, Dict, Optional
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List, Tuple, Dict, Optional
 from modelscope import snapshot_download
 from conf.model import ModelConfig
 
+# 同时下载的模型数：下载以网络等待为主，多个模型并发可以占满带宽
+DOWNLOAD_WORKERS = 4
+
+# 模型状态缓存有效期（秒）：批量流程中连续多次检查状态时复用同一次扫描结果
+STATUS_CACHE_TTL = 1.0
+
+def _list_dir(path: str) -> frozenset:
+    """列出目录下的条目名，目录不存在时返回空集合"""
+    try:
+        with os.scandir(path) as entries:
+            return frozenset(entry.name for entry in entries)
+    except OSError:
+        return frozenset()
+
 class DownloadManager:
-    def __init__(self, model_config: ModelConfig):
+    def __init__(self, model_config: ModelConfig, max_workers: int = DOWNLOAD_WORKERS):
         self.model_config = model_config
+        self.max_workers = max(1, max_workers)
+        self._status_cache: Optional[Dict[str, dict]] = None
+        self._status_cache_ts = 0.0
         os.makedirs(self.model_config.model_lib, exist_ok=True)
 
     def download_model(self, model_name: str, force_download: bool = False) -> Tuple[bool, str]:
@@ -32,10 +51,11 @@ class DownloadManager:
             if not force_download and os.path.exists(local_path):
                 return True, f"模型 {model_name} 已存在: {local_path}"
 
-            print(f"🔄 开始下载模型: {model_name}")
-            print(f"   📝 描述: {description}")
-            print(f"   📦 版本: {version}")
-            print(f"   🆔 ID: {model_id}")
+            # 并发下载时整段信息一次输出，避免与其他下载线程的输出交错
+            print(f"🔄 开始下载模型: {model_name}\n"
+                  f"   📝 描述: {description}\n"
+                  f"   📦 版本: {version}\n"
+                  f"   🆔 ID: {model_id}")
             
             # 下载模型，指定版本
             download_kwargs = {
@@ -48,6 +68,8 @@ class DownloadManager:
                 download_kwargs["revision"] = version
             
             model_dir = snapshot_download(**download_kwargs)
+            # 本地模型发生变化，状态缓存失效
+            self._status_cache = None
             
             print(f"✅ 模型 {model_name} 下载完成: {model_dir}")
             return True, model_dir
@@ -57,18 +79,36 @@ class DownloadManager:
             print(f"❌ {error_msg}")
             return False, error_msg
 
+    def _download_many(self, model_names: Iterable[str], label: str, force_download: bool = False) -> List[Tuple[str, bool, str]]:
+        """
+        并发下载多个模型，结果顺序与 model_names 一致
+        
+        Args:
+            model_names: 模型名称
+            label: 日志中显示的模型类别
+            force_download: 是否强制重新下载
+            
+        Returns:
+            下载结果列表
+        """
+        model_names = list(model_names)
+        
+        def download(model_name: str) -> Tuple[str, bool, str]:
+            print(f"\n处理{label}: {model_name}")
+            success, message = self.download_model(model_name, force_download)
+            return model_name, success, message
+        
+        if len(model_names) <= 1 or self.max_workers == 1:
+            return [download(model_name) for model_name in model_names]
+        
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(model_names)),
+                                thread_name_prefix="model-download") as executor:
+            return list(executor.map(download, model_names))
+
     def download_required_models(self) -> List[Tuple[str, bool, str]]:
         """下载所有必需的模型"""
         print("\n🔄 开始下载必需模型...")
-        results = []
-        required_models = self.model_config.get_required_models()
-        
-        for model_name in required_models:
-            print(f"\n处理必需模型: {model_name}")
-            success, message = self.download_model(model_name)
-            results.append((model_name, success, message))
-        
-        return results
+        return self._download_many(self.model_config.get_required_models(), "必需模型")
 
     def download_speaker_separation_models(self, force_download: bool = False) -> List[Tuple[str, bool, str]]:
         """
@@ -81,15 +121,7 @@ class DownloadManager:
             下载结果列表
         """
         print("\n🔄 开始下载说话人分离模型...")
-        results = []
-        speaker_models = self.model_config.get_speaker_separation_models()
-        
-        for model_name in speaker_models:
-            print(f"\n处理说话人分离模型: {model_name}")
-            success, message = self.download_model(model_name, force_download)
-            results.append((model_name, success, message))
-        
-        return results
+        return self._download_many(self.model_config.get_speaker_separation_models(), "说话人分离模型", force_download)
 
     def download_models_by_category(self, category: str, force_download: bool = False) -> List[Tuple[str, bool, str]]:
         """
@@ -103,15 +135,7 @@ class DownloadManager:
             下载结果列表
         """
         print(f"\n🔄 开始下载 {category} 分类的模型...")
-        results = []
-        category_models = self.model_config.get_models_by_category(category)
-        
-        for model_name in category_models:
-            print(f"\n处理 {category} 模型: {model_name}")
-            success, message = self.download_model(model_name, force_download)
-            results.append((model_name, success, message))
-        
-        return results
+        return self._download_many(self.model_config.get_models_by_category(category), f" {category} 模型", force_download)
 
     def download_all_models(self, force_download: bool = False) -> List[Tuple[str, bool, str]]:
         """
@@ -124,39 +148,43 @@ class DownloadManager:
             下载结果列表
         """
         print("\n🔄 开始下载所有模型...")
-        results = []
-        
-        for model_name in self.model_config.model_configs:
-            print(f"\n处理模型: {model_name}")
-            success, message = self.download_model(model_name, force_download)
-            results.append((model_name, success, message))
-        
-        return results
+        return self._download_many(self.model_config.model_configs, "模型", force_download)
 
     def check_model_status(self) -> Dict[str, dict]:
         """
         检查所有模型的状态
         
         Returns:
-            模型状态字典
+            模型状态字典（短时间内重复调用返回同一份缓存结果，调用方不应修改）
         """
+        now = time.monotonic()
+        if self._status_cache is not None and now - self._status_cache_ts < STATUS_CACHE_TTL:
+            return self._status_cache
+        
+        # 每个上级目录只列一次，按目录项判断模型是否存在，不再逐个 stat
+        listings: Dict[str, frozenset] = {}
         status = {}
         
-        for model_name, config in self.model_config.model_configs.items():
-            local_path = config["local_path"]
-            exists = os.path.exists(local_path)
+        for model_name, spec in self.model_config.model_configs.items():
+            local_path = spec.local_path
+            parent, name = os.path.split(os.path.normpath(local_path))
+            if parent not in listings:
+                listings[parent] = _list_dir(parent)
+            exists = name in listings[parent]
             
             status[model_name] = {
                 "name": model_name,
-                "description": config.get("description", ""),
-                "category": config.get("category", "unknown"),
-                "required": config.get("required", False),
+                "description": spec.description,
+                "category": spec.category,
+                "required": spec.required,
                 "exists": exists,
                 "local_path": local_path,
-                "model_id": config.get("model_id", ""),
-                "version": config.get("version", "latest")
+                "model_id": spec.model_id,
+                "version": spec.version
             }
         
+        self._status_cache = status
+        self._status_cache_ts = now
         return status
 
     def print_model_status(self):
@@ -241,23 +269,12 @@ class DownloadManager:
         Returns:
             下载结果列表
         """
-        results = []
         status = self.check_model_status()
         
-        for model_name, info in status.items():
-            if not info["exists"]:
-                # 必需模型总是下载
-                if info["required"]:
-                    print(f"\n下载缺失的必需模型: {model_name}")
-                    success, message = self.download_model(model_name)
-                    results.append((model_name, success, message))
-                # 可选模型根据参数决定
-                elif include_optional:
-                    print(f"\n下载缺失的可选模型: {model_name}")
-                    success, message = self.download_model(model_name)
-                    results.append((model_name, success, message))
-        
-        return results
+        # 必需模型总是下载，可选模型根据参数决定
+        missing = [model_name for model_name, info in status.items()
+                   if not info["exists"] and (info["required"] or include_optional)]
+        return self._download_many(missing, "缺失的模型")
     
     def download_denoising_models(self) -> List[tuple]:
         """
@@ -269,24 +286,13 @@ class DownloadManager:
         print("\n🔄 检查降噪模型...")
         
         denoising_models = ["frcrn-ans"]
-        results = []
+        results = self._download_many(denoising_models, "降噪模型")
         
-        for model_name in denoising_models:
-            print(f"\n📦 检查模型: {model_name}")
-            
-            try:
-                success, message = self.download_model(model_name)
-                results.append((model_name, success, message))
-                
-                if success:
-                    print(f"✅ {model_name}: {message}")
-                else:
-                    print(f"❌ {model_name}: {message}")
-                    
-            except Exception as e:
-                error_msg = f"下载过程异常: {e}"
-                print(f"❌ {model_name}: {error_msg}")
-                results.append((model_name, False, error_msg))
+        for model_name, success, message in results:
+            if success:
+                print(f"✅ {model_name}: {message}")
+            else:
+                print(f"❌ {model_name}: {message}")
         
         return results
     
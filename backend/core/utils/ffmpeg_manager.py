@@ -1,5 +1,6 @@
 import asyncio
 import logging
+from collections import deque
 from enum import Enum
 from typing import Optional, Callable
 import contextlib
@@ -26,6 +27,37 @@ brew install ffmpeg
 After installation, please restart the application.
 """
 
+# stdout 管道的流缓冲上限：视频解码等突发输出时，一次事件循环唤醒可以搬运更多数据，
+# 也减少 transport 因缓冲满而反复暂停/恢复读取（默认64KiB）
+STDOUT_BUFFER_LIMIT = 1 << 20
+
+# stdin 管道的内核缓冲大小（Linux 默认 64KiB），写入方不必频繁等待 FFmpeg 读走数据
+STDIN_PIPE_SIZE = 1 << 20
+
+# 客户端直接发送的输入格式：已是目标采样率/声道数的16位PCM时无需解码，不启动FFmpeg进程
+PASSTHROUGH_FORMATS = frozenset({"s16le", "pcm_s16le"})
+
+# 直通模式下待读数据的上限（字节），与FFmpeg模式下 stdin 管道的缓冲一致；超出时写入方等待读取方取走数据
+PASSTHROUGH_MAX_PENDING = STDIN_PIPE_SIZE
+
+# 读取PCM数据的超时（秒）
+READ_TIMEOUT = 20.0
+
+
+def _enlarge_pipe(transport, size: int):
+    """尽量扩大管道的内核缓冲，仅Linux支持，失败时保持默认大小"""
+    try:
+        import fcntl
+    except ImportError:
+        return
+    pipe = transport.get_extra_info('pipe') if transport else None
+    if pipe is None:
+        return
+    try:
+        fcntl.fcntl(pipe.fileno(), getattr(fcntl, 'F_SETPIPE_SZ', 1031), size)
+    except OSError as e:
+        logger.debug(f"无法调整管道缓冲大小: {e}")
+
 class FFmpegState(Enum):
     STOPPED = "stopped"
     STARTING = "starting"
@@ -36,11 +68,22 @@ class FFmpegState(Enum):
 class FFmpegAudioManager:
     """
     简洁的FFmpeg音频管理器 - 只负责数据传输
+    
+    input_format 为 s16le（客户端已按 sample_rate/channels 发送16位PCM）时进入直通模式：
+    不启动FFmpeg子进程，写入的数据在进程内排队后原样读出，省去管道拷贝和进程调度
     """
     
-    def __init__(self, sample_rate: int = 16000, channels: int = 1):
+    def __init__(self, sample_rate: int = 16000, channels: int = 1, input_format: Optional[str] = None):
         self.sample_rate = sample_rate
         self.channels = channels
+        self.passthrough = input_format in PASSTHROUGH_FORMATS
+        # 直通模式下的待读数据
+        self._pending: deque = deque()
+        self._pending_bytes = 0
+        self._data_ready = asyncio.Event()
+        # 待读数据低于上限时置位，写入方据此等待
+        self._space_ready = asyncio.Event()
+        self._space_ready.set()
                 
         self.process: Optional[asyncio.subprocess.Process] = None
         self._stderr_task: Optional[asyncio.Task] = None
@@ -64,6 +107,16 @@ class FFmpegAudioManager:
             
             self.state = FFmpegState.STARTING
 
+        if self.passthrough:
+            self._pending.clear()
+            self._pending_bytes = 0
+            self._data_ready.clear()
+            self._space_ready.set()
+            async with self._state_lock:
+                self.state = FFmpegState.RUNNING
+            logger.info("输入已是PCM，跳过FFmpeg解码（直通模式）")
+            return True
+
         try:
             # 完全按照WhisperLiveKit的方式配置FFmpeg
             cmd = [
@@ -84,7 +137,8 @@ class FFmpegAudioManager:
                 *cmd,
                 stdin=asyncio.subprocess.PIPE,
                 stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
+                stderr=asyncio.subprocess.PIPE,
+                limit=STDOUT_BUFFER_LIMIT
             )
 
             # 等待进程稳定启动
@@ -98,6 +152,7 @@ class FFmpegAudioManager:
                     self.state = FFmpegState.FAILED
                 return False
 
+            _enlarge_pipe(self.process.stdin.transport, STDIN_PIPE_SIZE)
             self._stderr_task = asyncio.create_task(self._drain_stderr())
 
             async with self._state_lock:
@@ -129,6 +184,10 @@ class FFmpegAudioManager:
                 return
             self.state = FFmpegState.STOPPED
 
+        # 唤醒等待数据的读取方和等待空间的写入方
+        self._data_ready.set()
+        self._space_ready.set()
+
         if self.process:
             try:
                 if self.process.stdin and not self.process.stdin.is_closing():
@@ -162,19 +221,36 @@ class FFmpegAudioManager:
                 logger.warning(f"Cannot write, FFmpeg state: {self.state}")
                 return False
             
-            if not self.process or self.process.returncode is not None:
+            if self.passthrough:
+                if data:
+                    self._pending.append(data)
+                    self._pending_bytes += len(data)
+                    self._data_ready.set()
+                    if self._pending_bytes > PASSTHROUGH_MAX_PENDING:
+                        self._space_ready.clear()
+                backlogged = not self._space_ready.is_set()
+            
+            elif not self.process or self.process.returncode is not None:
                 logger.error(f"FFmpeg进程已退出")
                 self.state = FFmpegState.FAILED
                 return False
 
+        if self.passthrough:
+            if backlogged:
+                await self._wait_for_space()
+            return True
+
         try:
             if self.process.stdin.is_closing():
                 logger.error("FFmpeg stdin已关闭")
                 return False
                 
-            # 直接写入，不进行累积处理
-            self.process.stdin.write(data)
-            await self.process.stdin.drain()
+            # 直接写入，不进行累积处理：Unix管道 transport 在自身缓冲为空时立即对非阻塞fd执行 os.write，
+            # 只有写不完的部分才会缓冲并注册可写回调；因此只在有积压时才需要 drain 等待背压
+            stdin = self.process.stdin
+            stdin.write(data)
+            if stdin.transport.get_write_buffer_size():
+                await stdin.drain()
             return True
             
         except BrokenPipeError:
@@ -193,23 +269,35 @@ class FFmpegAudioManager:
                 await self.on_error_callback("write_error")
             return False
 
-    async def read_data(self, size: int) -> Optional[bytes]:
-        """从FFmpeg读取PCM数据"""
+    async def _check_readable(self) -> bool:
+        """读取前检查状态与进程存活"""
         async with self._state_lock:
             if self.state != FFmpegState.RUNNING:
                 logger.warning(f"Cannot read, FFmpeg state: {self.state}")
-                return None
+                return False
+            
+            if self.passthrough:
+                return True
             
             # 检查进程是否还活着
             if not self.process or self.process.returncode is not None:
                 logger.error(f"FFmpeg进程已退出，返回码: {self.process.returncode if self.process else 'None'}")
                 self.state = FFmpegState.FAILED
-                return None
+                return False
+        return True
+
+    async def read_data(self, size: int) -> Optional[bytes]:
+        """从FFmpeg读取PCM数据"""
+        if not await self._check_readable():
+            return None
+
+        if self.passthrough:
+            return await self._read_pending(size)
 
         try:
             data = await asyncio.wait_for(
                 self.process.stdout.read(size),
-                timeout=20.0
+                timeout=READ_TIMEOUT
             )
             return data
         except asyncio.TimeoutError:
@@ -221,6 +309,57 @@ class FFmpegAudioManager:
                 await self.on_error_callback("read_error")
             return None
 
+    async def _wait_for_space(self):
+        """直通模式：待读数据超过上限时等待读取方取走；读取方长时间不读时丢弃最旧的数据"""
+        try:
+            await asyncio.wait_for(self._space_ready.wait(), timeout=READ_TIMEOUT)
+            return
+        except asyncio.TimeoutError:
+            pass
+        
+        dropped = 0
+        while self._pending_bytes > PASSTHROUGH_MAX_PENDING and len(self._pending) > 1:
+            block = self._pending.popleft()
+            self._pending_bytes -= len(block)
+            dropped += len(block)
+        self._space_ready.set()
+        logger.warning(f"PCM读取方长时间未取走数据，丢弃最旧的 {dropped} 字节")
+
+    async def _read_pending(self, size: int) -> Optional[bytes]:
+        """直通模式：等待有数据后取出最多 size 字节（与管道读取一致，不凑满 size）"""
+        if not self._pending:
+            self._data_ready.clear()
+            try:
+                await asyncio.wait_for(self._data_ready.wait(), timeout=READ_TIMEOUT)
+            except asyncio.TimeoutError:
+                logger.warning("PCM read timeout.")
+                return None
+            if not self._pending:
+                return b""
+        
+        block = self._pending.popleft()
+        if len(block) > size:
+            self._pending.appendleft(block[size:])
+            block = block[:size]
+        self._pending_bytes -= len(block)
+        if self._pending_bytes <= PASSTHROUGH_MAX_PENDING:
+            self._space_ready.set()
+        return block
+
+    async def read_into(self, buffer: memoryview) -> int:
+        """
+        从FFmpeg读取PCM数据直接写入调用方提供的缓冲区
+        
+        Returns:
+            写入的字节数，无数据、超时或出错时返回0
+        """
+        data = await self.read_data(len(buffer))
+        if not data:
+            return 0
+        size = len(data)
+        buffer[:size] = data
+        return size
+
     async def get_state(self) -> FFmpegState:
         """获取当前状态"""
         async with self._state_lock:
@@ -270,6 +409,9 @@ class FFmpegAudioManager:
             if self.state != FFmpegState.RUNNING:
                 return False
             
+            if self.passthrough:
+                return True
+            
             if not self.process:
                 return False
                 
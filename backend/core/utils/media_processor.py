@@ -1,23 +1,33 @@
 import os
 import subprocess
 import tempfile
-from typing import Dict, Optional, Tuple
+from typing import Dict, Iterable, Optional, Tuple
 import soundfile as sf
 
+AUDIO_EXTENSIONS = frozenset({'.mp3', '.wav', '.m4a', '.flac', '.aac', '.ogg', '.wma'})
+VIDEO_EXTENSIONS = frozenset({'.mp4', '.avi', '.mov', '.wmv', '.flv', '.mkv', '.webm', '.m4v'})
+MEDIA_EXTENSIONS = AUDIO_EXTENSIONS | VIDEO_EXTENSIONS
+
+# 单次 writev 可提交的缓冲区数上限（Linux 为 1024；sysconf 返回 -1 表示不确定，按默认值处理）
+try:
+    _IOV_MAX = os.sysconf('SC_IOV_MAX')
+except (AttributeError, ValueError, OSError):
+    _IOV_MAX = 1024
+if _IOV_MAX < 1:
+    _IOV_MAX = 1024
+
 class MediaProcessor:
     """媒体文件处理工具"""
     
     @staticmethod
     def is_video_file(file_path: str) -> bool:
         """判断是否为视频文件"""
-        video_extensions = {'.mp4', '.avi', '.mov', '.wmv', '.flv', '.mkv', '.webm', '.m4v'}
-        return os.path.splitext(file_path.lower())[1] in video_extensions
+        return os.path.splitext(file_path)[1].lower() in VIDEO_EXTENSIONS
     
     @staticmethod
     def is_audio_file(file_path: str) -> bool:
         """判断是否为音频文件"""
-        audio_extensions = {'.mp3', '.wav', '.m4a', '.flac', '.aac', '.ogg', '.wma'}
-        return os.path.splitext(file_path.lower())[1] in audio_extensions
+        return os.path.splitext(file_path)[1].lower() in AUDIO_EXTENSIONS
     
     @staticmethod
     def extract_audio_from_video(video_path: str, 
@@ -73,12 +83,12 @@ class MediaProcessor:
             if os.path.exists(output_path) and os.path.getsize(output_path) > 0:
                 # 获取音频信息
                 try:
-                    data, sr = sf.read(output_path)
-                    duration = len(data) / sr
+                    # 只读文件头，不解码整段音频
+                    info = sf.info(output_path)
                     print(f"✅ 音频提取成功")
-                    print(f"   时长: {duration:.2f}秒")
-                    print(f"   采样率: {sr}Hz")
-                    print(f"   声道: {1 if data.ndim == 1 else data.shape[1]}")
+                    print(f"   时长: {info.duration:.2f}秒")
+                    print(f"   采样率: {info.samplerate}Hz")
+                    print(f"   声道: {info.channels}")
                     return output_path
                 except Exception as e:
                     print(f"⚠️ 无法读取提取的音频文件: {e}")
@@ -119,12 +129,13 @@ class MediaProcessor:
         try:
             if MediaProcessor.is_audio_file(file_path):
                 # 音频文件
-                data, sample_rate = sf.read(file_path)
+                # 只读文件头获取元信息，大文件无需整段读入内存
+                info = sf.info(file_path)
                 return {
                     'type': 'audio',
-                    'duration': len(data) / sample_rate,
-                    'sample_rate': sample_rate,
-                    'channels': 1 if data.ndim == 1 else data.shape[1],
+                    'duration': info.frames / info.samplerate,
+                    'sample_rate': info.samplerate,
+                    'channels': info.channels,
                     'file_size': os.path.getsize(file_path)
                 }
             elif MediaProcessor.is_video_file(file_path):
@@ -175,3 +186,44 @@ class MediaProcessor:
             except Exception as e:
                 print(f"⚠️ 清理临时文件失败: {e}")
                 
+    
+    @staticmethod
+    def write_segments(output_path: str, segments: Iterable[bytes]) -> int:
+        """
+        把多段字节顺序写入文件（跳过空段），返回写入的总字节数
+        
+        用 os.writev 一次系统调用提交一批缓冲区，并预先按总大小分配磁盘空间，
+        避免逐段 write 的调用开销和长录音文件的碎片化
+        """
+        buffers = [memoryview(seg) for seg in segments if seg]
+        total = sum(buf.nbytes for buf in buffers)
+        
+        fd = os.open(output_path, os.O_CREAT | os.O_WRONLY | os.O_TRUNC | getattr(os, 'O_BINARY', 0), 0o644)
+        try:
+            if total and hasattr(os, 'posix_fallocate'):
+                try:
+                    os.posix_fallocate(fd, 0, total)
+                except OSError:
+                    pass
+            
+            if not hasattr(os, 'writev'):
+                # os.write 同样可能只写出一部分，循环直到写完
+                data = memoryview(b''.join(buffers))
+                while data:
+                    data = data[os.write(fd, data):]
+                return total
+            
+            while buffers:
+                batch = buffers[:_IOV_MAX]
+                written = os.writev(fd, batch)
+                # 处理部分写入：跳过已完整写出的缓冲区，截掉写了一半的那个
+                consumed = 0
+                while consumed < len(batch) and written >= batch[consumed].nbytes:
+                    written -= batch[consumed].nbytes
+                    consumed += 1
+                buffers = buffers[consumed:]
+                if written:
+                    buffers[0] = buffers[0][written:]
+        finally:
+            os.close(fd)
+        return total
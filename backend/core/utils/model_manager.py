@@ -1,18 +1,107 @@
 import os
-from typing import Optional, Dict
+import gc
+import copy
+import time
+import contextlib
+import threading
+from functools import lru_cache
+from typing import Any, Callable, Optional, Dict
 from funasr import AutoModel
-from conf.model import ModelConfig
+from conf.model import ModelConfig, get_default_device
 from modelscope import snapshot_download
 
+@lru_cache(maxsize=None)
+def configure_torch_backend(device: str):
+    """按设备开启 torch 加速选项（每个设备只设置一次）"""
+    if not device.startswith("cuda"):
+        return
+    
+    import torch
+    # 输入尺寸相对固定，让 cuDNN 自动挑选最快的卷积实现
+    torch.backends.cudnn.benchmark = True
+    # 允许 float32 矩阵乘法使用 TF32 Tensor Core
+    torch.set_float32_matmul_precision('high')
+
+def inference_context(device: str):
+    """
+    模型推理上下文：关闭autograd；CUDA上默认启用FP16自动混合精度
+    
+    设置环境变量 MEETVOICE_FP16=0 可回退到FP32（识别准确率有回归时使用）
+    """
+    import torch
+    stack = contextlib.ExitStack()
+    stack.enter_context(torch.inference_mode())
+    if device.startswith("cuda") and os.environ.get("MEETVOICE_FP16", "1") != "0":
+        stack.enter_context(torch.autocast(device_type="cuda", dtype=torch.float16))
+    return stack
+
+def quantize_for_cpu(model: AutoModel) -> AutoModel:
+    """
+    CPU推理时把模型中的 Linear/LSTM 层动态量化为int8（就地替换，同一模型只做一次）
+    
+    默认关闭，设置环境变量 MEETVOICE_INT8=1 开启（识别准确率有回归时关闭即可）
+    """
+    if os.environ.get("MEETVOICE_INT8", "0") != "1":
+        return model
+    if getattr(model, "_int8_quantized", False):
+        return model
+    if not str(model.kwargs.get("device", "cpu")).startswith("cpu"):
+        return model
+    
+    import torch
+    model.model = torch.quantization.quantize_dynamic(
+        model.model, {torch.nn.Linear, torch.nn.LSTM}, dtype=torch.qint8, inplace=True
+    )
+    model._int8_quantized = True
+    return model
+
+def release_device_memory():
+    """回收已无引用的模型，并把 CUDA 缓存分配器中的空闲显存还给驱动"""
+    gc.collect()
+    
+    import torch
+    if torch.cuda.is_initialized():
+        torch.cuda.empty_cache()
+        torch.cuda.ipc_collect()
+
 class ModelManager:
     def __init__(self, model_config: ModelConfig):
         self.model_config = model_config
         self.loaded_models: Dict[str, AutoModel] = {}
+        # 管理器由所有连接共享：_lock 只保护下面两个锁表，加载和推理各自按模型名加锁
+        self._lock = threading.Lock()
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self._generate_locks: Dict[str, threading.Lock] = {}
+        configure_torch_backend(get_default_device())
+
+    def _named_lock(self, locks: Dict[str, threading.Lock], model_name: str) -> threading.Lock:
+        with self._lock:
+            lock = locks.get(model_name)
+            if lock is None:
+                lock = locks[model_name] = threading.Lock()
+            return lock
+
+    def generate_lock(self, model_name: str) -> threading.Lock:
+        """
+        模型推理锁：共享的 AutoModel 会把每次 generate 的参数合并进模型自身的 kwargs，
+        多个连接同时调用同一模型时各自的流式缓存可能串用，调用 generate 时需持有此锁
+        """
+        return self._named_lock(self._generate_locks, model_name)
 
     def load_model(self, model_name: str) -> Optional[AutoModel]:
-        """加载指定的模型"""
-        if model_name in self.loaded_models:
-            return self.loaded_models[model_name]
+        """加载指定的模型（同一模型并发请求时只加载一次）"""
+        model = self.loaded_models.get(model_name)
+        if model is not None:
+            return model
+
+        with self._named_lock(self._load_locks, model_name):
+            # 等锁期间其他连接可能已加载完成
+            model = self.loaded_models.get(model_name)
+            if model is not None:
+                return model
+            return self._load_model(model_name)
+
+    def _load_model(self, model_name: str) -> Optional[AutoModel]:
 
         model_path = self.model_config.get_model_path(model_name)
         model_id = self.model_config.get_model_id(model_name)
@@ -47,7 +136,7 @@ class ModelManager:
                 print(f"✓ 模型下载完成: {actual_model_path}")
             model = AutoModel(
                 model=model_path,disable_update=True,
-                **model_config  # 展开模型配置
+                **copy.deepcopy(model_config)  # 配置表为共享缓存，AutoModel会改写其中的嵌套字典
             )
             self.loaded_models[model_name] = model
             print(f"✓ 模型 {model_name} 加载成功")
@@ -68,6 +157,126 @@ class ModelManager:
             return True
         return False
 
+    def unload_all(self):
+        """卸载全部已加载的模型"""
+        self.loaded_models.clear()
+
     def list_loaded_models(self) -> list:
         """列出已加载的模型"""
-        return list(self.loaded_models.keys())
\ No newline at end of file
+        return list(self.loaded_models.keys())
+
+@lru_cache(maxsize=1)
+def get_model_manager() -> ModelManager:
+    """进程内共享的模型管理器，模型只加载一次，供所有连接复用"""
+    return ModelManager(ModelConfig())
+
+# 共享模型无人使用超过该时间（秒）后卸载，释放显存
+MODEL_IDLE_TTL = 600
+
+class _RegistryEntry:
+    __slots__ = ("model", "refcount", "last_used", "generation")
+
+    def __init__(self, model: Any):
+        self.model = model
+        self.refcount = 0
+        self.last_used = time.monotonic()
+        # 每次引用归零时递增，定时卸载据此判断期间是否有人重新使用过
+        self.generation = 0
+
+class ModelRegistry:
+    """
+    进程内共享的重量级模型缓存（带引用计数）
+    
+    说话人分离的FunASR管道、FRCRN降噪管道等不经过 ModelManager 的模型在这里按 key 复用，
+    同一进程内的第二次及以后的调用不再重新加载权重；引用归零后空闲 idle_ttl 秒自动卸载。
+    """
+    def __init__(self, idle_ttl: float = MODEL_IDLE_TTL):
+        self.idle_ttl = idle_ttl
+        # _lock 只保护缓存表，加载按 key 各自加锁，一个模型加载时不阻塞其他模型的获取
+        self._lock = threading.Lock()
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self._generate_locks: Dict[str, threading.Lock] = {}
+        self._entries: Dict[str, _RegistryEntry] = {}
+
+    def generate_lock(self, key: str) -> threading.Lock:
+        """
+        模型推理锁：共享模型被多个连接同时调用时，FunASR 会把各自的参数（如热词）合并进模型自身的 kwargs，
+        调用共享模型推理时需持有此锁（与 ModelManager.generate_lock 相同）
+        """
+        with self._lock:
+            lock = self._generate_locks.get(key)
+            if lock is None:
+                lock = self._generate_locks[key] = threading.Lock()
+            return lock
+
+    def _acquire(self, key: str) -> Optional[Any]:
+        """缓存命中时增加一次引用并返回模型（调用方需持有 _lock）"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        entry.refcount += 1
+        entry.last_used = time.monotonic()
+        return entry.model
+
+    def get_or_load(self, key: str, loader: Callable[[], Any]) -> Any:
+        """获取已缓存的模型，不存在时调用 loader 加载；每次获取都需对应一次 release"""
+        with self._lock:
+            model = self._acquire(key)
+            if model is not None:
+                return model
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+        
+        # 同一 key 的并发请求等待同一次加载；loader 抛出的异常不会被缓存
+        with load_lock:
+            with self._lock:
+                model = self._acquire(key)
+                if model is not None:
+                    return model
+            model = loader()
+            with self._lock:
+                self._entries[key] = _RegistryEntry(model)
+                return self._acquire(key)
+
+    def release(self, key: str):
+        """归还一次引用；引用归零后启动定时器，空闲 idle_ttl 秒仍无人使用时卸载"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.refcount == 0:
+                return
+            entry.refcount -= 1
+            entry.last_used = time.monotonic()
+            if entry.refcount > 0:
+                return
+            entry.generation += 1
+            generation = entry.generation
+        
+        timer = threading.Timer(self.idle_ttl, self._evict_if_unused, args=(key, entry, generation))
+        timer.daemon = True
+        timer.start()
+
+    def _evict_if_unused(self, key: str, entry: _RegistryEntry, generation: int):
+        """定时器回调：引用归零后一直无人再用时卸载该模型"""
+        with self._lock:
+            if (self._entries.get(key) is not entry or entry.refcount > 0
+                    or entry.generation != generation):
+                return
+            del self._entries[key]
+        print(f"✓ 空闲模型 {key} 已卸载")
+        release_device_memory()
+
+    def evict_idle(self, ttl_s: float) -> list:
+        """移除无人引用且空闲超过 ttl_s 秒的模型，返回被移除的 key"""
+        now = time.monotonic()
+        with self._lock:
+            evicted = [key for key, entry in self._entries.items()
+                       if entry.refcount == 0 and now - entry.last_used >= ttl_s]
+            for key in evicted:
+                del self._entries[key]
+        if evicted:
+            release_device_memory()
+        return evicted
+
+@lru_cache(maxsize=1)
+def get_model_registry() -> ModelRegistry:
+    """进程内共享的模型缓存"""
+    return ModelRegistry()
@@ -46,11 +46,11 @@ def show_models_by_category(config: ModelConfig):
             print(f"\n🏷️  {category.replace('_', ' ').title()} 模型:")
             print("-" * 50)
             
-            for model_name, model_config in models.items():
-                required_mark = "🔴 必需" if model_config.get("required", False) else "🟡 可选"
+            for model_name, spec in models.items():
+                required_mark = "🔴 必需" if spec.required else "🟡 可选"
                 print(f"   {required_mark} {model_name}")
-                print(f"      📝 {model_config.get('description', '无描述')}")
-                print(f"      🆔 {model_config.get('model_id', '')}")
+                print(f"      📝 {spec.description or '无描述'}")
+                print(f"      🆔 {spec.model_id}")
                 print()
         else:
             print("❌ 无效的选择")
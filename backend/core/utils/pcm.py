@@ -0,0 +1,37 @@
+from typing import Optional
+import numpy as np
+
+# int16 PCM 归一化系数（1/32768）
+PCM_SCALE = np.float32(1.0 / 32768.0)
+
+# 可选：安装 numba 后大块PCM转换使用多线程JIT内核（显式签名在导入时即完成编译，首次调用无额外延迟）
+try:
+    from numba import njit, prange
+except ImportError:
+    _pcm_i16_to_f32 = None
+else:
+    @njit(['float32[::1](int16[::1], float32[::1])'],
+          parallel=True, fastmath=True, cache=True, boundscheck=False)
+    def _pcm_i16_to_f32(src, dst):
+        for i in prange(src.size):
+            dst[i] = src[i] * np.float32(3.0517578125e-5)
+        return dst
+
+# 小于该样本数时线程调度开销大于收益，直接用NumPy
+_JIT_MIN_SAMPLES = 1 << 16
+
+
+def pcm16_to_float32(pcm_buffer, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    将16位PCM缓冲区转换为 [-1, 1) 的 float32 数组（接受bytes、bytearray或memoryview）
+    
+    用乘以倒数代替除法，一次遍历完成类型转换和缩放，不生成中间数组；
+    提供 out 时结果写入其前部并返回该切片
+    """
+    audio_int16 = np.frombuffer(pcm_buffer, dtype=np.int16)
+    out = np.empty(audio_int16.size, dtype=np.float32) if out is None else out[:audio_int16.size]
+    # JIT内核签名要求可写输入，bytes 等只读缓冲区走NumPy路径
+    if (_pcm_i16_to_f32 is not None and audio_int16.size >= _JIT_MIN_SAMPLES
+            and audio_int16.flags.writeable):
+        return _pcm_i16_to_f32(audio_int16, out)
+    return np.multiply(audio_int16, PCM_SCALE, out=out, dtype=np.float32)
@@ -16,6 +16,7 @@ import sys
 from core.services.audio_processor import AudioProcessor
 from core.services.streaming_speech_service import StreamingSpeechService
 from core.utils.model_manager import ModelManager
+from core.utils.media_processor import MediaProcessor
 from conf.model import ModelConfig
 
 logger = logging.getLogger(__name__)
@@ -722,14 +723,16 @@ class TranscriptionConsumer(AsyncWebsocketConsumer):
             code='AUDIO_ERROR'
         ) 
     
-    def _transcribe_audio_chunk(self, audio_file):
-        """转录音频块 - 同步方法在线程池中执行"""
+    async def _transcribe_audio_chunk(self, audio_file):
+        """转录音频块 - 读文件和推理在后台线程中执行，不阻塞事件循环"""
         try:
-            # 使用流式服务转录
-            results = list(self.streaming_service.stream_recognize_file(audio_file))
-            if results:
+            # 使用流式服务转录，只保留最后一个结果
+            text = None
+            async for text in self.streaming_service.astream_recognize_file(audio_file):
+                pass
+            if text:
                 return {
-                    'text': results[-1],  # 取最后一个结果
+                    'text': text,  # 取最后一个结果
                     'confidence': 0.95,
                     'speaker_id': 'speaker_1',  # 实时转录暂不分离说话人
                     'timestamp': datetime.datetime.now().isoformat(),
@@ -767,17 +770,8 @@ class TranscriptionConsumer(AsyncWebsocketConsumer):
             merged_path = os.path.join(self.temp_dir, f'merged_audio_{self.session_id}.webm')
             logger.info(f'合并音频文件路径: {merged_path}')
             
-            # 简单合并：直接连接字节
-            bytes_written = 0
-            with open(merged_path, 'wb') as outfile:
-                for i, segment in enumerate(self.audio_segments):
-                    if segment:
-                        segment_bytes = len(segment)
-                        outfile.write(segment)
-                        bytes_written += segment_bytes
-                        logger.debug(f'写入音频段 {i}: {segment_bytes} 字节')
-                    else:
-                        logger.warning(f'音频段 {i} 为空，跳过')
+            # 简单合并：直接连接字节（空段跳过，writev 批量写入）
+            bytes_written = MediaProcessor.write_segments(merged_path, self.audio_segments)
             
             logger.info(f'合并完成，总共写入: {bytes_written} 字节')
             
@@ -880,7 +874,10 @@ class TranscriptionConsumer(AsyncWebsocketConsumer):
         logger.info(f"会话 {self.session_id} 停止转录")
     
     async def send_transcription_result(self, result):
-        """发送转录结果"""
+        """发送转录结果（转录服务给出 epoch 秒时间戳，在这里统一格式化为客户端使用的ISO字符串）"""
+        timestamp = result.get('timestamp')
+        if isinstance(timestamp, (int, float)):
+            result = {**result, 'timestamp': datetime.datetime.fromtimestamp(timestamp).isoformat()}
         await self.send_response(
             action='transcription',
             status='success',
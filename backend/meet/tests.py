@@ -1,3 +1,136 @@
-from django.test import TestCase
+import os
+import tempfile
+import types
+from unittest import mock, skipIf
 
-# Create your tests here.
+import numpy as np
+from django.test import SimpleTestCase
+
+from core.utils import media_processor, pcm
+from core.utils.media_processor import MediaProcessor
+from core.utils.pcm import pcm16_to_float32
+
+
+def _short_write(limit: int):
+    """返回一个每次最多写出 limit 字节的 os.write，模拟部分写入"""
+    real_write = os.write
+
+    def write(fd, data):
+        return real_write(fd, bytes(data[:limit]))
+    return write
+
+
+def _short_writev(limit: int):
+    """返回一个每次最多写出 limit 字节的 os.writev，模拟部分写入"""
+    real_write = os.write
+
+    def writev(fd, buffers):
+        return real_write(fd, b''.join(bytes(buf) for buf in buffers)[:limit])
+    return writev
+
+
+class WriteSegmentsTests(SimpleTestCase):
+    """MediaProcessor.write_segments 在部分写入时的续写逻辑"""
+
+    segments = [b'abc', b'', b'defgh', b'i', b'jklmnopq']
+
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp()
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def _read(self) -> bytes:
+        with open(self.path, 'rb') as f:
+            return f.read()
+
+    def test_writes_all_segments(self):
+        written = MediaProcessor.write_segments(self.path, self.segments)
+        self.assertEqual(written, 17)
+        self.assertEqual(self._read(), b''.join(self.segments))
+
+    @mock.patch.object(media_processor, '_IOV_MAX', 2)
+    def test_resumes_after_short_writev(self):
+        # 每次只写出 3 字节：会在缓冲区中间截断，也会跨越缓冲区边界
+        with mock.patch.object(os, 'writev', side_effect=_short_writev(3)) as writev:
+            written = MediaProcessor.write_segments(self.path, self.segments)
+        self.assertEqual(written, 17)
+        self.assertEqual(self._read(), b''.join(self.segments))
+        self.assertGreaterEqual(writev.call_count, 6)
+        for call in writev.call_args_list:
+            self.assertLessEqual(len(call.args[1]), 2)
+
+    def test_resumes_after_short_write_without_writev(self):
+        # 没有 os.writev 的平台回退到 os.write
+        fake_os = types.SimpleNamespace(
+            open=os.open, close=os.close, write=_short_write(4),
+            O_CREAT=os.O_CREAT, O_WRONLY=os.O_WRONLY, O_TRUNC=os.O_TRUNC,
+        )
+        with mock.patch.object(media_processor, 'os', fake_os):
+            written = MediaProcessor.write_segments(self.path, self.segments)
+        self.assertEqual(written, 17)
+        self.assertEqual(self._read(), b''.join(self.segments))
+
+    def test_empty_segments_create_empty_file(self):
+        self.assertEqual(MediaProcessor.write_segments(self.path, [b'', b'']), 0)
+        self.assertEqual(self._read(), b'')
+
+
+class Pcm16ToFloat32Tests(SimpleTestCase):
+    """pcm16_to_float32 的 numba 内核与 NumPy 回退路径结果一致"""
+
+    def _samples(self, count: int) -> np.ndarray:
+        # 覆盖 int16 的两个端点和 0，其余为固定种子的随机值
+        samples = np.random.default_rng(0).integers(-32768, 32768, size=count, dtype=np.int16)
+        samples[:3] = (-32768, 32767, 0)
+        return samples
+
+    def _numpy_path(self, pcm_buffer, out=None) -> np.ndarray:
+        with mock.patch.object(pcm, '_pcm_i16_to_f32', None):
+            return pcm16_to_float32(pcm_buffer, out=out)
+
+    def test_scales_to_unit_range(self):
+        result = pcm16_to_float32(np.array([-32768, 0, 16384, 32767], dtype=np.int16).tobytes())
+        self.assertEqual(result.dtype, np.float32)
+        np.testing.assert_array_equal(result, np.array([-1.0, 0.0, 0.5, 32767 / 32768], dtype=np.float32))
+
+    @skipIf(pcm._pcm_i16_to_f32 is None, "numba 未安装")
+    def test_jit_kernel_matches_numpy(self):
+        # 奇数样本数，且超过启用JIT的阈值
+        samples = self._samples(pcm._JIT_MIN_SAMPLES + 1)
+        expected = self._numpy_path(samples.tobytes())
+        jit = pcm._pcm_i16_to_f32(samples, np.empty(samples.size, dtype=np.float32))
+        np.testing.assert_array_equal(jit, expected)
+        # 可写缓冲区走JIT路径，结果同样一致
+        np.testing.assert_array_equal(pcm16_to_float32(bytearray(samples.tobytes())), expected)
+
+    def test_readonly_input_matches_writeable_input(self):
+        samples = self._samples(pcm._JIT_MIN_SAMPLES + 1)
+        readonly = pcm16_to_float32(samples.tobytes())
+        writeable = pcm16_to_float32(bytearray(samples.tobytes()))
+        np.testing.assert_array_equal(readonly, writeable)
+        np.testing.assert_array_equal(readonly, self._numpy_path(samples.tobytes()))
+
+    def test_odd_sample_count(self):
+        samples = self._samples(7)
+        result = pcm16_to_float32(memoryview(samples.tobytes()))
+        self.assertEqual(result.size, 7)
+        np.testing.assert_array_equal(result, samples.astype(np.float32) / 32768)
+
+    def test_odd_byte_count_is_rejected(self):
+        # 不足一个样本的尾字节由调用方保留到下一次，这里直接报错
+        with self.assertRaises(ValueError):
+            pcm16_to_float32(b'\x00\x01\x02')
+
+    def test_out_returns_prefix_view(self):
+        for size in (5, pcm._JIT_MIN_SAMPLES + 1):
+            with self.subTest(size=size):
+                samples = self._samples(size)
+                out = np.full(size + 10, 7.0, dtype=np.float32)
+                result = pcm16_to_float32(bytearray(samples.tobytes()), out=out)
+                self.assertEqual(result.size, size)
+                self.assertTrue(np.shares_memory(result, out))
+                self.assertEqual(result.__array_interface__['data'][0], out.__array_interface__['data'][0])
+                np.testing.assert_array_equal(out[:size], self._numpy_path(samples.tobytes()))
+                np.testing.assert_array_equal(out[size:], np.float32(7.0))